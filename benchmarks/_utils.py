@@ -0,0 +1,30 @@
+import os
+from time import perf_counter
+
+
+def pin_to_single_core():
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def measure(function, rounds, repeat=5):
+    """Returns the best rounds per second out of 'repeat' runs"""
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        function(rounds)
+        duration = perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return rounds / best
+
+
+def report(title, before, after, unit="messages/s", labels=None):
+    before_label, after_label = labels or ("before", "after")
+    width = max(len(before_label), len(after_label)) + 1
+    print(f"{title}:")
+    for label, value in [(before_label, before), (after_label, after)]:
+        print(
+            f"  {label + ':':<{width}} {value:12,.0f} {unit} "
+            f"({1e6 / value:.2f} us each)"
+        )
+    print(f"  speedup: {after / before:.2f}x")
@@ -0,0 +1,71 @@
+"""Connection establishment time of each ICE mode over loopback
+
+The bot side is a botafar Standby and the browser side a plain aiortc peer
+connection, signaling is done by handing the descriptions over directly.
+Gathering with STUN servers needs internet, without it the default mode
+waits for the STUN timeout.
+"""
+import asyncio
+from statistics import median
+from time import perf_counter
+
+from aiortc import RTCConfiguration, RTCPeerConnection
+
+from botafar._internal.data_channel.data_channel import (
+    Standby,
+    get_ice_servers,
+)
+
+ROUNDS = 5
+
+MODES = [
+    ("default", get_ice_servers(None, False), None),
+    ("gathering timeout 0.5 s", get_ice_servers(None, False), 0.5),
+    ("host only", get_ice_servers(None, True), None),
+]
+
+
+async def connect(ice_servers, gathering_timeout):
+    """Returns seconds until the offer was ready and until connected"""
+    started = perf_counter()
+    standby = await Standby.create(ice_servers, gathering_timeout)
+    offer_ready = perf_counter() - started
+
+    browser = RTCPeerConnection(RTCConfiguration([]))
+    channel = browser.createDataChannel(
+        "communication", negotiated=True, ordered=False, id=0
+    )
+    opened = asyncio.Event()
+    channel.on("open", opened.set)
+    try:
+        await browser.setRemoteDescription(
+            standby.peer_connection.localDescription
+        )
+        await browser.setLocalDescription(await browser.createAnswer())
+        await standby.peer_connection.setRemoteDescription(
+            browser.localDescription
+        )
+        await asyncio.wait_for(opened.wait(), 30)
+        return offer_ready, perf_counter() - started
+    finally:
+        await browser.close()
+        await standby.close()
+
+
+async def main():
+    print(f"Connection establishment, median of {ROUNDS}:")
+    for title, ice_servers, gathering_timeout in MODES:
+        results = [
+            await connect(ice_servers, gathering_timeout)
+            for _ in range(ROUNDS)
+        ]
+        offer_ready = median(offer for offer, _ in results)
+        connected = median(connected for _, connected in results)
+        print(
+            f"  {title + ':':<25} offer {offer_ready * 1000:8.1f} ms, "
+            f"connected {connected * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
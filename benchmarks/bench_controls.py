@@ -0,0 +1,193 @@
+from _utils import measure, pin_to_single_core, report
+
+from botafar import Joystick, Slider
+from botafar._internal.controls import joystick, slider
+from botafar._internal.events import Event
+
+ROUNDS = 200_000
+
+JOYSTICK_NAMES = ["up", "left", "down", "right"]
+SLIDER_NAMES = ["up_or_left", "down_or_right"]
+
+
+def parse_is_down(is_down, has_diagonals, latest_update_direction):
+    """joystick.parse_is_down before the pressed key masks"""
+    if is_down["up"] and not is_down["down"]:
+        vertical_value = 1
+    elif not is_down["up"] and is_down["down"]:
+        vertical_value = -1
+    else:
+        vertical_value = 0
+
+    if is_down["left"] and not is_down["right"]:
+        horizontal_value = -1
+    elif not is_down["left"] and is_down["right"]:
+        horizontal_value = 1
+    else:
+        horizontal_value = 0
+
+    direction = joystick.DIRECTIONS[horizontal_value, vertical_value]
+    if direction in joystick.DIAGONALS and not has_diagonals:
+        direction = joystick.DIAGONAL_RESOLVERS[
+            latest_update_direction, direction
+        ]
+
+    new_update_direction = None
+    if not has_diagonals:
+        if direction == "on_center":
+            new_update_direction = None
+        elif direction in ["on_up", "on_down"]:
+            new_update_direction = "vertical"
+        elif direction in ["on_left", "on_right"]:
+            new_update_direction = "horizontal"
+    return direction, new_update_direction
+
+
+class DictJoystick(Joystick):
+    """Updates an is down dictionary with if/elif chains like before"""
+
+    def _reset_state(self):
+        super()._reset_state()
+        self._is_down = dict.fromkeys(JOYSTICK_NAMES, False)
+
+    def _process_event(self, event):
+        if event.name in ["on_release", "on_press"]:
+            for name, key in zip(JOYSTICK_NAMES, self._keys_copy):
+                if event._key == key:
+                    self._is_down[name] = event.name == "on_press"
+                    break
+            direction, self._latest_update_direction = parse_is_down(
+                self._is_down,
+                self._has_diagonals,
+                self._latest_update_direction,
+            )
+        else:
+            name = event.name
+            self._is_down = {
+                "up": name in ["on_up", "on_up_left", "on_up_right"],
+                "left": name in ["on_left", "on_up_left", "on_down_left"],
+                "down": name in ["on_down", "on_down_left", "on_down_right"],
+                "right": name in ["on_right", "on_up_right", "on_down_right"],
+            }
+            direction = event.name
+
+        ignore = direction == self._state
+        if not ignore:
+            self._state = direction
+            event._name = direction
+        return ignore, event
+
+
+class DictSlider(Slider):
+    """Updates an is down dictionary with if/elif chains like before"""
+
+    def _reset_state(self):
+        super()._reset_state()
+        self._is_down = dict.fromkeys(SLIDER_NAMES, False)
+
+    def _process_event(self, event):
+        if event.name in ["on_release", "on_press"]:
+            if event._key == self._keys_copy[0]:
+                self._is_down["up_or_left"] = event.name == "on_press"
+            elif event._key == self._keys_copy[1]:
+                self._is_down["down_or_right"] = event.name == "on_press"
+            if (
+                self._is_down["up_or_left"]
+                and not self._is_down["down_or_right"]
+            ):
+                numerical_value = -1
+            elif (
+                not self._is_down["up_or_left"]
+                and self._is_down["down_or_right"]
+            ):
+                numerical_value = 1
+            else:
+                numerical_value = 0
+            direction = slider.DIRECTIONS[self._data["type"], numerical_value]
+        else:
+            self._is_down = {
+                "up_or_left": event.name in ["on_up", "on_left"],
+                "down_or_right": event.name in ["on_down", "on_right"],
+            }
+            direction = event.name
+
+        ignore = direction == self._state
+        if not ignore:
+            self._state = direction
+            event._name = direction
+        return ignore, event
+
+
+def get_events(keys, states):
+    """Rolling presses and releases over all keys, then direction events"""
+    events = []
+    for name in ["on_press", "on_release"]:
+        for key in keys:
+            events.append((name, key))
+    for key in keys:
+        events.append(("on_press", key))
+        events.append(("on_release", key))
+    return events + [(state, keys[0]) for state in states]
+
+
+def get_reducer(control, keys, states):
+    events = [
+        Event(name, "player", key) for name, key in get_events(keys, states)
+    ]
+    names = [event.name for event in events]
+    count = len(events)
+
+    def reduce(rounds):
+        for i in range(rounds):
+            # Direction events change the name, put it back
+            event = events[i % count]
+            event._name = names[i % count]
+            control._process_event(event)
+
+    return reduce
+
+
+if __name__ == "__main__":
+    pin_to_single_core()
+    # Each control needs keys of its own
+    joystick_keys = [
+        ["W", "A", "S", "D"],
+        ["T", "F", "G", "H"],
+        ["I", "J", "K", "L"],
+        ["UP", "LEFT", "DOWN", "RIGHT"],
+    ]
+    joystick_states = ["on_center", "on_up", "on_up_left", "on_right"]
+    for diagonals in [False, True]:
+        before_keys, after_keys = joystick_keys.pop(), joystick_keys.pop()
+        report(
+            f"Joystick events, diagonals={diagonals}",
+            measure(
+                get_reducer(
+                    DictJoystick(*before_keys, diagonals=diagonals),
+                    before_keys,
+                    joystick_states,
+                ),
+                ROUNDS,
+            ),
+            measure(
+                get_reducer(
+                    Joystick(*after_keys, diagonals=diagonals),
+                    after_keys,
+                    joystick_states,
+                ),
+                ROUNDS,
+            ),
+            unit="events/s",
+        )
+    report(
+        "Slider events",
+        measure(
+            get_reducer(DictSlider("Q", "E"), ["Q", "E"], ["on_left"]),
+            ROUNDS,
+        ),
+        measure(
+            get_reducer(Slider("Z", "C"), ["Z", "C"], ["on_left"]),
+            ROUNDS,
+        ),
+        unit="events/s",
+    )
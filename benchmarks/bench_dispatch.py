@@ -0,0 +1,72 @@
+import asyncio
+
+from _utils import measure, pin_to_single_core, report
+
+from botafar import Button
+from botafar._internal.callback_executor import CallbackExecutor, Dispatch
+from botafar._internal.decorators import DecoratorBase
+from botafar._internal.events import Event
+from botafar._internal.states import state_machine
+from botafar._internal.states.server_event_prosessor import (
+    ServerEventProsessor,
+)
+
+ROUNDS = 100_000
+
+button = Button("A")
+
+
+class Robot:
+    @button.on_press
+    def press(self, event):
+        pass
+
+    @button.on_release
+    def release(self):
+        pass
+
+
+robot = Robot()
+
+
+class PerCallDispatch(Dispatch):
+    """Classifies on every call and goes through the wrapper like before"""
+
+    def __init__(self, callback):
+        super().__init__(callback)
+        self.target = callback
+        self.params = ()
+
+
+class PerCallExecutor(CallbackExecutor):
+    @staticmethod
+    def get_dispatch(callback):
+        return PerCallDispatch(callback)
+
+
+def get_dispatcher(executor_class):
+    executor = executor_class(lambda future: None, print)
+    prosessor = ServerEventProsessor(lambda event: None, executor, print)
+    state_machine.player._is_controlling = True
+    events = [
+        Event("on_press", "player", "A"),
+        Event("on_release", "player", "A"),
+    ]
+
+    def dispatch(rounds):
+        for i in range(rounds):
+            prosessor.process_event(events[i % 2])
+        asyncio.run(executor.wait_until_all_finished())
+
+    return dispatch
+
+
+if __name__ == "__main__":
+    pin_to_single_core()
+    DecoratorBase.post_listen()
+    report(
+        "Dispatching INPUT_EVENTs through process_event",
+        measure(get_dispatcher(PerCallExecutor), ROUNDS),
+        measure(get_dispatcher(CallbackExecutor), ROUNDS),
+        unit="events/s",
+    )
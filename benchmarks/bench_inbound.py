@@ -0,0 +1,94 @@
+import json
+
+from _utils import measure, pin_to_single_core, report
+
+from botafar._internal.constants import INPUT_EVENT, KEYS, SENDERS
+from botafar._internal.data_channel.json_utils import (
+    is_internal_message,
+    load_message,
+    parse_event,
+)
+from botafar._internal.data_channel.wire_format import (
+    encode_input_event,
+    parse_binary_event,
+)
+from botafar._internal.events import Event
+
+ROUNDS = 100_000
+
+MESSAGES = [
+    json.dumps(
+        {"key": key, "sender": "player", "name": name, "type": INPUT_EVENT}
+    )
+    for key in ["W", "A", "S", "D"]
+    for name in ["on_press", "on_release"]
+]
+
+BINARY_MESSAGES = [
+    encode_input_event(Event(name, "player", key))
+    for key in ["W", "A", "S", "D"]
+    for name in ["on_press", "on_release"]
+]
+
+
+def parse_event_before(data):
+    """The decoding done before the single-parse pipeline"""
+    data = json.loads(data)
+    if "type" not in data:
+        return None
+    if data["type"] == INPUT_EVENT:
+        if (
+            all(key in data for key in ("key", "sender", "name"))
+            and data["key"] in KEYS
+            and data["sender"] in SENDERS
+            and isinstance(data["name"], str)
+        ):
+            return Event(data["name"], data["sender"], data["key"])
+    return None
+
+
+def before(rounds):
+    messages = MESSAGES
+    length = len(messages)
+    for i in range(rounds):
+        message = messages[i % length]
+        loaded_message = json.loads(message)
+        if loaded_message["type"] == "INTERNAL_MESSAGE":
+            continue
+        parse_event_before(message)
+
+
+def after(rounds):
+    messages = MESSAGES
+    length = len(messages)
+    for i in range(rounds):
+        data = load_message(messages[i % length])
+        if is_internal_message(data):
+            continue
+        parse_event(data)
+
+
+def after_binary(rounds):
+    messages = BINARY_MESSAGES
+    length = len(messages)
+    for i in range(rounds):
+        parse_binary_event(messages[i % length])
+
+
+if __name__ == "__main__":
+    pin_to_single_core()
+    report(
+        "Inbound INPUT_EVENT decoding",
+        measure(before, ROUNDS),
+        measure(after, ROUNDS),
+    )
+    print(
+        f"\nJSON input event {len(MESSAGES[0])} bytes, "
+        f"binary input event {len(BINARY_MESSAGES[0])} bytes"
+    )
+    report(
+        "JSON compared to binary INPUT_EVENT decoding",
+        measure(after, ROUNDS),
+        measure(after_binary, ROUNDS),
+        labels=("json", "binary"),
+    )
@@ -0,0 +1,166 @@
+import logging
+
+from _utils import measure, pin_to_single_core, report
+
+from botafar._internal.states import machine
+from botafar._internal.states.server_state_machine import (
+    EXIT,
+    EXIT_IMMEDIATE,
+    INIT,
+    PRE_INIT,
+    PREPARE,
+    START,
+    STOP,
+    STOP_IMMEDIATE,
+    WAITING_BROWSER,
+    WAITING_OWNER_OR_PLAYER,
+    WAITING_STOP,
+    ServerStateMachine,
+)
+
+try:
+    import transitions
+except ImportError:
+    transitions = None
+
+ROUNDS = 100_000
+
+# (trigger, source, dest, conditions), same as in ServerStateMachine
+TRANSITIONS = [
+    ("init", PRE_INIT, INIT, []),
+    ("wait_browser", [INIT, STOP], WAITING_BROWSER, ["can"]),
+    ("prepare", WAITING_BROWSER, PREPARE, ["can"]),
+    ("wait_owner_or_player", PREPARE, WAITING_OWNER_OR_PLAYER, []),
+    ("start", WAITING_OWNER_OR_PLAYER, START, ["can"]),
+    ("wait_stop", START, WAITING_STOP, []),
+    ("stop_immediate", [START, WAITING_STOP], STOP_IMMEDIATE, []),
+    ("stop", STOP_IMMEDIATE, STOP, ["can_stop"]),
+    ("exit_immediate", "*", EXIT_IMMEDIATE, []),
+    ("exit", EXIT_IMMEDIATE, EXIT, ["can_stop"]),
+]
+IGNORE_INVALID = [STOP_IMMEDIATE, EXIT_IMMEDIATE]
+
+
+class Model:
+    def __init__(self, use_transitions):
+        self.stop_allowed = False
+        if use_transitions:
+            states = [
+                transitions.State(s, ignore_invalid_triggers=True)
+                if s in IGNORE_INVALID
+                else s
+                for s in ServerStateMachine.states
+            ]
+            self.machine = transitions.Machine(
+                model=self, states=states, initial=PRE_INIT
+            )
+        else:
+            self.machine = machine.Machine(
+                self, ServerStateMachine.states, PRE_INIT, IGNORE_INVALID
+            )
+        for trigger, source, dest, conditions in TRANSITIONS:
+            self.machine.add_transition(
+                trigger, source, dest, conditions=conditions
+            )
+        self.use_transitions = use_transitions
+
+    def can(self):
+        return True
+
+    def can_stop(self):
+        return self.stop_allowed
+
+    def safe_state_change(self, name):
+        # Like ServerStateMachine.safe_state_change before and after
+        if self.use_transitions:
+            try:
+                getattr(self, name)()
+            except transitions.core.MachineError:
+                pass
+        else:
+            self.machine.trigger(name, strict=False)
+
+
+def get_session(use_transitions):
+    """A full session, with the probes the callbacks do in between"""
+    model = Model(use_transitions)
+    model.init()
+    model.wait_browser()
+
+    def session(rounds):
+        for _ in range(rounds):
+            model.stop_allowed = False
+            model.safe_state_change("prepare")
+            model.safe_state_change("start")
+            model.safe_state_change("wait_owner_or_player")
+            model.safe_state_change("stop")
+            model.safe_state_change("exit")
+            model.safe_state_change("start")
+            model.safe_state_change("wait_stop")
+            model.safe_state_change("stop")
+            model.safe_state_change("exit")
+            model.safe_state_change("stop_immediate")
+            model.stop_allowed = True
+            model.safe_state_change("stop")
+            model.safe_state_change("exit")
+            model.safe_state_change("wait_browser")
+            model.safe_state_change("exit")
+
+    return session
+
+
+def get_control_finished(use_transitions):
+    """Probes after each control callback while stopping"""
+    model = Model(use_transitions)
+    model.state = STOP_IMMEDIATE
+
+    def control_finished(rounds):
+        for _ in range(rounds):
+            model.safe_state_change("stop")
+            model.safe_state_change("exit")
+
+    return control_finished
+
+
+def get_invalid_probe(use_transitions):
+    """Probes that are not valid in the current state"""
+    model = Model(use_transitions)
+    model.state = WAITING_STOP
+
+    def invalid_probe(rounds):
+        for _ in range(rounds):
+            model.safe_state_change("stop")
+            model.safe_state_change("exit")
+
+    return invalid_probe
+
+
+if __name__ == "__main__":
+    pin_to_single_core()
+    # transitions logs each failed condition on info level
+    logging.getLogger("transitions").setLevel(logging.WARNING)
+    if transitions is None:
+        print("Install transitions==0.8.11 to compare with it")
+    else:
+        labels = ("transitions", "table")
+        report(
+            "Full sessions with the probes in between",
+            measure(get_session(True), ROUNDS // 10),
+            measure(get_session(False), ROUNDS // 10),
+            unit="sessions/s",
+            labels=labels,
+        )
+        report(
+            "Control finished probes while stopping",
+            measure(get_control_finished(True), ROUNDS),
+            measure(get_control_finished(False), ROUNDS),
+            unit="callbacks/s",
+            labels=labels,
+        )
+        report(
+            "Probes of triggers invalid in the current state",
+            measure(get_invalid_probe(True), ROUNDS),
+            measure(get_invalid_probe(False), ROUNDS),
+            unit="probes/s",
+            labels=labels,
+        )
@@ -24,20 +24,14 @@ class NotSpammableRelay:
         self.relay = OutputDevice(
             RELAY_GPIO_PIN, active_high=True, initial_value=False
         )
-        self.cycling = False
 
-    @b.on_press
+    # Presses during a cycle are dropped instead of queued
+    @b.on_press(max_running=1, overflow="drop_newest")
     def cycle_relay(self):
-        if self.cycling:
-            botafar.print("Spamming relay too fast, skipping")
-            return
-
-        self.cycling = True
         self.relay.on()
         sleep(RELAY_TIME_ON)
         self.relay.off()
         sleep(RELAY_TIME_OFF)
-        self.cycling = False
 
 
 NotSpammableRelay()
@@ -1,6 +1,3 @@
-from threading import Lock
-from time import sleep
-
 from gpiozero import Servo
 from gpiozero.pins.pigpio import (
     PiGPIOFactory,  # Optional, removes servo stutter!
@@ -11,13 +8,13 @@ import botafar
 """
 Servo example with a custom class, smooth movement to the target value.
 
-Adjust SERVO_STEPS and SERVO_UPDATE_FREQ to alter movement speed and
-smoothness.
+botafar.Output moves the servo towards the target at SERVO_RATE per second
+and returns it to the center when the bot stops. Adjust SERVO_RATE to
+alter movement speed.
 """
 
 SERVO_GPIO_PIN = 17
-SERVO_STEPS = 40
-SERVO_UPDATE_FREQ = 25
+SERVO_RATE = 1.25  # From one end to the other in 1.6 seconds
 SERVO_VALUES = {
     "on_left": 1,
     "on_up_left": 0.5,
@@ -41,29 +38,17 @@ class SmoothServo:
             min_pulse_width=0.544 / 1000,  # Adjust if needed
             max_pulse_width=2.4 / 1000,  # Adjust if needed
         )
-        self.target_value = 0
-        self.sleep_amount = 1 / SERVO_UPDATE_FREQ
-        self.move_amount = 2 / SERVO_STEPS
-        self.lock = Lock()  # Fixes concurrency issues
+        self.output = botafar.Output(self.set_value, rate=SERVO_RATE)
+
+    def set_value(self, value):
+        self.servo.value = value
 
     @j.on_any
     def move_servo(self, event):
-        with self.lock:
-            target_value = SERVO_VALUES.get(event.name)
-            if target_value is not None:
-                botafar.print(f"servo target value {target_value}")
-                while event.is_active and target_value != self.servo.value:
-
-                    if target_value < self.servo.value:
-                        self.servo.value = max(
-                            target_value, self.servo.value - self.move_amount
-                        )
-                    elif target_value > self.servo.value:
-                        self.servo.value = min(
-                            target_value, self.servo.value + self.move_amount
-                        )
-
-                    sleep(self.sleep_amount)
+        target_value = SERVO_VALUES.get(event.name)
+        if target_value is not None:
+            botafar.print(f"servo target value {target_value}")
+            self.output.target = target_value
 
 
 SmoothServo()
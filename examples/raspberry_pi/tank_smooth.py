@@ -1,6 +1,3 @@
-from threading import Lock
-from time import sleep
-
 from gpiozero import Motor
 
 import botafar
@@ -13,7 +10,9 @@ controllable wheels, left and right one.
 This example changes motor speeds smoothly. Check tank_basic.py for
 a simpler example.
 
-Change MOTOR_STEPS and MOTOR_UPDATE_FREQ to change how tank accelerates.
+botafar.Output changes the speeds at most MOTOR_RATE per second and stops
+the motors when the bot stops. Change MOTOR_RATE to change how the tank
+accelerates.
 
 Motor reference:
 https://gpiozero.readthedocs.io/en/stable/api_output.html?highlight=Motor#gpiozero.Motor
@@ -23,8 +22,7 @@ LEFT_MOTOR_FORWARD_GPIO_PIN = 4
 LEFT_MOTOR_BACKWARD_GPIO_PIN = 14
 RIGHT_MOTOR_FORWARD_GPIO_PIN = 17
 RIGHT_MOTOR_BACKWARD_GPIO_PIN = 18
-MOTOR_STEPS = 40  # How many distinct motor speeds
-MOTOR_UPDATE_FREQ = 25  # How many speed updates per second
+MOTOR_RATE = 1.25  # From full backward to full forward in 1.6 seconds
 
 LEFT_MOTOR_VALUES = {
     "on_center": 0.0,
@@ -62,28 +60,16 @@ class SmoothMotor:
             backward=backward_pin,
         )
         self.values = values
-        self.target_value = 0
-        self.sleep_amount = 1 / MOTOR_UPDATE_FREQ
-        self.change_amount = 2 / MOTOR_STEPS
-        self.lock = Lock()  # Fixes concurrency issues
+        self.output = botafar.Output(self.set_value, rate=MOTOR_RATE)
+
+    def set_value(self, value):
+        self.motor.value = value
 
     @j.on_any
     def drive(self, event):
-        with self.lock:
-            target_value = self.values[event.name]
-            botafar.print(f"motor target value {target_value}")
-            while event.is_active and target_value != self.motor.value:
-
-                if target_value < self.motor.value:
-                    self.motor.value = max(
-                        target_value, self.motor.value - self.change_amount
-                    )
-                elif target_value > self.motor.value:
-                    self.motor.value = min(
-                        target_value, self.motor.value + self.change_amount
-                    )
-
-                sleep(self.sleep_amount)
+        target_value = self.values[event.name]
+        botafar.print(f"motor target value {target_value}")
+        self.output.target = target_value
 
 
 SmoothMotor(
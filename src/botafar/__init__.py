@@ -3,7 +3,7 @@
 __version__ = "0.0.10"
 
 
-from ._internal.controls import Button, Joystick, Slider
+from ._internal.controls import Axis, Button, Joystick, Slider
 from ._internal.decorators import (
     on_exit,
     on_init,
@@ -17,6 +17,7 @@ from ._internal.decorators import on_time as _internal_on_time
 from ._internal.exceptions import SleepCancelledError
 from ._internal.main import _cli  # This enables `botafar` from cli
 from ._internal.main import exit, print, run
+from ._internal.outputs import Output
 from ._internal.states import (
     disable_controls,
     enable_controls,
@@ -27,6 +28,7 @@ from ._internal.states import (
     stop,
     time,
 )
+from ._internal.stats import stats
 
 version = __version__
 
@@ -1,132 +1,735 @@
 import asyncio
 import concurrent.futures
-from threading import RLock
+import sys
+from collections import deque
+from threading import Event, Lock, Thread, get_ident
+from time import sleep
 
+from .clock import now
+from .constants import (
+    INLINE_WARNING_SECONDS,
+    RELEASE_WORKERS,
+    SYSTEM_WORKERS,
+    USER_WORKERS,
+)
 from .exceptions import SleepCancelledError
 from .log_formatter import get_logger
+from .process_backend import (
+    BACKENDS,
+    PROCESS,
+    get_process_target,
+    init_process,
+    run_in_process,
+)
+from .stats import CallbackStats
 
 logger = get_logger()
 
+# Thread pools, so internal and releasing callbacks
+# are not queued behind slow user callbacks
+SYSTEM = "system"  # Internal callbacks, names start with '_'
+RELEASE = "release"  # Control resets, on_stop and on_exit
+USER = "user"
+RELEASE_NAMES = frozenset(
+    {
+        "on_stop",
+        "on_stop(immediate=True)",
+        "on_exit",
+        "on_exit(immediate=True)",
+    }
+)
+
+# What happens to a new callback when 'max_running' are already running
+OVERFLOW_POLICIES = ("queue", "drop_newest", "drop_oldest", "latest_wins")
+
+
+def get_lane(name):
+    if name.startswith("_"):
+        return SYSTEM
+    elif name in RELEASE_NAMES:
+        return RELEASE
+    return USER
+
+
+def verify_options(decorator_name, options):
+    known = {
+        "max_running",
+        "overflow",
+        "max_pending",
+        "skip_stale",
+        "inline",
+        "backend",
+    }
+    assert set(options.keys()) <= known, (
+        f"{decorator_name} got unknown parameters "
+        f"{sorted(set(options.keys()) - known)}"
+    )
+
+    max_running = options.get("max_running")
+    assert max_running is None or (
+        isinstance(max_running, int)
+        and not isinstance(max_running, bool)
+        and max_running >= 1
+    ), (
+        f"{decorator_name} parameter 'max_running' should be a positive "
+        f"integer or None, not {max_running}"
+    )
+
+    overflow = options.get("overflow", "queue")
+    assert overflow in OVERFLOW_POLICIES, (
+        f"{decorator_name} parameter 'overflow' should be one of "
+        f"{list(OVERFLOW_POLICIES)}, not '{overflow}'"
+    )
+    assert "overflow" not in options or max_running is not None, (
+        f"{decorator_name} parameter 'overflow' requires 'max_running', "
+        f"for example: max_running=1, overflow='{overflow}'"
+    )
+
+    max_pending = options.get("max_pending")
+    assert (max_pending is not None) == (overflow == "drop_oldest"), (
+        f"{decorator_name} parameter 'max_pending' goes together with "
+        "overflow='drop_oldest', for example: "
+        "max_running=1, overflow='drop_oldest', max_pending=3"
+    )
+    assert max_pending is None or (
+        isinstance(max_pending, int)
+        and not isinstance(max_pending, bool)
+        and max_pending >= 1
+    ), (
+        f"{decorator_name} parameter 'max_pending' should be a positive "
+        f"integer, not {max_pending}"
+    )
+
+    skip_stale = options.get("skip_stale", False)
+    assert isinstance(skip_stale, bool), (
+        f"{decorator_name} parameter 'skip_stale' should be True or False, "
+        f"not {skip_stale}"
+    )
+
+    inline = options.get("inline", False)
+    assert isinstance(inline, bool), (
+        f"{decorator_name} parameter 'inline' should be True or False, "
+        f"not {inline}"
+    )
+
+    backend = options.get("backend")
+    assert backend is None or backend in BACKENDS, (
+        f"{decorator_name} parameter 'backend' should be one of "
+        f"{list(BACKENDS)}, not '{backend}'"
+    )
+    assert not (
+        inline and backend == PROCESS
+    ), f"{decorator_name} cannot use inline=True with backend='process'"
+
+
+class Admission:
+    def __init__(self, max_running, overflow, max_pending=None):
+        self.max_running = max_running
+        self.overflow = overflow
+        self.running = 0
+        # (placeholder future, name, event, lane, submit time)
+        self.pending = deque()
+        if overflow == "queue":
+            self.max_pending = None
+        elif overflow == "drop_newest":
+            self.max_pending = 0
+        elif overflow == "drop_oldest":
+            self.max_pending = max_pending
+        else:  # latest_wins
+            self.max_pending = 1
+
+    def pop_droppable(self):
+        """Oldest waiting callback that is not a release, or None"""
+        for entry in self.pending:
+            if entry[3] != RELEASE:
+                self.pending.remove(entry)
+                return entry
+        return None
+
+
+def get_stats_name(callback, target):
+    """Callbacks are told apart in stats by their qualified name"""
+    name = getattr(target, "__qualname__", None)
+    if name is None:
+        name = getattr(callback, "__qualname__", repr(callback))
+    return name
+
+
+class Dispatch:
+    """Callback classified once, so running it needs no introspection"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        self.takes_event = callback in CallbackExecutor.takes_event
+        self.skips_stale = callback in CallbackExecutor.skips_stale
+        # The empty callback only triggers finished callbacks, and
+        # internal ones only start the measured callbacks
+        self.measured = (
+            callback is not _empty
+            and callback not in CallbackExecutor.not_measured
+        )
+        self.limit = CallbackExecutor.limits.get(callback)
+        # Async callbacks run on the loop already
+        self.inline = not self.is_async and callback in CallbackExecutor.inline
+        if callback in CallbackExecutor.process_backend:
+            self.process_target = get_process_target(callback)
+        else:
+            self.process_target = None
+
+        # Call the decorated function directly instead of
+        # the DecoratorBase wrapper, which looks it up on each call
+        target = getattr(callback, "__botafar_target__", None)
+        if target is not None:
+            owner, name, params = target
+            self.target = getattr(owner, name)
+            self.params = tuple(params)
+        else:
+            self.target = callback
+            self.params = ()
+        self.stats_name = (
+            get_stats_name(callback, self.target) if self.measured else None
+        )
+
+    def run(self, executor, event, submitted):
+        """Returns (queue wait, run time) for stats, None if not run"""
+        started = now()
+        # Checked when a worker picks the callback up, the event
+        # might have been superseded while waiting in the queue
+        if self.skips_stale and event is not None and not event.is_active:
+            executor._add_coalesced(self.stats_name)
+            return None
+        if getattr(event, "_received", None) is not None:
+            executor._add_latency(self.stats_name, event, started)
+        try:
+            if self.takes_event and event is not None:
+                self.target(*self.params, event)
+            else:
+                self.target(*self.params)
+        except SleepCancelledError:
+            logger.debug("SleepCancelledError suppressed")
+        if self.measured:
+            return (started - submitted, now() - started)
+        return None
+
+    async def run_async(self, executor, event, submitted):
+        started = now()
+        if self.skips_stale and event is not None and not event.is_active:
+            executor._add_coalesced(self.stats_name)
+            return None
+        if getattr(event, "_received", None) is not None:
+            executor._add_latency(self.stats_name, event, started)
+        try:
+            if self.takes_event and event is not None:
+                await self.target(*self.params, event)
+            else:
+                await self.target(*self.params)
+        except SleepCancelledError:
+            logger.debug("SleepCancelledError suppressed")
+        return (started - submitted, now() - started)
+
+
+class InlineWatchdog:
+    """Warns from its own thread when an inline callback blocks the loop
+
+    The thread polls only while an inline callback runs, otherwise it
+    waits for the next one without waking up.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.running = None  # (name, start time)
+        self.active = Event()  # Set while an inline callback runs
+        self.thread = None
+
+    def enter(self, name):
+        """Returns the value to pass to 'exit', inline callbacks can nest"""
+        if self.thread is None:
+            self.thread = Thread(target=self._watch, daemon=True)
+            self.thread.start()
+        previous = self.running
+        self.running = (name, now())
+        self.active.set()
+        return previous
+
+    def exit(self, previous):
+        self.running = previous
+
+    def _watch(self):
+        warned = None
+        while True:
+            self.active.wait()
+            sleep(self.threshold / 2)
+            running = self.running
+            if running is None:
+                self.active.clear()
+                # 'enter' might have run between the check and the clear
+                if self.running is not None:
+                    self.active.set()
+            elif running is not warned and now() - running[1] > self.threshold:
+                warned = running
+                logger.warning(
+                    f"inline {running[0]} callback has blocked the event "
+                    f"loop for over {self.threshold} seconds, use "
+                    "inline=True only with quick callbacks"
+                )
+
+
+def _empty():
+    pass
+
 
 class CallbackExecutor:
     system_callbacks = {}
     takes_event = set()
+    skips_stale = set()
+    limits = {}  # callback -> (max_running, overflow, max_pending)
+    not_measured = set()
+    inline = set()
+    process_backend = set()
+    registered = []  # callbacks to compile in 'compile_dispatches'
+    dispatches = {}  # callback -> Dispatch
 
-    def __init__(self, done_callback, error_callback):
+    def __init__(
+        self,
+        done_callback,
+        error_callback,
+        system_workers=SYSTEM_WORKERS,
+        release_workers=RELEASE_WORKERS,
+        user_workers=USER_WORKERS,
+    ):
         self.loop = None
+        self.loop_thread = None
         self.done_callback = done_callback
         self.error_callback = error_callback
-        self.executor = concurrent.futures.ThreadPoolExecutor()
-        self.future_to_name = {}
-        self.running_futures = {}
+        self.lanes = {
+            SYSTEM: concurrent.futures.ThreadPoolExecutor(
+                system_workers, thread_name_prefix="botafar_system"
+            ),
+            RELEASE: concurrent.futures.ThreadPoolExecutor(
+                release_workers, thread_name_prefix="botafar_release"
+            ),
+            USER: concurrent.futures.ThreadPoolExecutor(
+                user_workers, thread_name_prefix="botafar_user"
+            ),
+        }
+        self.process_pool = None  # Started only when needed
+        self.process_futures = set()  # Not finished, to cancel on shutdown
+        self.running = {}  # name -> amount of callbacks in flight
         self.finished_callbacks = {}  # bad name... callback when finished
-        self.rlock = RLock()  # Make sure future tracking stays in sync
+        self.waiters = []  # (is_finished, loop, asyncio.Event)
+        self.admissions = {}  # callback -> Admission
+        # Keyed by the qualified name of the callback, not the event name,
+        # so callbacks of different controls are told apart
+        self.dropped = {}  # callback name -> amount of dropped callbacks
+        self.coalesced = {}  # callback name -> skipped stale callbacks
+        self.stats = {}  # callback name -> CallbackStats
+        # Only guards the counters above, nothing runs while holding it
+        self.lock = Lock()
+        self.watchdog = InlineWatchdog(INLINE_WARNING_SECONDS)
 
     def set_loop(self, loop):
+        # Called from the loop thread
         self.loop = loop
+        self.loop_thread = get_ident()
 
     @staticmethod
     def add_to_takes_event(function):
         CallbackExecutor.takes_event.add(function)
 
+    @staticmethod
+    def add_to_skips_stale(function):
+        CallbackExecutor.skips_stale.add(function)
+
+    @staticmethod
+    def add_limit(function, max_running, overflow="queue", max_pending=None):
+        CallbackExecutor.limits[function] = (
+            max_running,
+            overflow,
+            max_pending,
+        )
+
+    @staticmethod
+    def add_to_inline(function):
+        CallbackExecutor.inline.add(function)
+
+    @staticmethod
+    def add_to_not_measured(function):
+        CallbackExecutor.not_measured.add(function)
+
+    @staticmethod
+    def add_to_process_backend(function):
+        CallbackExecutor.process_backend.add(function)
+
+    @staticmethod
+    def register(function):
+        CallbackExecutor.registered.append(function)
+
+    @staticmethod
+    def compile_dispatches():
+        CallbackExecutor.dispatches = {
+            callback: Dispatch(callback)
+            for callback in CallbackExecutor.registered
+        }
+
+    @staticmethod
+    def get_dispatch(callback):
+        dispatch = CallbackExecutor.dispatches.get(callback)
+        if dispatch is None:
+            # Internal callbacks are often created per call, not cached
+            dispatch = Dispatch(callback)
+        return dispatch
+
+    def start_process_pool(self, share_sleep_event=None):
+        """Starts worker processes if some callback uses them
+
+        'share_sleep_event' returns an event that cancels sleeps in both
+        the main and the worker processes
+        """
+        if self.process_pool is not None or not any(
+            dispatch.process_target is not None
+            for dispatch in self.dispatches.values()
+        ):
+            return
+
+        sleep_event = None
+        if share_sleep_event is not None:
+            sleep_event = share_sleep_event()
+        self.process_pool = concurrent.futures.ProcessPoolExecutor(
+            initializer=init_process, initargs=(sleep_event,)
+        )
+
+    def shutdown_process_pool(self):
+        if self.process_pool is not None:
+            if sys.version_info >= (3, 9):
+                self.process_pool.shutdown(wait=False, cancel_futures=True)
+            else:
+                # No cancel_futures before Python 3.9
+                with self.lock:
+                    futures = list(self.process_futures)
+                for future in futures:
+                    future.cancel()
+                self.process_pool.shutdown(wait=False)
+            self.process_pool = None
+
+    def get_stats(self):
+        with self.lock:
+            names = set(self.stats) | set(self.dropped) | set(self.coalesced)
+            return {
+                name: {
+                    **self.stats.get(name, CallbackStats()).to_dict(),
+                    "dropped": self.dropped.get(name, 0),
+                    "coalesced": self.coalesced.get(name, 0),
+                }
+                for name in names
+            }
+
     @property
     def running_names(self):
-        return [
-            name
-            for name in self.running_futures.keys()
-            if not name.startswith("_")
-        ]
+        with self.lock:
+            names = list(self.running.keys())
+        return [name for name in names if not name.startswith("_")]
 
     # TODO there must be a logic mistake here
     def execute_callbacks(
-        self, callbacks, name, finished_callback, event=None
+        self, callbacks, name, finished_callback, event=None, lane=None
     ):
+        if lane is None:
+            lane = get_lane(name)
         futures = []
+        started = []  # Admitted limited callbacks, (future, dispatch)
+        dropped = []  # Dropped placeholders, resolved after tracking
 
-        with self.rlock:
-            # Use an empty callback to trigger
-            # finished_callback with a proper timing
-            # If no callbacks entered
-            if len(callbacks) == 0:
-                if finished_callback is not None:
-                    callbacks = [lambda: None]
-
-            for callback in callbacks:
-                if event is not None and callback in self.takes_event:
-                    params = [event]
-                else:
-                    params = []
-
-                if asyncio.iscoroutinefunction(callback):
-
-                    async def suppressed(cb, *args):
-                        try:
-                            await cb(*args)
-                        except SleepCancelledError:
-                            logger.debug("SleepCancelledError suppressed")
-
-                    future = asyncio.run_coroutine_threadsafe(
-                        suppressed(callback, *params), self.loop
-                    )
-                else:
+        # Count one extra until everything is submitted, so callbacks
+        # finishing early cannot trigger finished_callback in between
+        with self.lock:
+            self.running[name] = self.running.get(name, 0) + 1
+            if finished_callback is not None:
+                # NOTE this can override existing, which should be ok
+                self.finished_callbacks[name] = finished_callback
+
+        # Internal callbacks are not in stats
+        internal = name.startswith("_")
+        for callback in callbacks:
+            dispatch = self.get_dispatch(callback)
+            if dispatch.limit is not None:
+                future = self._admit(
+                    dispatch, name, event, lane, started, dropped
+                )
+                if future is None:
+                    continue
+            else:
+                future = self._submit(dispatch, name, event, lane)
+            futures.append((future, None if internal else dispatch.stats_name))
+
+        # Use an empty callback to trigger finished_callback with
+        # a proper timing if no callbacks entered or all were dropped
+        if len(futures) == 0 and finished_callback is not None:
+            futures.append(
+                (
+                    self._submit(self.get_dispatch(_empty), name, None, lane),
+                    None,
+                )
+            )
 
-                    def suppressed(cb, *args):
-                        try:
-                            cb(*args)
-                        except SleepCancelledError:
-                            logger.debug("SleepCancelledError suppressed")
+        with self.lock:
+            self.running[name] += len(futures)
 
-                    future = self.executor.submit(
-                        suppressed, callback, *params
+        # NOTE: done callbacks of ready futures trigger immediately,
+        # so these are added only after the counters are up to date
+        for future, stats_name in futures:
+            future.add_done_callback(
+                lambda future, stats_name=stats_name: self._call_on_loop(
+                    self._done, name, future, stats_name
+                )
+            )
+        self._after_admit(started, dropped)
+        self._call_on_loop(self._done, name, None)
+
+    def _submit(self, dispatch, name, event, lane, submitted=None):
+        if submitted is None:
+            submitted = now()
+        if dispatch.inline:
+            future = concurrent.futures.Future()
+            if self.loop is None or get_ident() == self.loop_thread:
+                self._run_inline(dispatch, name, event, submitted, future)
+            else:
+                self._call_on_loop(
+                    self._run_inline, dispatch, name, event, submitted, future
+                )
+            return future
+        if dispatch.process_target is not None:
+            return self._submit_to_process(dispatch, name, event, submitted)
+        if dispatch.is_async:
+            return asyncio.run_coroutine_threadsafe(
+                dispatch.run_async(self, event, submitted), self.loop
+            )
+        return self.lanes[lane].submit(dispatch.run, self, event, submitted)
+
+    def _submit_to_process(self, dispatch, name, event, submitted):
+        # Worker processes only see a snapshot of the event,
+        # so staleness is checked here when the callback is started
+        if dispatch.skips_stale and event is not None and not event.is_active:
+            self._add_coalesced(dispatch.stats_name)
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+
+        if self.process_pool is None:
+            self.process_pool = concurrent.futures.ProcessPoolExecutor(
+                initializer=init_process, initargs=(None,)
+            )
+        future = self.process_pool.submit(
+            run_in_process,
+            dispatch.process_target,
+            dispatch.takes_event,
+            event,
+            submitted,
+        )
+        with self.lock:
+            self.process_futures.add(future)
+        future.add_done_callback(self._discard_process_future)
+        if getattr(event, "_received", None) is not None:
+
+            def add_latency(future):
+                if not future.cancelled() and future.exception() is None:
+                    queue_wait, _ = future.result()
+                    self._add_latency(
+                        dispatch.stats_name, event, submitted + queue_wait
                     )
 
-                if finished_callback is not None:
-                    # NOTE this can override existing, which should be ok
-                    self.finished_callbacks[name] = finished_callback
-                self.future_to_name[future] = name
-                if name not in self.running_futures:
-                    self.running_futures[name] = set()
-                self.running_futures[name].add(future)
+            future.add_done_callback(add_latency)
+        return future
+
+    def _discard_process_future(self, future):
+        with self.lock:
+            self.process_futures.discard(future)
 
-                futures.append(future)
+    def _run_inline(self, dispatch, name, event, submitted, future):
+        previous = self.watchdog.enter(name)
+        try:
+            result = dispatch.run(self, event, submitted)
+        except Exception as e:  # Reported like pool callback errors
+            self.watchdog.exit(previous)
+            future.set_exception(e)
+        else:
+            self.watchdog.exit(previous)
+            future.set_result(result)
 
-        # NOTE: Adding done callback inside rlock when is already
-        # ready, will trigger _done immediately, and with lock
-        # acquired! That is why this needs to be done outside separately
-        for future in futures:
-            # TODO can future finish before done callback is added?
-            # Probably just then triggers immediately
-            future.add_done_callback(self._done)
+    def _admit(self, dispatch, name, event, lane, started, dropped):
+        """Returns a future to track, or None if the callback was dropped"""
+        callback = dispatch.callback
+        with self.lock:
+            if callback not in self.admissions:
+                self.admissions[callback] = Admission(*dispatch.limit)
+            admission = self.admissions[callback]
+
+            if admission.running >= admission.max_running:
+                # Releases reset controls to a safe state, so they always
+                # wait for their turn and are never dropped
+                max_pending = admission.max_pending
+                if lane != RELEASE and max_pending == 0:
+                    self._add_dropped(dispatch.stats_name)
+                    return None
+
+                droppable = sum(
+                    1 for entry in admission.pending if entry[3] != RELEASE
+                )
+                if (
+                    lane != RELEASE
+                    and max_pending is not None
+                    and droppable >= max_pending
+                ):
+                    placeholder, *_ = admission.pop_droppable()
+                    self._add_dropped(dispatch.stats_name)
+                    dropped.append(placeholder)
+
+                # Placeholder is tracked like a running future, so waiting
+                # and finished callbacks work the same for queued callbacks
+                placeholder = concurrent.futures.Future()
+                admission.pending.append(
+                    (placeholder, name, event, lane, now())
+                )
+                return placeholder
+
+            admission.running += 1
+
+        future = self._submit(dispatch, name, event, lane)
+        started.append((future, dispatch))
+        return future
+
+    def _after_admit(self, started, dropped):
+        for future, dispatch in started:
+            future.add_done_callback(
+                lambda _, dispatch=dispatch: self._release(dispatch)
+            )
+        for placeholder in dropped:
+            placeholder.set_result(None)
+
+    def _release(self, dispatch):
+        with self.lock:
+            admission = self.admissions[dispatch.callback]
+            admission.running -= 1
+            if len(admission.pending) == 0:
+                return
+            (
+                placeholder,
+                name,
+                event,
+                lane,
+                submitted,
+            ) = admission.pending.popleft()
+            admission.running += 1
+
+        future = self._submit(dispatch, name, event, lane, submitted)
+        self._after_admit([(future, dispatch)], [])
+        future.add_done_callback(lambda f: self._resolve(f, placeholder))
+
+    @staticmethod
+    def _resolve(future, placeholder):
+        if future.cancelled():
+            placeholder.set_result(None)
+        elif future.exception() is not None:
+            placeholder.set_exception(future.exception())
+        else:
+            placeholder.set_result(future.result())
+
+    def _add_dropped(self, name):
+        # Called with self.lock held
+        self.dropped[name] = self.dropped.get(name, 0) + 1
+        logger.debug(f"{name} callback dropped, max_running reached")
+
+    def _add_coalesced(self, name):
+        if name is None:
+            return
+        with self.lock:
+            self.coalesced[name] = self.coalesced.get(name, 0) + 1
+        logger.debug(f"{name} callback skipped, event no longer active")
+
+    def _add_latency(self, name, event, started):
+        if name is None:
+            return
+        sent_to_start = None if event._sent is None else started - event._sent
+        with self.lock:
+            if name not in self.stats:
+                self.stats[name] = CallbackStats()
+            self.stats[name].add_latency(
+                started - event._received, sent_to_start
+            )
 
     async def wait_until_finished(self, name):
-        futures = self.running_futures.get(name, [])
-        await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+        await self._wait_until(lambda: name not in self.running)
 
     async def wait_until_all_finished(self):
-        futures = set().union(*self.running_futures.values())
-        await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+        await self._wait_until(lambda: len(self.running) == 0)
+
+    async def _wait_until(self, is_finished):
+        with self.lock:
+            if is_finished():
+                return
+            event = asyncio.Event()
+            self.waiters.append(
+                (is_finished, asyncio.get_running_loop(), event)
+            )
+        await event.wait()
+
+    def _call_on_loop(self, function, *args):
+        """Completions are handled on the loop, one at a time"""
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(function, *args)
+                return
+            except RuntimeError:
+                pass  # Loop already closed, handle here instead
+        function(*args)
 
-    def _done(self, future):
+    def _done(self, name, future, stats_name=None):
         callback = None
+        woken = []
+        error = None
+        timing = None
+        if future is not None and not future.cancelled():
+            error = future.exception()
+            if error is None:
+                timing = future.result()
+            elif isinstance(error, SleepCancelledError):
+                error = None
 
-        with self.rlock:
-            name = self.future_to_name[future]
-            del self.future_to_name[future]
+        with self.lock:
+            if stats_name is not None:
+                if stats_name not in self.stats:
+                    self.stats[stats_name] = CallbackStats()
+                if error is not None:
+                    self.stats[stats_name].errors += 1
+                elif isinstance(timing, tuple):
+                    self.stats[stats_name].add(*timing)
 
-            self.running_futures[name].remove(future)
-            if len(self.running_futures[name]) == 0:
-                del self.running_futures[name]
+            self.running[name] -= 1
+            if self.running[name] == 0:
+                del self.running[name]
                 callback = self.finished_callbacks.pop(name, None)
+                waiters = []
+                for waiter in self.waiters:
+                    if waiter[0]():
+                        woken.append(waiter)
+                    else:
+                        waiters.append(waiter)
+                self.waiters = waiters
 
-            if (
-                not future.cancelled()
-                and future.exception() is not None
-                and not isinstance(future.exception(), SleepCancelledError)
-            ):
-                self.error_callback(future.exception())
-                return
-            self.done_callback(future)
+        if future is not None:
+            if error is not None:
+                self.error_callback(error)
+                callback = None
+            else:
+                self.done_callback(future)
 
         # Execute callback outside lock is not errored
         if callback is not None:
             callback()
+
+        # Waiters continue only after callbacks above have run
+        for _, loop, event in woken:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                logger.debug("Waiter loop closed")
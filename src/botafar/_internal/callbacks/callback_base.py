@@ -1,3 +1,4 @@
+from ..callback_executor import CallbackExecutor
 from ..function_utils import get_params, get_required_params
 from ..log_formatter import get_logger
 
@@ -35,6 +36,7 @@ class CallbackBase:
             CallbackBase._callbacks[name].append(function)
         else:
             CallbackBase._callbacks[name] = [function]
+        CallbackExecutor.register(function)
 
         logger.debug(f"{name} registered")
 
@@ -46,6 +48,7 @@ class CallbackBase:
             CallbackBase._callbacks[name].append(function)
         else:
             CallbackBase._callbacks[name] = [function]
+        CallbackExecutor.register(function)
 
         logger.debug(f"{name} registered")
 
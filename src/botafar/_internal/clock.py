@@ -0,0 +1,15 @@
+from time import perf_counter, perf_counter_ns
+
+# All botafar times come from this one clock. It is monotonic, so it does
+# not jump when the system time is corrected (NTP on a Raspberry Pi without
+# a real time clock), has the highest available resolution, and is system
+# wide, so worker processes can compare times with the main process.
+# Only differences of its values are meaningful
+now = perf_counter
+now_ns = perf_counter_ns
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def seconds_since(start_ns):
+    return (perf_counter_ns() - start_ns) / NS_PER_SECOND
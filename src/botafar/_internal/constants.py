@@ -4,7 +4,9 @@ from .string_utils import dim, key
 
 is_windows = system().lower() == "windows"
 
-KEYS = {
+# Binary input events refer to keys, senders and event names with their
+# index in these tuples, so new values can only be appended to the end
+KEY_LIST = (
     "A",
     "B",
     "C",
@@ -46,13 +48,109 @@ KEYS = {
     "LEFT",
     "DOWN",
     "RIGHT",
-}
+)
+
+# Analog axes of Axis controls, positive is up or right. Browsers map
+# touch joysticks and gamepad sticks to these
+AXIS_LIST = ("LEFT_X", "LEFT_Y", "RIGHT_X", "RIGHT_Y")
+
+SENDER_LIST = ("player", "owner")
+ORIGINS = frozenset({"keyboard", "screen"})
+
+# Every name an input event can have when it arrives from the browser
+INPUT_EVENT_NAME_LIST = (
+    "on_press",
+    "on_release",
+    "on_center",
+    "on_up",
+    "on_left",
+    "on_down",
+    "on_right",
+    "on_up_left",
+    "on_down_left",
+    "on_down_right",
+    "on_up_right",
+)
 
-SENDERS = {"player", "owner"}
-ORIGINS = {"keyboard", "screen"}
+KEYS = frozenset(KEY_LIST)
+AXES = frozenset(AXIS_LIST)
+SENDERS = frozenset(SENDER_LIST)
+INPUT_EVENT_NAMES = frozenset(INPUT_EVENT_NAME_LIST)
 
 INPUT_EVENT = "INPUT_EVENT"
+AXIS_EVENT = "AXIS_EVENT"
 SYSTEM_EVENT = "SYSTEM_EVENT"
+INTERNAL_MESSAGE = "INTERNAL_MESSAGE"
+INPUT_SNAPSHOT = "INPUT_SNAPSHOT"
+SYSTEM_EVENT_BATCH = "SYSTEM_EVENT_BATCH"
+
+# Outbound messages are sent at most once per interval (seconds). Prints
+# are merged, and dropped if the datachannel buffer is above the limit
+OUTBOUND_FLUSH_INTERVAL = 0.01
+OUTBOUND_BUFFER_LIMIT = 64 * 1024
+MAX_PRINTS_PER_FLUSH = 20
+
+# Worker threads of each CallbackExecutor lane, None uses the
+# ThreadPoolExecutor default. System lane needs room for the long running
+# stuck warning callbacks
+SYSTEM_WORKERS = 4
+RELEASE_WORKERS = 4
+USER_WORKERS = None
+
+# Seconds between callback stats logs, logged only on debug level
+STATS_LOG_INTERVAL = 60
+
+DEFAULT_ICE_SERVERS = ("stun:stun.l.google.com:19302",)
+
+# A standby peer connection with gathered ICE candidates and an offer is
+# kept ready while waiting for a browser. It is replaced every refresh
+# interval (seconds), before NAT bindings of its candidates expire, and not
+# used if older than the max age
+STANDBY_REFRESH_INTERVAL = 20
+STANDBY_MAX_AGE = 30
+
+# Seconds to wait for a restarted connection to open before the browser
+# session is reset, and the limits of the signaling reconnection backoff
+RESTART_TIMEOUT = 3
+RECONNECT_BACKOFF_MIN = 0.5
+RECONNECT_BACKOFF_MAX = 30
+
+# The link is dead when pings stop for longer than expected from the
+# measured ping interval and round trip time, but at least the min and at
+# most the max timeout (seconds). Max timeout is used until there are
+# enough ping intervals measured. Like the TCP retransmission timeout
+# (RFC 6298) the variance term is at least the margin. A ping within the
+# grace period after the timeout cancels the recovery before the
+# connection is touched, the grace is included in the max timeout
+LIVENESS_MIN_TIMEOUT = 0.3
+LIVENESS_MAX_TIMEOUT = 3
+LIVENESS_MIN_SAMPLES = 4
+LIVENESS_MIN_MARGIN = 0.2
+LIVENESS_GRACE = 0.2
+
+# Clock offset to the browser is taken from the ping with the lowest
+# round trip time out of this many latest pings
+CLOCK_SAMPLES = 8
+
+# Seconds an inline=True callback can block the event loop before warning
+INLINE_WARNING_SECONDS = 0.05
+
+# Timers of on_time, on_repeat, control time and inactive time are rounded
+# up to the resolution (seconds). A timer wheel round is resolution * slots
+TIMER_RESOLUTION = 0.001
+TIMER_SLOTS = 1024
+
+# Default filtering of Axis values: values inside the dead zone are zero,
+# and smaller changes than the min delta do not start callbacks
+AXIS_DEAD_ZONE = 0.05
+AXIS_MIN_DELTA = 0.01
+
+# Outputs are updated this many times per second, and reach their target
+# when closer than the tolerance. On exit the update thread is waited for
+# this many seconds to set the safe values
+OUTPUT_UPDATE_FREQ = 50
+OUTPUT_TOLERANCE = 0.001
+OUTPUT_CLOSE_TIMEOUT = 1
 
 LISTEN_BROWSER_MESSAGE = (
     f"Browser connected, press " f"{key('Ctrl')} + {key('C')} to exit."
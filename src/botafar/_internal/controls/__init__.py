@@ -2,3 +2,4 @@ from .control_base import ControlBase  # noqa: F401 isort: skip
 from .button import Button  # noqa: F401 isort: skip
 from .joystick import Joystick  # noqa: F401 isort: skip
 from .slider import Slider  # noqa: F401 isort: skip
+from .axis import Axis  # noqa: F401 isort: skip
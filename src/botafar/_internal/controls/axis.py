@@ -0,0 +1,228 @@
+from ..clock import now
+from ..constants import AXES, AXIS_DEAD_ZONE, AXIS_LIST, AXIS_MIN_DELTA
+from ..events import AxisEvent
+from ..function_utils import get_function_title, takes_parameter
+from ..scheduler import scheduler
+from .control_base import ControlBase
+from .control_decorator import ControlDecorator, get_control_decorator
+
+
+def filter_value(value, dead_zone, step):
+    """Zero inside the dead zone, scaled to start from zero outside of it,
+    and rounded to a multiple of 'step' if given"""
+    magnitude = min(abs(value), 1.0)
+    if magnitude <= dead_zone:
+        return 0.0
+    magnitude = (magnitude - dead_zone) / (1 - dead_zone)
+    if step is not None:
+        # Second round removes float noise, such as 0.30000000000000004
+        magnitude = min(round(round(magnitude / step) * step, 9), 1.0)
+    return magnitude if value > 0 else -magnitude
+
+
+class Axis(ControlBase):
+    def __init__(
+        self,
+        axis,
+        dead_zone=AXIS_DEAD_ZONE,
+        step=None,
+        min_delta=AXIS_MIN_DELTA,
+        min_interval=0,
+        owner_only=False,
+        backend="thread",
+    ):
+        assert (
+            isinstance(dead_zone, (int, float)) and 0 <= dead_zone < 1
+        ), f"dead_zone should be at least 0 and less than 1, not {dead_zone}"
+        assert step is None or (
+            isinstance(step, (int, float)) and 0 < step <= 1
+        ), f"step should be None or more than 0 and at most 1, not {step}"
+        assert (
+            isinstance(min_delta, (int, float)) and min_delta >= 0
+        ), f"min_delta should be at least 0, not {min_delta}"
+        assert (
+            isinstance(min_interval, (int, float)) and min_interval >= 0
+        ), f"min_interval should be at least 0 seconds, not {min_interval}"
+
+        self._key = axis
+        self._dead_zone = dead_zone
+        self._step = step
+        self._min_delta = min_delta
+        self._min_interval = min_interval
+
+        start_event = AxisEvent("on_center", "owner", axis, 0.0)
+        start_event._set_time(-1)
+        start_event._set_active_method(lambda: False)
+
+        class OnMove(ControlDecorator):
+            def verify_params_and_set_flags(self_, params):  # noqa: N805
+                if takes_parameter(
+                    params, "event", error_name=self_.decorator_name
+                ):
+                    self_.takes_event = True
+
+            def wrap(self_, func):  # noqa: N805
+                title = self_.func_title
+                self._add_key_to_has_callbacks(self._key, title, 3)
+                self._add_state_callback("on_move", func, self_.options)
+                return func
+
+        class OnCenter(ControlDecorator):
+            def verify_params_and_set_flags(self_, params):  # noqa: N805
+                if takes_parameter(
+                    params, "event", error_name=self_.decorator_name
+                ):
+                    self_.takes_event = True
+
+            def wrap(self_, func):  # noqa: N805
+                title = self_.func_title
+                if title is not None:
+                    title = f"{title} (release)"
+                self._add_key_to_has_callbacks(self._key, title, 1)
+                self._add_state_callback("on_center", func, self_.options)
+                return func
+
+        class OnAny(ControlDecorator):
+            def verify_params_and_set_flags(self_, params):  # noqa: N805
+                if takes_parameter(
+                    params, "event", error_name=self_.decorator_name
+                ):
+                    self_.takes_event = True
+
+            def wrap(self_, func):  # noqa: N805
+                if not self._takes_event(func):
+                    raise RuntimeError(
+                        f"{self_.decorator_name} callback function must take "
+                        "'event' as the first parameter."
+                    )
+
+                title = self_.func_title
+                self._add_key_to_has_callbacks(self._key, title, 2)
+                self._add_state_callback("on_move", func, self_.options)
+                self._add_state_callback("on_center", func, self_.options)
+                return func
+
+        self._on_move_class = OnMove
+        self._on_center_class = OnCenter
+        self._on_any_class = OnAny
+
+        self._reset_state()
+
+        super().__init__(
+            "axis",
+            [axis],
+            owner_only,
+            start_event,
+            None,
+            1,
+            backend,
+        )
+        # Browsers can filter the same way before sending
+        self._data["filter"] = {
+            "deadZone": dead_zone,
+            "step": step,
+            "minDelta": min_delta,
+            "minInterval": min_interval,
+        }
+
+    def on_move(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_move_class, title, "on_move", func, options
+        )
+
+    def on_center(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_center_class, title, "on_center", func, options
+        )
+
+    def on_any(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_any_class, title, "on_any", func, options
+        )
+
+    def _check_key(self, key):
+        if key not in AXES:
+            raise RuntimeError(
+                f'Unknown axis "{key}", use one of {list(AXIS_LIST)}'
+            )
+
+    def _reset_state(self):
+        self._value = 0.0
+        self._latest_change = None  # clock.now() of the latest value
+        self._pending = None  # Latest event held back by min_interval
+        self._flush_timer = None
+
+    def _get_release_callbacks_and_event(self, time):
+        self._cancel_flush()
+        if self.is_center:
+            return [], None
+
+        release_event = AxisEvent(
+            None, self.latest_event.sender, self._key, 0.0
+        )
+        release_event._set_time(time)
+        return self._get_instance_callbacks(release_event), release_event
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def is_center(self):
+        return self._value == 0
+
+    def _cancel_flush(self):
+        self._pending = None
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _flush(self):
+        """Delivers the value held back by min_interval, on the loop"""
+        event = self._pending
+        self._pending = None
+        self._flush_timer = None
+        if event is not None and ControlBase._process_input_event is not None:
+            ControlBase._process_input_event(event)
+
+    def _process_event(self, event):
+        """Returns: ignore, updated event"""
+        value = filter_value(event.value, self._dead_zone, self._step)
+        if value == self._value:
+            self._cancel_flush()  # Back to the value callbacks have
+            return True, event
+
+        # Center and the ends always pass the delta, center also the interval
+        if (
+            value != 0
+            and value != 1
+            and value != -1
+            and abs(value - self._value) < self._min_delta
+        ):
+            return True, event
+
+        time = now()
+        if (
+            value != 0
+            and self._latest_change is not None
+            and time - self._latest_change < self._min_interval
+        ):
+            self._pending = event
+            if self._flush_timer is None:
+                self._flush_timer = scheduler.call_at(
+                    self._latest_change + self._min_interval, self._flush
+                )
+            return True, event
+
+        self._cancel_flush()
+        self._value = value
+        self._latest_change = time
+        event._value = value
+        event._name = "on_center" if value == 0 else "on_move"
+        return False, event
+
+    def __repr__(self):
+        return f'Axis("{self._key}"{self._sender_origin_repr()})'
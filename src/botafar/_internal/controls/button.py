@@ -1,7 +1,7 @@
-from ..decorators import DecoratorBase, get_decorator
 from ..events import Event
 from ..function_utils import get_function_title, takes_parameter
 from .control_base import ControlBase
+from .control_decorator import ControlDecorator, get_control_decorator
 
 
 class Button(ControlBase):
@@ -11,6 +11,7 @@ class Button(ControlBase):
         alt=None,
         owner_only=False,
         amount=1,
+        backend="thread",
     ):
         start_event = Event("on_release", "owner", key)
         start_event._set_time(-1)
@@ -21,7 +22,7 @@ class Button(ControlBase):
         # and this was needed?...
         self._key = key
 
-        class OnPress(DecoratorBase):
+        class OnPress(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -31,10 +32,10 @@ class Button(ControlBase):
             def wrap(self_, func):  # noqa: N805
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._key, title, 3)
-                self._add_state_callback("on_press", func)
+                self._add_state_callback("on_press", func, self_.options)
                 return func
 
-        class OnRelease(DecoratorBase):
+        class OnRelease(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -46,10 +47,10 @@ class Button(ControlBase):
                 if title is not None:
                     title = f"{title} (release)"
                 self._add_key_to_has_callbacks(self._key, title, 1)
-                self._add_state_callback("on_release", func)
+                self._add_state_callback("on_release", func, self_.options)
                 return func
 
-        class OnAny(DecoratorBase):
+        class OnAny(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -65,8 +66,8 @@ class Button(ControlBase):
 
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._key, title, 2)
-                self._add_state_callback("on_press", func)
-                self._add_state_callback("on_release", func)
+                self._add_state_callback("on_press", func, self_.options)
+                self._add_state_callback("on_release", func, self_.options)
                 return func
 
         self._on_press_class = OnPress
@@ -83,23 +84,26 @@ class Button(ControlBase):
             start_event,
             alt,
             amount,
+            backend,
         )
 
-    def on_press(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_press_class, title, "on_press", True)(
-            func
+    def on_press(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_press_class, title, "on_press", func, options
         )
 
-    def on_release(self, func):
-        title = get_function_title(func)
-        return get_decorator(
-            self._on_release_class, title, "on_release", True
-        )(func)
+    def on_release(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_release_class, title, "on_release", func, options
+        )
 
-    def on_any(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_any_class, title, "on_any", True)(func)
+    def on_any(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_any_class, title, "on_any", func, options
+        )
 
     def _get_release_callbacks_and_event(self, time):
         if self.is_released:
@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 from ..callback_executor import CallbackExecutor
 from ..constants import KEYS
 from ..function_utils import get_params, takes_parameter
+from ..process_backend import BACKENDS, PROCESS
 
 SENDER_REPR = {
     "any": "",
@@ -13,6 +14,8 @@ SENDER_REPR = {
 class ControlBase(ABC):
     _event_callbacks = {}
     _controls = []
+    # Set by ServerEventProsessor, for input events controls deliver later
+    _process_input_event = None
 
     def __init__(
         self,
@@ -22,6 +25,7 @@ class ControlBase(ABC):
         start_event,
         alt,
         amount,
+        backend,
     ):
         # TODO makey assertions key makes sense, others type boolean
         # Make sure makes sense
@@ -29,6 +33,10 @@ class ControlBase(ABC):
         self._keys = keys
         self._alt = alt
         self._sender = "owner" if owner_only else "any"
+        assert (
+            backend in BACKENDS
+        ), f"backend should be one of {list(BACKENDS)}, not '{backend}'"
+        self._backend = backend
         self._latest_event = start_event
         self._alternative_map = {}
         self._state_callbacks = {}
@@ -100,7 +108,7 @@ class ControlBase(ABC):
                     break
             self._data["keys"][index]["allKeys"].append(alternative)
 
-    def _register_key(self, key):
+    def _check_key(self, key):
         if key not in KEYS:
             if isinstance(key, str) and key.upper() in KEYS:
                 raise RuntimeError(
@@ -113,6 +121,8 @@ class ControlBase(ABC):
                     f'Unknown key "{key}"'
                 )  # TODO link to allowed keys
 
+    def _register_key(self, key):
+        self._check_key(key)
         new_event_callback_keys = self._get_event_callback_keys(
             key, self._sender
         )
@@ -138,6 +148,10 @@ class ControlBase(ABC):
     def _get_release_callbacks_and_event(self, time):
         pass
 
+    def _get_held_keys(self):
+        """Keys held down after the latest event, None if not known"""
+        return None
+
     @abstractmethod
     def __repr__(self):
         pass
@@ -162,14 +176,34 @@ class ControlBase(ABC):
     def _takes_event(function):
         return takes_parameter(get_params(function), "event")
 
-    def _add_state_callback(self, name, function):
+    def _add_state_callback(self, name, function, options=None):
         if self._takes_event(function):  # Also validates other parameters
             CallbackExecutor.add_to_takes_event(function)
 
+        if options is not None and options.get("skip_stale", False):
+            CallbackExecutor.add_to_skips_stale(function)
+
+        if options is not None and options.get("inline", False):
+            CallbackExecutor.add_to_inline(function)
+        elif options is not None and "backend" in options:
+            if options["backend"] == PROCESS:
+                CallbackExecutor.add_to_process_backend(function)
+        elif self._backend == PROCESS:
+            CallbackExecutor.add_to_process_backend(function)
+
+        if options is not None and options.get("max_running") is not None:
+            CallbackExecutor.add_limit(
+                function,
+                options["max_running"],
+                options.get("overflow", "queue"),
+                options.get("max_pending"),
+            )
+
         if name in self._state_callbacks:
             self._state_callbacks[name].append(function)
         else:
             self._state_callbacks[name] = [function]
+        CallbackExecutor.register(function)
 
         self._callbacks_added = True
 
@@ -0,0 +1,23 @@
+from ..callback_executor import verify_options
+from ..decorators import DecoratorBase, get_decorator
+
+
+class ControlDecorator(DecoratorBase):
+    def __init__(self, title, decorator_name, *args, **kwargs):
+        verify_options(decorator_name, kwargs)
+        self.options = kwargs
+        super().__init__(title, decorator_name, *args, **kwargs)
+
+
+def get_control_decorator(cls, title, name, func, options):
+    if len(func) == 0 and len(options) == 0:
+        raise TypeError(f"Remove empty parentheses '()' from @{name}()")
+
+    if len(options) == 0:
+        return get_decorator(cls, title, name, True)(*func)
+
+    assert len(func) <= 1, f"{name} got too many arguments: {func}"
+    assert len(func) == 0 or (
+        isinstance(func[0], (classmethod, staticmethod)) or callable(func[0])
+    ), f"Cannot use {name} with a non-callable object {func[0]}"
+    return get_decorator(cls, title, name, False)(*func, **options)
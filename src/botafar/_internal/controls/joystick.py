@@ -1,8 +1,8 @@
-from ..decorators import DecoratorBase, get_decorator
 from ..events import Event
 from ..function_utils import get_function_title, takes_parameter
 from ..log_formatter import get_logger
 from .control_base import ControlBase
+from .control_decorator import ControlDecorator, get_control_decorator
 
 logger = get_logger()
 
@@ -38,22 +38,29 @@ DIAGONAL_RESOLVERS = {
 }
 
 
+# Pressed key bits in the order of the keys: up, left, down, right
+UP, LEFT, DOWN, RIGHT = 1, 2, 4, 8
+KEY_BITS = (UP, LEFT, DOWN, RIGHT)
+
+# Pressed keys matching each direction, set by direction events
+DIRECTION_MASKS = {
+    "on_center": 0,
+    "on_up": UP,
+    "on_left": LEFT,
+    "on_down": DOWN,
+    "on_right": RIGHT,
+    "on_up_left": UP | LEFT,
+    "on_down_left": DOWN | LEFT,
+    "on_down_right": DOWN | RIGHT,
+    "on_up_right": UP | RIGHT,
+}
+
+
 # NOTE: all changes here should be reflected on frontend as well
-def parse_is_down(is_down, has_diagonals, latest_update_direction):
-    # Get horizontal, vertical values
-    if is_down["up"] and not is_down["down"]:
-        vertical_value = 1
-    elif not is_down["up"] and is_down["down"]:
-        vertical_value = -1
-    else:  # Both or neither
-        vertical_value = 0
-
-    if is_down["left"] and not is_down["right"]:
-        horizontal_value = -1
-    elif not is_down["left"] and is_down["right"]:
-        horizontal_value = 1
-    else:  # Both or neither
-        horizontal_value = 0
+def parse_is_down(mask, has_diagonals, latest_update_direction):
+    # Get horizontal, vertical values, both or neither is 0
+    vertical_value = bool(mask & UP) - bool(mask & DOWN)
+    horizontal_value = bool(mask & RIGHT) - bool(mask & LEFT)
 
     # Parse new direction
     direction = DIRECTIONS[horizontal_value, vertical_value]
@@ -77,6 +84,19 @@ def parse_is_down(is_down, has_diagonals, latest_update_direction):
     return direction, new_update_direction
 
 
+# has_diagonals -> latest update direction -> pressed key mask ->
+# (direction, new update direction), so events are only lookups
+DIRECTION_TABLES = {
+    has_diagonals: {
+        latest: tuple(
+            parse_is_down(mask, has_diagonals, latest) for mask in range(16)
+        )
+        for latest in (None, "vertical", "horizontal")
+    }
+    for has_diagonals in (False, True)
+}
+
+
 class Joystick(ControlBase):
     def __init__(  # noqa: C901
         self,
@@ -88,12 +108,13 @@ class Joystick(ControlBase):
         alt=None,
         owner_only=False,
         amount=1,
+        backend="thread",
     ):
         start_event = Event("on_center", "owner", up_key)
         start_event._set_time(-1)
         start_event._set_active_method(lambda: False)
 
-        class OnCenter(DecoratorBase):
+        class OnCenter(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -108,10 +129,10 @@ class Joystick(ControlBase):
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 1)
                 self._add_key_to_has_callbacks(self._keys_copy[2], title, 1)
                 self._add_key_to_has_callbacks(self._keys_copy[3], title, 1)
-                self._add_state_callback("on_center", func)
+                self._add_state_callback("on_center", func, self_.options)
                 return func
 
-        class OnUp(DecoratorBase):
+        class OnUp(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -121,10 +142,10 @@ class Joystick(ControlBase):
             def wrap(self_, func):  # noqa: N805
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 3)
-                self._add_state_callback("on_up", func)
+                self._add_state_callback("on_up", func, self_.options)
                 return func
 
-        class OnLeft(DecoratorBase):
+        class OnLeft(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -134,10 +155,10 @@ class Joystick(ControlBase):
             def wrap(self_, func):  # noqa: N805
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 3)
-                self._add_state_callback("on_left", func)
+                self._add_state_callback("on_left", func, self_.options)
                 return func
 
-        class OnDown(DecoratorBase):
+        class OnDown(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -147,10 +168,10 @@ class Joystick(ControlBase):
             def wrap(self_, func):  # noqa: N805
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[2], title, 3)
-                self._add_state_callback("on_down", func)
+                self._add_state_callback("on_down", func, self_.options)
                 return func
 
-        class OnRight(DecoratorBase):
+        class OnRight(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -160,10 +181,10 @@ class Joystick(ControlBase):
             def wrap(self_, func):  # noqa: N805
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[3], title, 3)
-                self._add_state_callback("on_right", func)
+                self._add_state_callback("on_right", func, self_.options)
                 return func
 
-        class OnUpLeft(DecoratorBase):
+        class OnUpLeft(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -178,10 +199,10 @@ class Joystick(ControlBase):
                 if title is not None:
                     title = f"{title} (combination)"
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 0)
-                self._add_state_callback("on_up_left", func)
+                self._add_state_callback("on_up_left", func, self_.options)
                 return func
 
-        class OnDownLeft(DecoratorBase):
+        class OnDownLeft(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -196,10 +217,10 @@ class Joystick(ControlBase):
                 if title is not None:
                     title = f"{title} (combination)"
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 0)
-                self._add_state_callback("on_down_left", func)
+                self._add_state_callback("on_down_left", func, self_.options)
                 return func
 
-        class OnDownRight(DecoratorBase):
+        class OnDownRight(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -214,10 +235,10 @@ class Joystick(ControlBase):
                 if title is not None:
                     title = f"{title} (combination)"
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 0)
-                self._add_state_callback("on_down_right", func)
+                self._add_state_callback("on_down_right", func, self_.options)
                 return func
 
-        class OnUpRight(DecoratorBase):
+        class OnUpRight(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -232,10 +253,10 @@ class Joystick(ControlBase):
                 if title is not None:
                     title = f"{title} (combination)"
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 0)
-                self._add_state_callback("on_up_right", func)
+                self._add_state_callback("on_up_right", func, self_.options)
                 return func
 
-        class OnAny(DecoratorBase):
+        class OnAny(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -254,15 +275,15 @@ class Joystick(ControlBase):
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 2)
                 self._add_key_to_has_callbacks(self._keys_copy[2], title, 2)
                 self._add_key_to_has_callbacks(self._keys_copy[3], title, 2)
-                self._add_state_callback("on_center", func)
-                self._add_state_callback("on_up", func)
-                self._add_state_callback("on_left", func)
-                self._add_state_callback("on_down", func)
-                self._add_state_callback("on_right", func)
-                self._add_state_callback("on_up_left", func)
-                self._add_state_callback("on_down_left", func)
-                self._add_state_callback("on_down_right", func)
-                self._add_state_callback("on_up_right", func)
+                self._add_state_callback("on_center", func, self_.options)
+                self._add_state_callback("on_up", func, self_.options)
+                self._add_state_callback("on_left", func, self_.options)
+                self._add_state_callback("on_down", func, self_.options)
+                self._add_state_callback("on_right", func, self_.options)
+                self._add_state_callback("on_up_left", func, self_.options)
+                self._add_state_callback("on_down_left", func, self_.options)
+                self._add_state_callback("on_down_right", func, self_.options)
+                self._add_state_callback("on_up_right", func, self_.options)
                 return func
 
         self._on_center_class = OnCenter
@@ -279,6 +300,9 @@ class Joystick(ControlBase):
         # Some keys keeps getting missing from _keys... This is a workaround.
         self._keys_copy = [up_key, left_key, down_key, right_key]
         self._has_diagonals = False
+        self._key_bits = {}
+        for key, bit in zip(self._keys_copy, KEY_BITS):
+            self._key_bits.setdefault(key, bit)
 
         # Get the initial state
         self._reset_state()
@@ -290,74 +314,85 @@ class Joystick(ControlBase):
             start_event,
             alt,
             amount,
+            backend,
         )
 
         if diagonals:
             self._change_type("joystick8")
             self._has_diagonals = True
 
-    def on_center(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_center_class, title, "on_center", True)(
-            func
+    def on_center(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_center_class, title, "on_center", func, options
+        )
+
+    def on_up(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_up_class, title, "on_up", func, options
+        )
+
+    def on_left(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_left_class, title, "on_left", func, options
+        )
+
+    def on_down(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_down_class, title, "on_down", func, options
+        )
+
+    def on_right(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_right_class, title, "on_right", func, options
         )
 
-    def on_up(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_up_class, title, "on_up", True)(func)
+    def on_up_left(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_up_left_class, title, "on_up_left", func, options
+        )
 
-    def on_left(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_left_class, title, "on_left", True)(func)
+    def on_down_left(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_down_left_class, title, "on_down_left", func, options
+        )
 
-    def on_down(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_down_class, title, "on_down", True)(func)
+    def on_down_right(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_down_right_class, title, "on_down_right", func, options
+        )
 
-    def on_right(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_right_class, title, "on_right", True)(
-            func
+    def on_up_right(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_up_right_class, title, "on_up_right", func, options
         )
 
-    def on_up_left(self, func):
-        title = get_function_title(func)
-        return get_decorator(
-            self._on_up_left_class, title, "on_up_left", True
-        )(func)
-
-    def on_down_left(self, func):
-        title = get_function_title(func)
-        return get_decorator(
-            self._on_down_left_class, title, "on_down_left", True
-        )(func)
-
-    def on_down_right(self, func):
-        title = get_function_title(func)
-        return get_decorator(
-            self._on_down_right_class, title, "on_down_right", True
-        )(func)
-
-    def on_up_right(self, func):
-        title = get_function_title(func)
-        return get_decorator(
-            self._on_up_right_class, title, "on_up_right", True
-        )(func)
-
-    def on_any(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_any_class, title, "on_any", True)(func)
+    def on_any(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_any_class, title, "on_any", func, options
+        )
 
     def _reset_state(self):
         self._latest_update_direction = None
-        self._is_down = {
-            "up": False,
-            "left": False,
-            "down": False,
-            "right": False,
-        }
+        self._is_down_mask = 0
         self._state = "on_center"
 
+    def _get_held_keys(self):
+        return {
+            key
+            for key, bit in self._key_bits.items()
+            if self._is_down_mask & bit
+        }
+
     def _get_release_callbacks_and_event(self, time):
         no_release_cbs = self.is_center
 
@@ -406,111 +441,29 @@ class Joystick(ControlBase):
     def is_up_right(self):
         return self._state == "on_up_right"
 
-    def _process_event(self, event):  # noqa:C901
+    def _process_event(self, event):
         """Returns: ignore, updated event"""
 
         # Update is down state, get direction
-        if event.name in ["on_release", "on_press"]:
-            if event.name == "on_release":
-                if event._key == self._keys_copy[0]:
-                    self._is_down["up"] = False
-                elif event._key == self._keys_copy[1]:
-                    self._is_down["left"] = False
-                elif event._key == self._keys_copy[2]:
-                    self._is_down["down"] = False
-                elif event._key == self._keys_copy[3]:
-                    self._is_down["right"] = False
-                else:
-                    raise RuntimeError("Should not happen")
-            elif event.name == "on_press":
-                if event._key == self._keys_copy[0]:
-                    self._is_down["up"] = True
-                elif event._key == self._keys_copy[1]:
-                    self._is_down["left"] = True
-                elif event._key == self._keys_copy[2]:
-                    self._is_down["down"] = True
-                elif event._key == self._keys_copy[3]:
-                    self._is_down["right"] = True
-                else:
-                    raise RuntimeError("Should not happen")
-            else:
+        name = event.name
+        if name == "on_press" or name == "on_release":
+            bit = self._key_bits.get(event._key)
+            if bit is None:
                 raise RuntimeError("Should not happen")
+            if name == "on_press":
+                self._is_down_mask |= bit
+            else:
+                self._is_down_mask &= ~bit
 
-            direction, new_update_direction = parse_is_down(
-                self._is_down,
-                self._has_diagonals,
-                self._latest_update_direction,
-            )
-            self._latest_update_direction = new_update_direction
-
+            direction, self._latest_update_direction = DIRECTION_TABLES[
+                self._has_diagonals
+            ][self._latest_update_direction][self._is_down_mask]
         else:
-            if event.name == "on_center":
-                self._is_down = {
-                    "up": False,
-                    "left": False,
-                    "down": False,
-                    "right": False,
-                }
-            elif event.name == "on_up":
-                self._is_down = {
-                    "up": True,
-                    "left": False,
-                    "down": False,
-                    "right": False,
-                }
-            elif event.name == "on_left":
-                self._is_down = {
-                    "up": False,
-                    "left": True,
-                    "down": False,
-                    "right": False,
-                }
-            elif event.name == "on_down":
-                self._is_down = {
-                    "up": False,
-                    "left": False,
-                    "down": True,
-                    "right": False,
-                }
-            elif event.name == "on_right":
-                self._is_down = {
-                    "up": False,
-                    "left": False,
-                    "down": False,
-                    "right": True,
-                }
-            elif event.name == "on_up_left":
-                self._is_down = {
-                    "up": True,
-                    "left": True,
-                    "down": False,
-                    "right": False,
-                }
-            elif event.name == "on_down_left":
-                self._is_down = {
-                    "up": False,
-                    "left": True,
-                    "down": True,
-                    "right": False,
-                }
-            elif event.name == "on_down_right":
-                self._is_down = {
-                    "up": False,
-                    "left": False,
-                    "down": True,
-                    "right": True,
-                }
-            elif event.name == "on_up_right":
-                self._is_down = {
-                    "up": True,
-                    "left": False,
-                    "down": False,
-                    "right": True,
-                }
-            else:
+            mask = DIRECTION_MASKS.get(name)
+            if mask is None:
                 raise RuntimeError("Should not happen")
-
-            direction = event.name
+            self._is_down_mask = mask
+            direction = name
 
         # Ignore if the same as latest
         ignore = direction == self._state
@@ -1,8 +1,8 @@
-from ..decorators import DecoratorBase, get_decorator
 from ..events import Event
 from ..function_utils import get_function_title, takes_parameter
 from ..log_formatter import get_logger
 from .control_base import ControlBase
+from .control_decorator import ControlDecorator, get_control_decorator
 
 logger = get_logger()
 
@@ -34,6 +34,30 @@ DIRECTIONS = {
     ("slider_vertical", 1): "on_down",
 }
 
+# Pressed key bits in the order of the keys: up or left, down or right
+UP_OR_LEFT, DOWN_OR_RIGHT = 1, 2
+
+# Pressed keys matching each direction, set by direction events
+DIRECTION_MASKS = {
+    "on_center": 0,
+    "on_up": UP_OR_LEFT,
+    "on_left": UP_OR_LEFT,
+    "on_down": DOWN_OR_RIGHT,
+    "on_right": DOWN_OR_RIGHT,
+}
+
+# slider type -> pressed key mask -> direction, both or neither is center
+DIRECTION_TABLES = {
+    slider_type: tuple(
+        DIRECTIONS[
+            slider_type,
+            bool(mask & DOWN_OR_RIGHT) - bool(mask & UP_OR_LEFT),
+        ]
+        for mask in range(4)
+    )
+    for slider_type in ("slider_horizontal", "slider_vertical")
+}
+
 
 def quess_slider_type(up_or_left_key, down_or_right_key, alt):  # noqa:C901
     """An over engineered way to quess a Slider orientation :D"""
@@ -230,6 +254,7 @@ class Slider(ControlBase):
         orientation=None,
         owner_only=False,
         amount=1,
+        backend="thread",
     ):
         assert orientation in [None, "horizontal", "vertical"]
         self._orientation = orientation
@@ -238,7 +263,7 @@ class Slider(ControlBase):
         start_event._set_time(-1)
         start_event._set_active_method(lambda: False)
 
-        class OnCenter(DecoratorBase):
+        class OnCenter(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -251,10 +276,10 @@ class Slider(ControlBase):
                     title = f"{title} (release)"
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 1)
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 1)
-                self._add_state_callback("on_center", func)
+                self._add_state_callback("on_center", func, self_.options)
                 return func
 
-        class OnUp(DecoratorBase):
+        class OnUp(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -279,10 +304,10 @@ class Slider(ControlBase):
 
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 3)
-                self._add_state_callback("on_up", func)
+                self._add_state_callback("on_up", func, self_.options)
                 return func
 
-        class OnLeft(DecoratorBase):
+        class OnLeft(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -308,10 +333,10 @@ class Slider(ControlBase):
 
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 3)
-                self._add_state_callback("on_left", func)
+                self._add_state_callback("on_left", func, self_.options)
                 return func
 
-        class OnDown(DecoratorBase):
+        class OnDown(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -336,10 +361,10 @@ class Slider(ControlBase):
 
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 3)
-                self._add_state_callback("on_down", func)
+                self._add_state_callback("on_down", func, self_.options)
                 return func
 
-        class OnRight(DecoratorBase):
+        class OnRight(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -364,10 +389,10 @@ class Slider(ControlBase):
 
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 3)
-                self._add_state_callback("on_right", func)
+                self._add_state_callback("on_right", func, self_.options)
                 return func
 
-        class OnAny(DecoratorBase):
+        class OnAny(ControlDecorator):
             def verify_params_and_set_flags(self_, params):  # noqa: N805
                 if takes_parameter(
                     params, "event", error_name=self_.decorator_name
@@ -384,11 +409,11 @@ class Slider(ControlBase):
                 title = self_.func_title
                 self._add_key_to_has_callbacks(self._keys_copy[0], title, 2)
                 self._add_key_to_has_callbacks(self._keys_copy[1], title, 2)
-                self._add_state_callback("on_center", func)
-                self._add_state_callback("on_up", func)
-                self._add_state_callback("on_left", func)
-                self._add_state_callback("on_down", func)
-                self._add_state_callback("on_right", func)
+                self._add_state_callback("on_center", func, self_.options)
+                self._add_state_callback("on_up", func, self_.options)
+                self._add_state_callback("on_left", func, self_.options)
+                self._add_state_callback("on_down", func, self_.options)
+                self._add_state_callback("on_right", func, self_.options)
                 return func
 
         self._on_center_class = OnCenter
@@ -400,6 +425,9 @@ class Slider(ControlBase):
 
         # Some keys keeps getting missing from _keys... This is a workaround.
         self._keys_copy = [up_or_left_key, down_or_right_key]
+        self._key_bits = {}
+        for key, bit in zip(self._keys_copy, (UP_OR_LEFT, DOWN_OR_RIGHT)):
+            self._key_bits.setdefault(key, bit)
 
         # Get the initial state
         self._reset_state()
@@ -421,44 +449,57 @@ class Slider(ControlBase):
             start_event,
             alt,
             amount,
+            backend,
         )
 
-    def on_center(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_center_class, title, "on_center", True)(
-            func
+    def on_center(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_center_class, title, "on_center", func, options
         )
 
-    def on_up(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_up_class, title, "on_up", True)(func)
+    def on_up(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_up_class, title, "on_up", func, options
+        )
 
-    def on_left(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_left_class, title, "on_left", True)(func)
+    def on_left(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_left_class, title, "on_left", func, options
+        )
 
-    def on_down(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_down_class, title, "on_down", True)(func)
+    def on_down(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_down_class, title, "on_down", func, options
+        )
 
-    def on_right(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_right_class, title, "on_right", True)(
-            func
+    def on_right(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_right_class, title, "on_right", func, options
         )
 
-    def on_any(self, func):
-        title = get_function_title(func)
-        return get_decorator(self._on_any_class, title, "on_any", True)(func)
+    def on_any(self, *func, **options):
+        title = get_function_title(func[0]) if len(func) >= 1 else None
+        return get_control_decorator(
+            self._on_any_class, title, "on_any", func, options
+        )
 
     def _reset_state(self):
         self._latest_update_direction = None
-        self._is_down = {
-            "up_or_left": False,
-            "down_or_right": False,
-        }
+        self._is_down_mask = 0
         self._state = "on_center"
 
+    def _get_held_keys(self):
+        return {
+            key
+            for key, bit in self._key_bits.items()
+            if self._is_down_mask & bit
+        }
+
     def _get_release_callbacks_and_event(self, time):
         no_release_cbs = self.is_center
 
@@ -491,64 +532,29 @@ class Slider(ControlBase):
     def is_right(self):
         return self._state == "on_right"
 
-    def _process_event(self, event):  # noqa:C901
+    def _process_event(self, event):
         """Returns: ignore, updated event"""
 
         # Update is down state, get direction
-        if event.name in ["on_release", "on_press"]:
-            if event.name == "on_release":
-                if event._key == self._keys_copy[0]:
-                    self._is_down["up_or_left"] = False
-                elif event._key == self._keys_copy[1]:
-                    self._is_down["down_or_right"] = False
-                else:
-                    raise RuntimeError("Should not happen")
-            elif event.name == "on_press":
-                if event._key == self._keys_copy[0]:
-                    self._is_down["up_or_left"] = True
-                elif event._key == self._keys_copy[1]:
-                    self._is_down["down_or_right"] = True
-                else:
-                    raise RuntimeError("Should not happen")
-            else:
+        name = event.name
+        if name == "on_press" or name == "on_release":
+            bit = self._key_bits.get(event._key)
+            if bit is None:
                 raise RuntimeError("Should not happen")
+            if name == "on_press":
+                self._is_down_mask |= bit
+            else:
+                self._is_down_mask &= ~bit
 
-            # Get numerical value
-            if (
-                self._is_down["up_or_left"]
-                and not self._is_down["down_or_right"]
-            ):
-                numerical_value = -1
-            elif (
-                not self._is_down["up_or_left"]
-                and self._is_down["down_or_right"]
-            ):
-                numerical_value = 1
-            else:  # Both or neither
-                numerical_value = 0
-
-            # Parse new direction
-            direction = DIRECTIONS[self._data["type"], numerical_value]
+            direction = DIRECTION_TABLES[self._data["type"]][
+                self._is_down_mask
+            ]
         else:
-            if event.name == "on_center":
-                self._is_down = {
-                    "up_or_left": False,
-                    "down_or_right": False,
-                }
-            elif event.name in ["on_up", "on_left"]:
-                self._is_down = {
-                    "up_or_left": True,
-                    "down_or_right": False,
-                }
-            elif event.name in ["on_down", "on_right"]:
-                self._is_down = {
-                    "up_or_left": False,
-                    "down_or_right": True,
-                }
-            else:
+            mask = DIRECTION_MASKS.get(name)
+            if mask is None:
                 raise RuntimeError("Should not happen")
-
-            direction = event.name
+            self._is_down_mask = mask
+            direction = name
 
         # Ignore if the same as latest
         ignore = direction == self._state
@@ -0,0 +1,58 @@
+from collections import deque
+
+from .. import clock
+from ..constants import CLOCK_SAMPLES
+
+# Browsers can send times in milliseconds modulo 2**32 to save space
+TIME_MODULO = 2**32
+
+
+class BrowserClock:
+    """Maps browser times to bot clock times
+
+    Pings carry the browser send time in milliseconds and the round trip
+    time the browser measured from the previous pong. Each ping gives an
+    offset estimate, and like in NTP the one with the lowest round trip time
+    of the latest CLOCK_SAMPLES is used, it has the least queueing in it.
+    """
+
+    def __init__(self):
+        self.samples = deque(maxlen=CLOCK_SAMPLES)  # (rtt, offset)
+        self.offset = None  # bot clock - browser time in seconds
+        self.rtt = None
+
+    def reset(self):
+        """New browser, new clock"""
+        self.samples.clear()
+        self.offset = None
+        self.rtt = None
+
+    def add_sample(self, browser_time, rtt, received=None):
+        """'browser_time' in milliseconds, 'rtt' in seconds"""
+        if received is None:
+            received = clock.now()
+        if self.offset is not None:
+            browser_time = self._unwrap(browser_time, received)
+        offset = received - browser_time / 1000 - rtt / 2
+        self.samples.append((rtt, offset))
+        self.rtt, self.offset = min(self.samples)
+
+    def _unwrap(self, browser_time, now):
+        expected = (now - self.offset) * 1000
+        difference = (browser_time - expected + TIME_MODULO / 2) % TIME_MODULO
+        return expected + difference - TIME_MODULO / 2
+
+    def to_local(self, browser_time, now=None):
+        """Bot clock time of a browser time, None if not synced yet"""
+        if self.offset is None:
+            return None
+        if now is None:
+            now = clock.now()
+        return self._unwrap(browser_time, now) / 1000 + self.offset
+
+    def get_stats(self):
+        return {
+            "offset": self.offset,
+            "rtt": self.rtt,
+            "samples": len(self.samples),
+        }
@@ -49,10 +49,25 @@ with warnings.catch_warnings():
 from aiortc.sdp import candidate_from_sdp
 from cryptography.utils import CryptographyDeprecationWarning
 
+from ..clock import now
+from ..constants import (
+    DEFAULT_ICE_SERVERS,
+    INPUT_EVENT,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_MIN,
+    RESTART_TIMEOUT,
+    STANDBY_MAX_AGE,
+    STANDBY_REFRESH_INTERVAL,
+)
 from ..events import SystemEvent
 from ..log_formatter import get_logger
+from ..stats import Histogram, register_stats
 from ..string_utils import error_to_string
-from .json_utils import parse_event
+from .browser_clock import BrowserClock
+from .json_utils import is_internal_message, load_message, parse_event
+from .liveness import LivenessWatchdog
+from .send_queue import SendQueue
+from .wire_format import parse_binary_event
 
 logger = get_logger()
 
@@ -77,16 +92,126 @@ def get_id():
     return f"{id[:6]}-{id[6:12]}-{id[12:]}"
 
 
-def get_peer_connection_and_datachannel():
-    pc = RTCPeerConnection(
-        RTCConfiguration([RTCIceServer("stun:stun.l.google.com:19302")])
-    )
+def get_ice_servers(ice_servers, host_only):
+    """RTCIceServers from urls or dicts with urls, username and credential
+
+    No servers means that only host candidates are gathered, which is fast
+    and enough when the browser is in the same network.
+    """
+    if host_only:
+        assert ice_servers is None, "ice_servers cannot be used with host_only"
+        return []
+    if ice_servers is None:
+        ice_servers = DEFAULT_ICE_SERVERS
+
+    assert isinstance(
+        ice_servers, (list, tuple)
+    ), "ice_servers should be a list of urls or dicts"
+    servers = []
+    for server in ice_servers:
+        if isinstance(server, str):
+            server = {"urls": server}
+        assert isinstance(server, dict) and isinstance(
+            server.get("urls"), (str, list)
+        ), f"ice server should be an url or a dict with 'urls', not {server}"
+        unknown = set(server) - {"urls", "username", "credential"}
+        assert len(unknown) == 0, f"Unknown ice server keys {unknown}"
+        urls = server["urls"]
+        for url in [urls] if isinstance(urls, str) else urls:
+            assert isinstance(url, str) and url.startswith(
+                ("stun:", "turn:", "turns:")
+            ), f"Unknown ice server url {url}, use stun:, turn: or turns:"
+        servers.append(RTCIceServer(**server))
+    return servers
+
+
+def get_peer_connection_and_datachannel(ice_servers):
+    pc = RTCPeerConnection(RTCConfiguration(ice_servers))
+    # Reliability is set per sending side, what the bot sends stays reliable
+    # so that state changes are never lost. See get_datachannel_options
     dc = pc.createDataChannel(
         "communication", negotiated=True, ordered=False, id=0
     )
     return pc, dc
 
 
+def get_datachannel_options(max_retransmits, max_packet_life_time):
+    """Options the browser creates its side of the datachannel with
+
+    Input events have sequence numbers, so the browser side can drop and
+    reorder them. Lost releases and axis values are recovered from input
+    snapshots.
+    """
+    assert max_retransmits is None or max_packet_life_time is None, (
+        "Only one of max_retransmits and max_packet_life_time can be "
+        "set at a time"
+    )
+    options = {"ordered": False}
+    if max_retransmits is not None:
+        assert (
+            type(max_retransmits) is int and max_retransmits >= 0
+        ), "max_retransmits should be a non-negative int"
+        options["maxRetransmits"] = max_retransmits
+    if max_packet_life_time is not None:
+        assert (
+            type(max_packet_life_time) is int and max_packet_life_time > 0
+        ), "max_packet_life_time should be a positive int (milliseconds)"
+        options["maxPacketLifeTime"] = max_packet_life_time
+    return options
+
+
+class Standby:
+    """Peer connection that has gathered ICE candidates and has an offer"""
+
+    def __init__(self, peer_connection, data_channel):
+        self.peer_connection = peer_connection
+        self.data_channel = data_channel
+        self.created = now()
+
+    @classmethod
+    async def create(cls, ice_servers, gathering_timeout=None):
+        """Gathers host candidates only if servers take over the timeout"""
+        peer_connection, data_channel = get_peer_connection_and_datachannel(
+            ice_servers
+        )
+        try:
+            # Returns after ICE gathering has completed
+            await asyncio.wait_for(
+                cls._set_offer(peer_connection),
+                None if len(ice_servers) == 0 else gathering_timeout,
+            )
+        except asyncio.TimeoutError:
+            await peer_connection.close()
+            logger.debug(
+                f"ICE gathering took over {gathering_timeout} seconds, "
+                "using host candidates only"
+            )
+            return await cls.create([])
+        except Exception:
+            await peer_connection.close()
+            raise
+        return cls(peer_connection, data_channel)
+
+    @staticmethod
+    async def _set_offer(peer_connection):
+        await peer_connection.setLocalDescription(
+            await peer_connection.createOffer()
+        )
+
+    @property
+    def is_fresh(self):
+        return now() - self.created < STANDBY_MAX_AGE
+
+    async def close(self):
+        self.data_channel.close()
+        await self.peer_connection.close()
+
+
+# Recovery from a broken connection, from the fastest to the slowest. See
+# DataChannel._recover
+RECOVERY_TIERS = ("restart", "signaling", "rebuild")
+
+
 def parse_message(message):
     message_type = message.get("type")
     request_id = message.get("requestId")
@@ -95,24 +220,26 @@ def parse_message(message):
     return message_type, request_id, data
 
 
-# From: https://stackoverflow.com/a/45430833
-class Timer:
-    def __init__(self, timeout, callback):
-        self._timeout = timeout
-        self._callback = callback
-        self._task = asyncio.ensure_future(self._job())
-
-    async def _job(self):
-        await asyncio.sleep(self._timeout)
-        await self._callback()
-
-    def cancel(self):
-        self._task.cancel()
-
-
 class DataChannel:
-    def __init__(self, process_event):
+    def __init__(
+        self,
+        process_event,
+        max_retransmits=None,
+        max_packet_life_time=None,
+        ice_servers=None,
+        host_only=False,
+        gathering_timeout=None,
+    ):
         self.process_event = process_event  # TODO use
+        self.datachannel_options = get_datachannel_options(
+            max_retransmits, max_packet_life_time
+        )
+        self.ice_servers = get_ice_servers(ice_servers, host_only)
+        assert gathering_timeout is None or (
+            isinstance(gathering_timeout, (int, float))
+            and gathering_timeout > 0
+        ), "gathering_timeout should be a positive number of seconds"
+        self.gathering_timeout = gathering_timeout
         self.loop = None
         self.id = get_id()  # is read directly from outside
         self.peer_connection = None
@@ -120,7 +247,8 @@ class DataChannel:
         self.request_id = None
         self.sio = None
         self.create_sio_lock = asyncio.Lock()
-        self.timer = None
+        self.watchdog = LivenessWatchdog(self._on_ping_timeout)
+        self.watchdog_task = None
         self._stop = None  # asyncio.Event()
         self._connected = False
         if os.environ.get("BOTAFAR_ENV") == "dev":
@@ -129,6 +257,78 @@ class DataChannel:
         else:
             self.url = "https://tb-signaling.onrender.com"
         self.has_connected = False  # is read directly from outside
+        self.send_queue = SendQueue(self._send_frame, self._buffered_amount)
+        register_stats("outbound", self.send_queue.get_stats)
+        self.standby = None
+        self.standby_task = None
+        self.standby_taken = None  # asyncio.Event()
+        self.offer_time = Histogram()
+        self.offers_from_standby = 0
+        self.recipient_id = None
+        self.opened = None  # asyncio.Event()
+        self.recovering = False
+        self.recovery_started = None
+        self.recovery_tier = None
+        self.recovery_times = {tier: Histogram() for tier in RECOVERY_TIERS}
+        register_stats("connection", self.get_stats)
+        register_stats("liveness", self.watchdog.get_stats)
+        self.browser_clock = BrowserClock()
+        self.network_latency = Histogram()
+        register_stats("latency", self.get_latency_stats)
+
+    def get_stats(self):
+        return {
+            "offers_from_standby": self.offers_from_standby,
+            "offer_time": self.offer_time.to_dict(),
+            # Seconds from noticing a broken connection until it worked again
+            "recovery_time": {
+                tier: histogram.to_dict()
+                for tier, histogram in self.recovery_times.items()
+            },
+        }
+
+    async def _keep_standby(self):
+        """Keeps a fresh standby ready while not connected to a browser"""
+        while True:
+            self.standby_taken.clear()
+            if not self._connected:
+                try:
+                    standby = await Standby.create(
+                        self.ice_servers, self.gathering_timeout
+                    )
+                except Exception as e:
+                    logger.debug(f"Could not create standby: {e}")
+                else:
+                    old, self.standby = self.standby, standby
+                    if old is not None:
+                        await old.close()
+            elif self.standby is not None:
+                standby, self.standby = self.standby, None
+                await standby.close()
+
+            try:
+                await asyncio.wait_for(
+                    self.standby_taken.wait(), STANDBY_REFRESH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _wake_standby(self):
+        if self.standby_taken is not None:
+            self.standby_taken.set()
+
+    async def _take_standby(self):
+        """Returns the standby if it is fresh, otherwise creates one now"""
+        standby, self.standby = self.standby, None
+        self._wake_standby()  # Start preparing the next one
+
+        if standby is not None and standby.is_fresh:
+            self.offers_from_standby += 1
+            return standby
+
+        if standby is not None:
+            await standby.close()
+        return await Standby.create(self.ice_servers, self.gathering_timeout)
 
     def _send_internal_datachannel_message(self, message_type):
         if self.data_channel is not None and self.request_id is not None:
@@ -149,69 +349,260 @@ class DataChannel:
         else:
             logger.debug(f"Not sending {message_type}")
 
-    async def _create_sio(self):
+    def _build_sio(self):
+        # Silence all logging
+        socketio_logger = logging.getLogger("socketio")
+        socketio_logger.addFilter(lambda record: False)
+        engineio_logger = logging.getLogger("engineio")
+        engineio_logger.addFilter(lambda record: False)
+
+        # ssl_verify=False fixes MacOS SSL: CERTIFICATE_VERIFY_FAILED
+        # More discussion here: https://stackoverflow.com/q/42098126
+        # Running this could be another solution:
+        # bash /Applications/Python*/Install\ Certificates.command
+        sio = socketio.AsyncClient(
+            logger=socketio_logger,
+            engineio_logger=engineio_logger,
+            reconnection=False,
+            handle_sigint=False,
+            ssl_verify=False,
+        )
+
+        @sio.on("message")
+        async def message(recipient_id, message):
+            await self._handle_internal_message(recipient_id, message)
+
+        @sio.event
+        def connect():
+            logger.debug("sio connected")
+
+        @sio.event
+        def connect_error(data):
+            logger.debug("sio error", data)
+
+        @sio.event
+        def disconnect():
+            logger.debug("sio disconnected")
+
+        return sio
+
+    async def _connect_sio(self):
+        """Connects signaling, the client is rebuilt only if connecting fails
+
+        Retries with exponential backoff until connected or stopped.
+        """
         async with self.create_sio_lock:
-            browser_disconnect_event = SystemEvent(
-                "browser_disconnect", "library"
-            )
-            self.process_event(browser_disconnect_event)
+            delay = RECONNECT_BACKOFF_MIN
+            while not self._stop.is_set():
+                if self.sio is None:
+                    self.sio = self._build_sio()
+                elif self.sio.connected:
+                    return True
 
-            if self.sio is not None:
-                await self.sio.disconnect()
+                try:
+                    await self.sio.connect(
+                        self.url,
+                        wait=True,
+                        wait_timeout=5,
+                        transports="websocket",
+                    )
+                    await self.sio.emit("setAliases", data=[self.id])
+                    return True
+                except socketio.exceptions.ConnectionError:
+                    if delay == RECONNECT_BACKOFF_MIN:
+                        logger.warning(
+                            "Could not connect to server, trying again"
+                        )
+                    logger.debug(f"Next connection attempt in {delay}s")
+                    self.sio = None
+                    if self.recovery_started is not None:
+                        self.recovery_tier = "rebuild"
 
-            self._connected = False
-            event = SystemEvent(
-                "owner_disconnect", "server", text="create sio"
-            )
-            self.process_event(event)
-
-            # Silence all logging
-            socketio_logger = logging.getLogger("socketio")
-            socketio_logger.addFilter(lambda record: False)
-            engineio_logger = logging.getLogger("engineio")
-            engineio_logger.addFilter(lambda record: False)
-
-            # ssl_verify=False fixes MacOS SSL: CERTIFICATE_VERIFY_FAILED
-            # More discussion here: https://stackoverflow.com/q/42098126
-            # Running this could be another solution:
-            # bash /Applications/Python*/Install\ Certificates.command
-            self.sio = socketio.AsyncClient(
-                logger=socketio_logger,
-                engineio_logger=engineio_logger,
-                reconnection=False,
-                handle_sigint=False,
-                ssl_verify=False,
-            )
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, RECONNECT_BACKOFF_MAX)
+            return False
+
+    def _set_event_times(self, event, received):
+        event._received = received
+        if event._browser_time is None:
+            return
+        sent = self.browser_clock.to_local(event._browser_time, received)
+        if sent is not None:
+            event._sent = sent
+            self.network_latency.add(max(0.0, received - sent))
+
+    def get_latency_stats(self):
+        return {
+            # Seconds from the browser sending an input event to the bot
+            # receiving it, accuracy depends on the clock offset estimate
+            "network": self.network_latency.to_dict(),
+            "clock": self.browser_clock.get_stats(),
+        }
+
+    async def _on_ping_timeout(self):
+        await self._recover("ping timeout")
+
+    async def _close_peer_connection(self):
+        self.watchdog.reset()
+        data_channel, self.data_channel = self.data_channel, None
+        peer_connection, self.peer_connection = self.peer_connection, None
+        if data_channel is not None:
+            data_channel.close()
+        if peer_connection is not None:
+            await peer_connection.close()
+
+    async def _reset_session(self, reason):
+        """The browser has to request a new offer, and the bot stops"""
+        self.process_event(SystemEvent("browser_disconnect", "library"))
+        self._connected = False
+        self._wake_standby()
+        self.process_event(
+            SystemEvent("owner_disconnect", "server", text=reason)
+        )
+        await self._close_peer_connection()
 
-            @self.sio.on("message")
-            async def message(recipient_id, message):
-                await self._handle_internal_message(recipient_id, message)
+    async def _recover(self, reason):
+        """Restarts the connection to the same browser session
 
-            @self.sio.event
-            def connect():
-                logger.debug("sio connected")
+        If that does not work in time, the session is reset and the browser
+        requests a new offer like after a page reload.
+        """
+        if self.recovering or self._stop.is_set():
+            return
 
-            @self.sio.event
-            def connect_error(data):
-                logger.debug("sio error", data)
+        logger.debug(f"Recovering connection after {reason}")
+        self.recovering = True
+        self.recovery_started = now()
+        self.recovery_tier = "restart"
+        self._connected = False
+        # Held keys are pressed again by the next input snapshot
+        self.process_event(SystemEvent("connection_interrupted", "library"))
+        try:
+            if self.request_id is not None:
+                try:
+                    await asyncio.wait_for(self._restart(), RESTART_TIMEOUT)
+                    return
+                except Exception as e:
+                    logger.debug(f"Could not restart connection: {e!r}")
 
-            @self.sio.event
-            def disconnect():
-                logger.debug("sio disconnected")
+            if self.recovery_tier == "restart":
+                self.recovery_tier = "signaling"
+            await self._reset_session(reason)
+            await self._connect_sio()
+        finally:
+            self.recovering = False
+
+    async def _restart(self):
+        """Offers a new peer connection to the same browser session
+
+        aiortc does not support ICE restarts, this has the same effect. The
+        candidates were gathered in advance, so this takes one signaling
+        round trip.
+        """
+        await self._close_peer_connection()
+        await self._connect_sio()
+
+        started = now()
+        standby = await self._take_standby()
+        self.opened.clear()
+        self._use_peer_connection(standby)
+        await self._send_offer(started, restart=True)
+        await self.opened.wait()
+
+    def _use_peer_connection(self, standby):  # noqa: C901
+        self.peer_connection = peer_connection = standby.peer_connection
+        self.data_channel = standby.data_channel
+
+        @self.data_channel.on("close")
+        async def on_dc_close():
+            logger.debug("dc close")
+
+        @self.data_channel.on("open")
+        async def on_dc_open():
+            logger.debug("dc open")
+            self.has_connected = True
+            self._connected = True
+            self._wake_standby()  # Not needed while connected
+            self.opened.set()
+            if self.recovery_started is not None:
+                self.recovery_times[self.recovery_tier].add(
+                    now() - self.recovery_started
+                )
+                self.recovery_started = None
 
+        @self.data_channel.on("message")
+        async def on_message(message):
+            received = now()
             try:
-                await self.sio.connect(
-                    self.url, wait=True, wait_timeout=5, transports="websocket"
-                )
-            except socketio.exceptions.ConnectionError:
-                logger.error("Could not connect to server, try again later")
-                await self.stop_async()
-                return
+                if isinstance(message, bytes):
+                    event = parse_binary_event(message)
+                    if event is not None:
+                        self._set_event_times(event, received)
+                        self.process_event(event)
+                    return
+
+                data = load_message(message)
+                if data is None:
+                    return
 
-            await self.sio.emit("setAliases", data=[self.id])
+                if is_internal_message(data):
+                    await self._handle_internal_message(
+                        self.recipient_id, data["data"], received
+                    )
+                else:
+                    event = parse_event(data)
+                    if event is not None:
+                        if event._type == INPUT_EVENT:
+                            self._set_event_times(event, received)
+                        self.process_event(event)
+                    else:
+                        logger.debug("Could not parse event")
+
+            except Exception as e:
+                logger.debug("Could not handle datachannel message", e)
+
+        @peer_connection.on("iceconnectionstatechange")
+        async def iceconnectionstatechange():
+            if (
+                peer_connection.iceConnectionState == "failed"
+                and peer_connection is self.peer_connection
+            ):
+                await self._recover("ICE failure")
+
+        @peer_connection.on("onicecandidate")
+        def onicecandidate(candidate):
+            logger.debug("ice candidate", candidate)
+
+    async def _send_offer(self, started, restart=False):
+        try:
+            offer_data = {
+                "sdp": self.peer_connection.localDescription.sdp,
+                "type": self.peer_connection.localDescription.type,
+                "dataChannel": self.datachannel_options,
+            }
+            if restart:
+                # Same browser session continues with a new connection
+                offer_data["restart"] = True
+            await self.sio.emit(
+                "message",
+                (
+                    self.request_id,
+                    {
+                        "data": offer_data,
+                        "type": "offer",
+                        "requestId": self.request_id,
+                    },
+                ),
+            )
+            self.offer_time.add(now() - started)
+        except Exception as e:
+            logger.debug("Could not send offer", e)
 
     async def _handle_internal_message(  # noqa: C901
-        self, recipient_id, message
+        self, recipient_id, message, received=None
     ):
         message_type, request_id, data = parse_message(message)
 
@@ -241,115 +632,45 @@ class DataChannel:
 
         if message_type == "ping":
 
-            async def cb():
-                logger.debug("Ping timeout")
-                await self._create_sio()
-
-            if self.timer is not None:
-                self.timer.cancel()
-            self.timer = Timer(3, cb)
+            if not isinstance(data, dict):
+                data = {}
+            rtt = data.get("rtt")
+            if isinstance(rtt, (int, float)) and 0 <= rtt < 60_000:
+                rtt /= 1000  # milliseconds
+            else:
+                rtt = None
+            self.watchdog.ping(rtt)
+
+            pong = {"type": "pong", "requestId": request_id}
+            browser_time = data.get("time")
+            if isinstance(browser_time, (int, float)):
+                # Echoed back, the browser measures the round trip from it
+                pong["time"] = browser_time
+                if rtt is not None and received is not None:
+                    self.browser_clock.add_sample(browser_time, rtt, received)
 
             try:
                 self.data_channel.send(
-                    json.dumps(
-                        {
-                            "type": "INTERNAL_MESSAGE",
-                            "data": {"type": "pong", "requestId": request_id},
-                        }
-                    )
+                    json.dumps({"type": "INTERNAL_MESSAGE", "data": pong})
                 )
             except Exception as e:
                 logger.debug("Could not send datachannel message", e)
 
         elif message_type == "requestOffer":
-            # destroy old
-            if self.data_channel is not None:
-                self.data_channel.close()
-            if self.peer_connection is not None:
-                await self.peer_connection.close()
-
-            self.data_channel = None
-            self.peer_connection = None
+            await self._close_peer_connection()
+            self.browser_clock.reset()
             self.request_id = request_id
-
-            (
-                self.peer_connection,
-                self.data_channel,
-            ) = get_peer_connection_and_datachannel()
-
-            @self.data_channel.on("close")
-            async def on_dc_close():
-                logger.debug("dc close")
-
-            @self.data_channel.on("open")
-            async def on_dc_open():
-                logger.debug("dc open")
-                self.has_connected = True
-                self._connected = True
-
-            @self.data_channel.on("message")
-            async def on_message(message):
-                try:
-                    loaded_message = json.loads(message)
-                    if loaded_message["type"] == "INTERNAL_MESSAGE":
-                        await self._handle_internal_message(
-                            recipient_id, loaded_message["data"]
-                        )
-                    else:
-                        event = parse_event(message)
-                        if event is not None:
-                            self.process_event(event)
-                        else:
-                            logger.debug("Could not parse event")
-
-                except Exception as e:
-                    logger.debug("Could not handle datachannel message", e)
-
-            @self.peer_connection.on("iceconnectionstatechange")
-            async def iceconnectionstatechange():
-                if self.peer_connection.iceConnectionState == "failed":
-                    # same as otherNuked
-                    """if dcs.get("owner"):
-                        print("CLOSing dc")
-                        dcs["owner"].close()
-                    if pcs.get("owner"):
-                        print("CLOSing peer")
-                        await pcs["owner"].close()
-
-                    # TODO close somehow?
-                    pcs["owner"] = None
-                    dcs["owner"] = None"""
-
-                    try:
-                        await self._create_sio()
-                    except socketio.exceptions.ConnectionError:
-                        pass  # Already connected
-
-            @self.peer_connection.on("onicecandidate")
-            def onicecandidate(candidate):
-                logger.debug("ice candidate", candidate)
+            self.recipient_id = recipient_id
+            self.send_queue.reset()
+            started = now()
 
             try:
-                await self.peer_connection.setLocalDescription(
-                    await self.peer_connection.createOffer()
-                )
-                offer_data = {
-                    "sdp": self.peer_connection.localDescription.sdp,
-                    "type": self.peer_connection.localDescription.type,
-                }
-                await self.sio.emit(
-                    "message",
-                    (
-                        request_id,
-                        {
-                            "data": offer_data,
-                            "type": "offer",
-                            "requestId": request_id,
-                        },
-                    ),
-                )
+                standby = await self._take_standby()
             except Exception as e:
-                logger.debug("Could not create or send offer", e)
+                logger.debug("Could not create offer", e)
+                return
+            self._use_peer_connection(standby)
+            await self._send_offer(started)
         elif message_type == "answer":
             try:
                 await self.peer_connection.setRemoteDescription(
@@ -372,16 +693,8 @@ class DataChannel:
             except Exception as e:
                 logger.debug("Could not add ice candidate", e)
         elif message_type == "otherNuked":
-            # destroy old
-            if self.data_channel is not None:
-                self.data_channel.close()
-            if self.peer_connection is not None:
-                await self.peer_connection.close()
-
-            self.data_channel = None
-            self.peer_connection = None
-
-            await self._create_sio()
+            await self._reset_session("other nuked")
+            await self._connect_sio()
         elif message_type == "connectionStable":
             if self.sio is not None:
                 await self.sio.disconnect()
@@ -390,27 +703,40 @@ class DataChannel:
 
     async def serve(self):
         self.loop = asyncio.get_running_loop()
+        self.send_queue.set_loop(self.loop)
         self._stop = asyncio.Event()
+        self.standby_taken = asyncio.Event()
+        self.standby_task = asyncio.create_task(self._keep_standby())
+        self.opened = asyncio.Event()
+        self.watchdog_task = asyncio.create_task(self.watchdog.run())
 
-        await self._create_sio()
+        await self._connect_sio()
 
         try:
             await self._stop.wait()
         finally:
             await self.stop_async()
 
-    async def send(self, event):
+    def send(self, event):
+        """Queues the event to be sent, can be called from any thread"""
         assert self.loop is not None, "serve() not called before .send()"
+        self.send_queue.put(event)
 
+    def _send_frame(self, frame):
         if self.data_channel is None:
             logger.debug("No datachannel, not sending")
             return
 
         try:
-            self.data_channel.send(event._to_json())
+            self.data_channel.send(frame)
         except Exception as e:
             logger.debug(f"Unecpected send() error:\n{error_to_string(e)}")
 
+    def _buffered_amount(self):
+        if self.data_channel is None:
+            return 0
+        return self.data_channel.bufferedAmount
+
     @property
     def connected(self):
         return self._connected
@@ -420,7 +746,15 @@ class DataChannel:
             logger.debug("Server.stop_async skipped, serving not started?")
             return
 
+        self.send_queue.flush()  # Send the last messages before closing
         self._stop.set()
+        if self.standby_task is not None:
+            self.standby_task.cancel()
+        if self.watchdog_task is not None:
+            self.watchdog_task.cancel()
+        if self.standby is not None:
+            standby, self.standby = self.standby, None
+            await standby.close()
         if self.sio is not None:
             await self.sio.disconnect()
         self._connected = False
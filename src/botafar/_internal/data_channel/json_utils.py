@@ -1,48 +1,172 @@
 import json
 
-from ..constants import INPUT_EVENT, KEYS, SENDERS, SYSTEM_EVENT
-from ..events import Event, SystemEvent
+from ..constants import (
+    AXES,
+    AXIS_EVENT,
+    INPUT_EVENT,
+    INPUT_EVENT_NAMES,
+    INPUT_SNAPSHOT,
+    INTERNAL_MESSAGE,
+    KEYS,
+    SENDERS,
+    SYSTEM_EVENT,
+)
+from ..events import AxisEvent, Event, InputSnapshot, SystemEvent
 from ..log_formatter import get_logger
+from .wire_format import SEQ_MODULO
 
 logger = get_logger()
 
 
-def parse_event(data):
+def load_message(message):
+    """Decodes a raw datachannel message, the only json.loads per message"""
     try:
-        data = json.loads(data)
-    except json.decoder.JSONDecodeError:
-        logger.warning(f"Malformed JSON received: {data}")
+        data = json.loads(message)
+    except (json.decoder.JSONDecodeError, TypeError):
+        logger.warning(f"Malformed JSON received: {message}")
+        return None
+
+    if not isinstance(data, dict):
+        logger.warning(f"Unexpected JSON received: {data}")
         return None
 
-    if "type" not in data:
+    if not isinstance(data.get("type"), str):
         logger.warning(f"No 'type' in data: {data}")
         return None
 
-    if data["type"] == INPUT_EVENT:
-        if (
-            all(key in data for key in ("key", "sender", "name"))
-            and data["key"] in KEYS
-            and data["sender"] in SENDERS
-            and isinstance(data["name"], str)
-        ):
-            # TODO proper name validation
-            return Event(data["name"], data["sender"], data["key"])
-        else:
-            logger.warning(f"Malformed Event received: {data}")
-            return None
-    elif data["type"] == SYSTEM_EVENT:
-        if (
-            all(key in data for key in ("name", "value", "text", "data"))
-            and isinstance(data["name"], str)
-            and isinstance(data["text"], str)
-        ):
-            # TODO proper value validation
-            return SystemEvent(
-                data["name"], data["value"], data["text"], data["data"]
-            )
-        else:
-            logger.warning(f"Malformed SystemEvent received: {data}")
-            return None
-    else:
+    return data
+
+
+def is_internal_message(data):
+    return data["type"] == INTERNAL_MESSAGE
+
+
+def _is_seq(seq):
+    # bool is an int too
+    return type(seq) is int and 0 <= seq < SEQ_MODULO
+
+
+def _is_time(time):
+    return type(time) in (int, float) and 0 <= time < float("inf")
+
+
+def _parse_input_event(data):
+    key = data.get("key")
+    sender = data.get("sender")
+    name = data.get("name")
+    # Older browsers do not send these
+    seq = data.get("seq")
+    browser_time = data.get("time")
+
+    # isinstance checks first, unhashable values cannot be looked up
+    if (
+        isinstance(key, str)
+        and isinstance(sender, str)
+        and isinstance(name, str)
+        and key in KEYS
+        and sender in SENDERS
+        and name in INPUT_EVENT_NAMES
+        and (seq is None or _is_seq(seq))
+        and (browser_time is None or _is_time(browser_time))
+    ):
+        event = Event(name, sender, key)
+        event._seq = seq
+        event._browser_time = browser_time
+        return event
+
+    logger.warning(f"Malformed Event received: {data}")
+    return None
+
+
+def _is_axis_value(value):
+    return type(value) in (int, float) and -1 <= value <= 1
+
+
+def _parse_axis_event(data):
+    axis = data.get("axis")
+    sender = data.get("sender")
+    value = data.get("value")
+    seq = data.get("seq")
+    browser_time = data.get("time")
+
+    if (
+        isinstance(axis, str)
+        and isinstance(sender, str)
+        and axis in AXES
+        and sender in SENDERS
+        and _is_axis_value(value)
+        and (seq is None or _is_seq(seq))
+        and (browser_time is None or _is_time(browser_time))
+    ):
+        # Name is set by the Axis, it depends on the filtered value
+        event = AxisEvent(None, sender, axis, float(value))
+        event._seq = seq
+        event._browser_time = browser_time
+        return event
+
+    logger.warning(f"Malformed AxisEvent received: {data}")
+    return None
+
+
+def _parse_input_snapshot(data):
+    sender = data.get("sender")
+    seq = data.get("seq")
+    pressed = data.get("pressed")
+    # Older browsers send only the pressed keys
+    axes = data.get("axes", {})
+
+    if (
+        isinstance(sender, str)
+        and sender in SENDERS
+        and _is_seq(seq)
+        and isinstance(pressed, list)
+        and all(isinstance(key, str) and key in KEYS for key in pressed)
+        and isinstance(axes, dict)
+        and all(
+            axis in AXES and _is_axis_value(value)
+            for axis, value in axes.items()
+        )
+    ):
+        return InputSnapshot(
+            sender,
+            seq,
+            frozenset(pressed),
+            {axis: float(value) for axis, value in axes.items()},
+        )
+
+    logger.warning(f"Malformed InputSnapshot received: {data}")
+    return None
+
+
+def _parse_system_event(data):
+    if (
+        "value" in data
+        and "data" in data
+        and isinstance(data.get("name"), str)
+        and isinstance(data.get("text"), str)
+    ):
+        # TODO proper value validation
+        return SystemEvent(
+            data["name"], data["value"], data["text"], data["data"]
+        )
+
+    logger.warning(f"Malformed SystemEvent received: {data}")
+    return None
+
+
+EVENT_PARSERS = {
+    INPUT_EVENT: _parse_input_event,
+    SYSTEM_EVENT: _parse_system_event,
+    INPUT_SNAPSHOT: _parse_input_snapshot,
+    AXIS_EVENT: _parse_axis_event,
+}
+
+
+def parse_event(data):
+    """Builds an Event, an AxisEvent, a SystemEvent or an InputSnapshot"""
+    parser = EVENT_PARSERS.get(data["type"])
+    if parser is None:
         logger.warning(f"Unknown 'type' in data: '{data['type']}'")
         return None
+
+    return parser(data)
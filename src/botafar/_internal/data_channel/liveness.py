@@ -0,0 +1,154 @@
+import asyncio
+
+from .. import clock
+from ..constants import (
+    LIVENESS_GRACE,
+    LIVENESS_MAX_TIMEOUT,
+    LIVENESS_MIN_MARGIN,
+    LIVENESS_MIN_SAMPLES,
+    LIVENESS_MIN_TIMEOUT,
+)
+from ..log_formatter import get_logger
+from ..stats import Histogram
+
+logger = get_logger()
+
+
+class Smoothed:
+    """Smoothed value and variance like TCP round trip time (RFC 6298)"""
+
+    def __init__(self):
+        self.value = None
+        self.variance = None
+        self.samples = 0
+
+    def add(self, sample):
+        if self.value is None:
+            self.value = sample
+            self.variance = sample / 2
+        else:
+            self.variance = 0.75 * self.variance + 0.25 * abs(
+                self.value - sample
+            )
+            self.value = 0.875 * self.value + 0.125 * sample
+        self.samples += 1
+
+
+class LivenessWatchdog:
+    """Calls 'on_dead' when pings stop arriving
+
+    The browser pings over the datachannel. The link is suspected dead when
+    no ping has arrived in the smoothed ping interval plus four variances
+    (at least LIVENESS_MIN_MARGIN) plus the round trip time, at least
+    LIVENESS_MIN_TIMEOUT. 'on_dead' is called only if no ping arrives in
+    LIVENESS_GRACE after that either, in at most LIVENESS_MAX_TIMEOUT in
+    total. A single
+    coroutine checks the deadline, so pings themselves only store their
+    arrival time.
+    """
+
+    def __init__(self, on_dead):
+        self.on_dead = on_dead
+        self.last_ping = None  # None when not watching
+        self.interval = Smoothed()
+        self.rtt = Smoothed()  # Measured by the browser
+        self.pinged = None  # asyncio.Event()
+        self.recovery_task = None
+        # Last ping before the timeout, while waiting for the grace period
+        self.suspected_ping = None
+        self.late_pings = 0
+        # A detection is a false positive if the next ping arrives before
+        # LIVENESS_MAX_TIMEOUT, which used to be the fixed timeout
+        self.detected_ping = None
+        self.detections = 0
+        self.false_positives = 0
+        self.detection_latency = Histogram()
+
+    @property
+    def timeout(self):
+        """Seconds without pings until the grace period starts"""
+        max_timeout = LIVENESS_MAX_TIMEOUT - LIVENESS_GRACE
+        if self.interval.samples < LIVENESS_MIN_SAMPLES:
+            return max_timeout
+        timeout = self.interval.value + max(
+            LIVENESS_MIN_MARGIN, 4 * self.interval.variance
+        )
+        if self.rtt.value is not None:
+            timeout += self.rtt.value
+        return min(max_timeout, max(LIVENESS_MIN_TIMEOUT, timeout))
+
+    def ping(self, rtt=None):
+        """'rtt' in seconds, if the browser sent one"""
+        now = clock.now()
+        if self.last_ping is not None:
+            self.interval.add(now - self.last_ping)
+        elif self.suspected_ping is not None:
+            # Late but alive, the long interval makes the timeout longer
+            self.late_pings += 1
+            self.interval.add(now - self.suspected_ping)
+            self._cancel_grace()
+        if self.detected_ping is not None:
+            if now - self.detected_ping < LIVENESS_MAX_TIMEOUT:
+                self.false_positives += 1
+            self.detected_ping = None
+        if rtt is not None:
+            self.rtt.add(rtt)
+
+        self.last_ping = now
+        if self.pinged is not None:
+            self.pinged.set()
+
+    def reset(self):
+        """Stops watching until the next ping, for example on a new offer"""
+        self.last_ping = None
+        self._cancel_grace()
+
+    def _cancel_grace(self):
+        if self.suspected_ping is not None:
+            self.suspected_ping = None
+            self.recovery_task.cancel()
+
+    async def _wait_grace(self):
+        await asyncio.sleep(LIVENESS_GRACE)
+        last_ping, self.suspected_ping = self.suspected_ping, None
+        now = clock.now()
+        logger.debug(f"No ping in {now - last_ping:.3f}s")
+        self.detections += 1
+        self.detection_latency.add(now - last_ping)
+        self.detected_ping = last_ping
+        # Not cancelled by pings anymore, recovery has started
+        await self.on_dead()
+
+    async def run(self):
+        self.pinged = asyncio.Event()
+        while True:
+            if self.last_ping is None:
+                self.pinged.clear()
+                await self.pinged.wait()
+                continue
+
+            now = clock.now()
+            deadline = self.last_ping + self.timeout
+            if now < deadline:
+                # Timeout can get shorter meanwhile, so no long sleeps
+                await asyncio.sleep(min(deadline - now, LIVENESS_MIN_TIMEOUT))
+                continue
+
+            self.suspected_ping = self.last_ping
+            self.last_ping = None
+            # Recovery can take long, watching continues meanwhile
+            self.recovery_task = asyncio.create_task(self._wait_grace())
+
+    def get_stats(self):
+        return {
+            "timeout": self.timeout,
+            "ping_interval": self.interval.value,
+            "ping_interval_variance": self.interval.variance,
+            "rtt": self.rtt.value,
+            "detections": self.detections,
+            "false_positives": self.false_positives,
+            # Pings that arrived in the grace period and cancelled recovery
+            "late_pings": self.late_pings,
+            # Seconds from the last ping until the link was considered dead
+            "detection_latency": self.detection_latency.to_dict(),
+        }
@@ -0,0 +1,131 @@
+import json
+from collections import deque
+
+from ..constants import (
+    MAX_PRINTS_PER_FLUSH,
+    OUTBOUND_BUFFER_LIMIT,
+    OUTBOUND_FLUSH_INTERVAL,
+    SYSTEM_EVENT_BATCH,
+)
+from ..events import SystemEvent
+from ..log_formatter import get_logger
+
+logger = get_logger()
+
+
+class SendQueue:
+    """Outbound SystemEvents, sent from the loop once per flush interval
+
+    Only prints can be merged or dropped, other events are always sent.
+    """
+
+    def __init__(self, send_frame, get_buffered_amount):
+        self.send_frame = send_frame
+        self.get_buffered_amount = get_buffered_amount
+        self.loop = None
+        self.pending = deque()  # append and popleft are thread-safe
+        self.scheduled = False
+        self.batching = False  # Set when connect_ok is sent
+        self.frames = 0
+        self.messages = 0
+        self.merged_prints = 0
+        self.dropped_prints = 0
+
+    def set_loop(self, loop):
+        self.loop = loop
+
+    def reset(self):
+        """New datachannel, batching needs to be negotiated again"""
+        self.batching = False
+
+    def put(self, event):
+        """Can be called from any thread"""
+        self.pending.append(event)
+        if not self.scheduled:
+            self.scheduled = True
+            try:
+                self.loop.call_soon_threadsafe(
+                    self.loop.call_later, OUTBOUND_FLUSH_INTERVAL, self.flush
+                )
+            except RuntimeError:
+                logger.debug("Loop closed, outbound event not sent")
+
+    def flush(self):
+        # Cleared first, events put during the flush schedule a new one
+        self.scheduled = False
+        events = []
+        while len(self.pending) != 0:
+            events.append(self.pending.popleft())
+        if len(events) == 0:
+            return
+
+        for frame in self._encode(self._merge_prints(events)):
+            self.send_frame(frame)
+            self.frames += 1
+
+    def _merge_prints(self, events):
+        """Merges only adjacent prints, so the order of events is kept"""
+        buffer_full = self.get_buffered_amount() > OUTBOUND_BUFFER_LIMIT
+        runs = []  # (merged print, lines)
+        result = []
+        for event in events:
+            if event.name != "print":
+                result.append(event)
+            elif buffer_full:
+                self.dropped_prints += 1
+            else:
+                if len(runs) != 0 and result[-1] is runs[-1][0]:
+                    self.merged_prints += 1
+                else:
+                    runs.append((SystemEvent("print", None), []))
+                    result.append(runs[-1][0])
+                runs[-1][1].append(str(event.value))
+
+        # Oldest lines are dropped first
+        extra = sum(len(lines) for _, lines in runs) - MAX_PRINTS_PER_FLUSH
+        if extra > 0:
+            self.dropped_prints += extra
+        empty = set()
+        for merged, lines in runs:
+            if extra >= len(lines):
+                extra -= len(lines)
+                empty.add(id(merged))
+                continue
+            merged.set_value("\n".join(lines[max(extra, 0) :]))
+            extra = 0
+        return [event for event in result if id(event) not in empty]
+
+    def _encode(self, events):
+        frames = []
+        batch = []
+        for event in events:
+            self.messages += 1
+            if self.batching:
+                batch.append(event._to_dict())
+                continue
+
+            frames.append(event._to_json())
+            if event.name == "connect_ok":
+                # Browser reads batches only after it got connect_ok
+                value = event.value
+                self.batching = (
+                    isinstance(value, dict)
+                    and value.get("outboundBatching") is True
+                )
+
+        if len(batch) == 1:
+            frames.append(json.dumps(batch[0]))
+        elif len(batch) > 1:
+            frames.append(
+                json.dumps({"type": SYSTEM_EVENT_BATCH, "events": batch})
+            )
+        return frames
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "messages": self.messages,
+            "merged_prints": self.merged_prints,
+            "dropped_prints": self.dropped_prints,
+            "pending": len(self.pending),
+        }
@@ -0,0 +1,170 @@
+from ..constants import AXIS_LIST, INPUT_EVENT_NAME_LIST, KEY_LIST, SENDER_LIST
+from ..events import AxisEvent, Event
+from ..log_formatter import get_logger
+from .browser_clock import TIME_MODULO
+
+logger = get_logger()
+
+JSON_FORMAT = "json"
+BINARY_FORMAT = "binary1"
+SEQ_BINARY_FORMAT = "binary2"
+TIMED_BINARY_FORMAT = "binary3"
+# In preference order
+SUPPORTED_FORMATS = (
+    TIMED_BINARY_FORMAT,
+    SEQ_BINARY_FORMAT,
+    BINARY_FORMAT,
+    JSON_FORMAT,
+)
+
+# Binary input event: tag, key index, sender index, name index (1 byte each)
+INPUT_EVENT_TAG = 1
+INPUT_EVENT_LENGTH = 4
+# Same as above, followed by a 4 byte big endian sequence number
+SEQ_INPUT_EVENT_TAG = 2
+SEQ_INPUT_EVENT_LENGTH = 8
+# Same as above, followed by a 4 byte big endian browser send time in
+# milliseconds modulo 2**32
+TIMED_INPUT_EVENT_TAG = 3
+TIMED_INPUT_EVENT_LENGTH = 12
+
+# Binary axis event of an Axis control: tag, axis index, sender index (1
+# byte each), value * AXIS_SCALE (2 byte big endian signed), sequence
+# number and browser send time like above. Browsers that send binary input
+# events send these too
+AXIS_EVENT_TAG = 4
+AXIS_EVENT_LENGTH = 13
+AXIS_SCALE = 32767
+
+# Sequence numbers wrap around, see is_newer_seq
+SEQ_MODULO = 2**32
+
+KEY_INDEXES = {key: i for i, key in enumerate(KEY_LIST)}
+SENDER_INDEXES = {sender: i for i, sender in enumerate(SENDER_LIST)}
+NAME_INDEXES = {name: i for i, name in enumerate(INPUT_EVENT_NAME_LIST)}
+AXIS_INDEXES = {axis: i for i, axis in enumerate(AXIS_LIST)}
+
+
+def negotiate_input_event_format(data):
+    """Picks the input event format from the ones the browser offers.
+
+    Returns None if the browser did not offer any formats, which means it
+    does not know about the negotiation and only sends JSON.
+    """
+    if not isinstance(data, dict):
+        return None
+
+    offered = data.get("inputEventFormats")
+    if not isinstance(offered, list):
+        return None
+
+    for format_ in SUPPORTED_FORMATS:
+        if format_ in offered:
+            return format_
+    return JSON_FORMAT
+
+
+def negotiate_outbound_batching(data):
+    """Browsers that can read SYSTEM_EVENT_BATCH frames offer batching"""
+    return isinstance(data, dict) and data.get("outboundBatching") is True
+
+
+def is_newer_seq(seq, latest):
+    """Serial number comparison (RFC 1982), works across the wrap around"""
+    return 0 < (seq - latest) % SEQ_MODULO < SEQ_MODULO // 2
+
+
+def encode_input_event(event):
+    """Events with a sequence number are encoded in SEQ_BINARY_FORMAT, and
+    if they also have a browser time, in TIMED_BINARY_FORMAT"""
+    if event._browser_time is not None:
+        tag = TIMED_INPUT_EVENT_TAG
+    elif event._seq is not None:
+        tag = SEQ_INPUT_EVENT_TAG
+    else:
+        tag = INPUT_EVENT_TAG
+    message = bytes(
+        (
+            tag,
+            KEY_INDEXES[event._key],
+            SENDER_INDEXES[event.sender],
+            NAME_INDEXES[event.name],
+        )
+    )
+    if tag != INPUT_EVENT_TAG:
+        message += event._seq.to_bytes(4, "big")
+    if tag == TIMED_INPUT_EVENT_TAG:
+        time = int(event._browser_time) % TIME_MODULO
+        message += time.to_bytes(4, "big")
+    return message
+
+
+def encode_axis_event(event):
+    return (
+        bytes(
+            (
+                AXIS_EVENT_TAG,
+                AXIS_INDEXES[event._key],
+                SENDER_INDEXES[event.sender],
+            )
+        )
+        + round(event.value * AXIS_SCALE).to_bytes(2, "big", signed=True)
+        + event._seq.to_bytes(4, "big")
+        + (int(event._browser_time) % TIME_MODULO).to_bytes(4, "big")
+    )
+
+
+def parse_binary_axis_event(message):
+    axis_index, sender_index = message[1:3]
+    value = int.from_bytes(message[3:5], "big", signed=True) / AXIS_SCALE
+    try:
+        event = AxisEvent(
+            None,
+            SENDER_LIST[sender_index],
+            AXIS_LIST[axis_index],
+            max(-1.0, value),  # -32768 is the only value below -1
+        )
+    except IndexError:
+        logger.warning(f"Unknown index in binary message: {message}")
+        return None
+    event._seq = int.from_bytes(message[5:9], "big")
+    event._browser_time = int.from_bytes(message[9:13], "big")
+    return event
+
+
+def parse_binary_event(message):
+    if len(message) == AXIS_EVENT_LENGTH and message[0] == AXIS_EVENT_TAG:
+        return parse_binary_axis_event(message)
+
+    seq = None
+    browser_time = None
+    if len(message) == INPUT_EVENT_LENGTH and message[0] == INPUT_EVENT_TAG:
+        pass
+    elif (
+        len(message) == SEQ_INPUT_EVENT_LENGTH
+        and message[0] == SEQ_INPUT_EVENT_TAG
+    ):
+        seq = int.from_bytes(message[4:8], "big")
+    elif (
+        len(message) == TIMED_INPUT_EVENT_LENGTH
+        and message[0] == TIMED_INPUT_EVENT_TAG
+    ):
+        seq = int.from_bytes(message[4:8], "big")
+        browser_time = int.from_bytes(message[8:12], "big")
+    else:
+        logger.warning(f"Malformed binary message received: {message}")
+        return None
+
+    key_index, sender_index, name_index = message[1:4]
+    try:
+        event = Event(
+            INPUT_EVENT_NAME_LIST[name_index],
+            SENDER_LIST[sender_index],
+            KEY_LIST[key_index],
+        )
+    except IndexError:
+        logger.warning(f"Unknown index in binary message: {message}")
+        return None
+    event._seq = seq
+    event._browser_time = browser_time
+    return event
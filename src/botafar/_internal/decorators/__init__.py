@@ -1,5 +1,6 @@
 from .decorator_base import DecoratorBase, get_decorator
 from .decorators import (
+    get_repeat_stats,
     on_exit,
     on_init,
     on_prepare,
@@ -6,6 +6,7 @@ from abc import ABC, abstractmethod
 from collections import OrderedDict
 from inspect import Parameter, signature
 
+from ..callback_executor import CallbackExecutor
 from ..function_utils import get_function_title, get_params
 from ..log_formatter import get_logger
 from ..states import PRE_INIT, state_machine
@@ -226,12 +227,16 @@ class DecoratorBase(ABC):
                 def new_func():
                     return getattr(owner, name)(*params)
 
+        if not takes_time:
+            # Lets Dispatch call the target without this wrapper
+            new_func.__botafar_target__ = (owner, name, params)
         self.wrap(new_func)
 
     @staticmethod
     def post_listen():
         DecoratorBase._warn_ones_without_instance()
         DecoratorBase._wrap_ones_without_wrapping()
+        CallbackExecutor.compile_dispatches()
 
     @staticmethod
     def _warn_ones_without_instance():
@@ -1,19 +1,32 @@
 import asyncio
+from functools import partial
 
+from ..callback_executor import CallbackExecutor
 from ..callbacks import CallbackBase
+from ..clock import now
 from ..function_utils import (
     get_function_title,
     get_required_params,
     takes_parameter,
 )
 from ..log_formatter import get_logger
-from ..states import sleep, sleep_async, state_machine, time
+from ..scheduler import scheduler
+from ..states import state_machine, time
+from ..stats import RepeatStats
 from .decorator_base import DecoratorBase, get_decorator
 
 logger = get_logger()
 
 
-class OnInit(DecoratorBase):
+class LifecycleDecorator(DecoratorBase):
+    def __init__(self, title, decorator_name, *args, **kwargs):
+        assert isinstance(kwargs.get("inline", False), bool), (
+            f"{decorator_name} parameter 'inline' should be True or "
+            f"False, not {kwargs['inline']}"
+        )
+        self.inline = kwargs.get("inline", False)
+        super().__init__(title, decorator_name, *args, **kwargs)
+
     def verify_params_and_set_flags(self, params):
         required = get_required_params(params)
         assert len(required) == 0, (
@@ -22,55 +35,64 @@ class OnInit(DecoratorBase):
             "optional or removed"
         )
 
-    def wrap(self, func):
-        CallbackBase.register_callback("on_init", func)
-        return func
+    def register_callback(self, name, func):
+        CallbackBase.register_callback(name, func)
+        if self.inline:
+            CallbackExecutor.add_to_inline(func)
 
 
-def on_init(func):
-    title = get_function_title(func)
-    return get_decorator(OnInit, title, "on_init", True)(func)
+def get_lifecycle_decorator(cls, title, name, func, options):
+    unknown = sorted(set(options.keys()) - {"inline"})
+    if len(unknown) != 0:
+        raise TypeError(f"{name}() got unexpected keyword arguments {unknown}")
+    if len(func) > 1:
+        raise TypeError(
+            f"{name}() takes 1 positional argument but {len(func)} were given"
+        )
+    if len(func) == 0 and len(options) == 0:
+        raise TypeError(f"Remove empty parentheses '()' from @{name}()")
 
+    if len(options) == 0:
+        return get_decorator(cls, title, name, True)(*func)
+    return get_decorator(cls, title, name, False)(*func, **options)
 
-class OnPrepare(DecoratorBase):
-    def verify_params_and_set_flags(self, params):
-        required = get_required_params(params)
-        assert len(required) == 0, (
-            f"{self.decorator_name} callback parameters need to be optional, "
-            f"currently required parameters {required} need to be made "
-            "optional or removed"
-        )
 
+class OnInit(LifecycleDecorator):
     def wrap(self, func):
-        CallbackBase.register_callback("on_prepare", func)
+        self.register_callback("on_init", func)
         return func
 
 
-def on_prepare(func):
-    title = get_function_title(func)
-    return get_decorator(OnPrepare, title, "on_prepare", True)(func)
+def on_init(*func, **options):
+    title = get_function_title(func[0]) if len(func) == 1 else None
+    return get_lifecycle_decorator(OnInit, title, "on_init", func, options)
 
 
-class OnStart(DecoratorBase):
-    def verify_params_and_set_flags(self, params):
-        required = get_required_params(params)
-        assert len(required) == 0, (
-            f"{self.decorator_name} callback parameters need to be optional, "
-            f"currently required parameters {required} need to be made "
-            "optional or removed"
-        )
+class OnPrepare(LifecycleDecorator):
+    def wrap(self, func):
+        self.register_callback("on_prepare", func)
+        return func
 
+
+def on_prepare(*func, **options):
+    title = get_function_title(func[0]) if len(func) == 1 else None
+    return get_lifecycle_decorator(
+        OnPrepare, title, "on_prepare", func, options
+    )
+
+
+class OnStart(LifecycleDecorator):
     def wrap(self, func):
-        CallbackBase.register_callback("on_start", func)
+        self.register_callback("on_start", func)
         return func
 
 
-def on_start(func):
-    title = get_function_title(func)
-    return get_decorator(OnStart, title, "on_start", True)(func)
+def on_start(*func, **options):
+    title = get_function_title(func[0]) if len(func) == 1 else None
+    return get_lifecycle_decorator(OnStart, title, "on_start", func, options)
 
 
-class OnStop(DecoratorBase):
+class OnStop(LifecycleDecorator):
     def __init__(self, title, decorator_name, *args, **kwargs):
         assert isinstance(kwargs.get("immediate", False), bool), (
             f"{decorator_name} parameter 'immediate' should be True or "
@@ -79,23 +101,15 @@ class OnStop(DecoratorBase):
         self.immediate = kwargs.get("immediate", False)
         super().__init__(title, decorator_name, *args, **kwargs)
 
-    def verify_params_and_set_flags(self, params):
-        required = get_required_params(params)
-        assert len(required) == 0, (
-            f"{self.decorator_name} callback parameters need to be optional, "
-            f"currently required parameters {required} need to be made "
-            "optional or removed"
-        )
-
     def wrap(self, func):
         if self.immediate:
-            CallbackBase.register_callback("on_stop(immediate=True)", func)
+            self.register_callback("on_stop(immediate=True)", func)
         else:
-            CallbackBase.register_callback("on_stop", func)
+            self.register_callback("on_stop", func)
         return func
 
 
-def on_stop(*func, immediate=False):
+def on_stop(*func, immediate=False, inline=False):
     if len(func) >= 1 and (
         isinstance(func[0], (classmethod, staticmethod)) or callable(func[0])
     ):
@@ -104,11 +118,11 @@ def on_stop(*func, immediate=False):
         title = "TITLE"
 
     return get_decorator(OnStop, title, "on_stop", False)(
-        *func, **{"immediate": immediate}
+        *func, **{"immediate": immediate, "inline": inline}
     )
 
 
-class OnExit(DecoratorBase):
+class OnExit(LifecycleDecorator):
     def __init__(self, title, decorator_name, *args, **kwargs):
         assert isinstance(kwargs.get("immediate", False), bool), (
             f"{decorator_name} parameter 'immediate' should be True or "
@@ -117,23 +131,15 @@ class OnExit(DecoratorBase):
         self.immediate = kwargs.get("immediate", False)
         super().__init__(title, decorator_name, *args, **kwargs)
 
-    def verify_params_and_set_flags(self, params):
-        required = get_required_params(params)
-        assert len(required) == 0, (
-            f"{self.decorator_name} callback parameters need to be optional, "
-            f"currently required parameters {required} need to be made "
-            "optional or removed"
-        )
-
     def wrap(self, func):
         if self.immediate:
-            CallbackBase.register_callback("on_exit(immediate=True)", func)
+            self.register_callback("on_exit(immediate=True)", func)
         else:
-            CallbackBase.register_callback("on_exit", func)
+            self.register_callback("on_exit", func)
         return func
 
 
-def on_exit(*func, immediate=False):
+def on_exit(*func, immediate=False, inline=False):
     if len(func) >= 1 and (
         isinstance(func[0], (classmethod, staticmethod)) or callable(func[0])
     ):
@@ -142,7 +148,7 @@ def on_exit(*func, immediate=False):
         title = "TITLE"
 
     return get_decorator(OnExit, title, "on_exit", False)(
-        *func, **{"immediate": immediate}
+        *func, **{"immediate": immediate, "inline": inline}
     )
 
 
@@ -173,6 +179,8 @@ class OnTime(DecoratorBase):
             self.takes_time = False
 
     def wrap(self, func):
+        qualname = getattr(self.func_original, "__qualname__", self.func_title)
+
         def get_wrapper(args, t):
             if asyncio.iscoroutinefunction(func):
                 if self.takes_time:
@@ -196,21 +204,35 @@ class OnTime(DecoratorBase):
                     def wrapper():
                         return func(*args)
 
+            # Stats of the wrapper are stats of the decorated function
+            wrapper.__qualname__ = qualname
             return wrapper
 
-        async def outer_wrapper(*args):
+        def outer_wrapper(*args):
+            # The last argument is the generation of the started session
+            *args, generation = args
+            if generation != scheduler.generation:
+                return  # Stopped before this was run
+
+            start = time()
+            if start == -1:
+                logger.warning("on_time time is -1???")
+                return
+
+            # Timers start the callbacks, nothing waits meanwhile
             for t in self.times:
-                now = time()
-                if now == -1:
-                    logger.warning("on_time time is -1???")
-                    break
-
-                await sleep_async(max(0, t - now))
-                state_machine.execute_on_time_from_outside(
-                    get_wrapper(args, t)
+                scheduler.call_later(
+                    t - start,
+                    lambda wrapper=get_wrapper(args, t): (
+                        state_machine.execute_on_time_from_outside(wrapper)
+                    ),
+                    generation,
                 )
 
         CallbackBase.register_callback("on_time", outer_wrapper)
+        CallbackExecutor.add_to_takes_event(outer_wrapper)
+        CallbackExecutor.add_to_inline(outer_wrapper)
+        CallbackExecutor.add_to_not_measured(outer_wrapper)
         return func
 
 
@@ -223,21 +245,67 @@ def on_time(func, *time):
     return get_decorator(OnTime, title, "on_time", False)(func, *time)
 
 
+# What happens when an on_repeat callback with a rate or period runs past
+# its next start time: 'skip' drops the missed runs and keeps to the
+# original schedule, 'catch_up' runs the missed ones right after each other
+OVERRUN_POLICIES = ("skip", "catch_up")
+
+repeat_stats = {}  # qualname -> RepeatStats of on_repeat with rate or period
+
+
+def get_repeat_stats():
+    return {title: stats.to_dict() for title, stats in repeat_stats.items()}
+
+
 class OnRepeat(DecoratorBase):
     def __init__(self, title, decorator_name, *args, **kwargs):
         assert not (len(args) == 2 and isinstance(args[1], (int, float))), (
             f"{decorator_name} parameter 'sleep' should be passed "
             f"with a keyword: '@botafar.{decorator_name}(sleep={args[1]})'"
         )
-        assert "sleep" in kwargs
-        self.sleep = kwargs["sleep"]
-        assert isinstance(self.sleep, (int, float)), (
-            f"{decorator_name} parameter 'sleep' should be numeric "
-            f"(int or float), not '{self.sleep}'"
+        given = [
+            name
+            for name in ("sleep", "rate", "period")
+            if kwargs.get(name) is not None
+        ]
+        assert len(given) <= 1, (
+            f"{decorator_name} takes only one of 'sleep', 'rate' and "
+            f"'period', not {given}"
+        )
+        for name in given:
+            value = kwargs[name]
+            assert isinstance(value, (int, float)) and not isinstance(
+                value, bool
+            ), (
+                f"{decorator_name} parameter '{name}' should be numeric "
+                f"(int or float), not '{value}'"
+            )
+        if kwargs.get("sleep") is not None:
+            assert (
+                kwargs["sleep"] >= 0
+            ), f"{decorator_name} parameter 'sleep' cannot be negative"
+        for name in ("rate", "period"):
+            if kwargs.get(name) is not None:
+                assert (
+                    kwargs[name] > 0
+                ), f"{decorator_name} parameter '{name}' should be positive"
+
+        self.sleep = kwargs.get("sleep")
+        self.period = kwargs.get("period")
+        if kwargs.get("rate") is not None:
+            self.period = 1 / kwargs["rate"]
+        if self.sleep is None and self.period is None:
+            self.sleep = 0.1
+
+        self.overrun = kwargs.get("overrun", "skip")
+        assert self.overrun in OVERRUN_POLICIES, (
+            f"{decorator_name} parameter 'overrun' should be one of "
+            f"{list(OVERRUN_POLICIES)}, not '{self.overrun}'"
+        )
+        assert self.overrun == "skip" or self.period is not None, (
+            f"{decorator_name} parameter 'overrun' requires 'rate' or "
+            f"'period', for example: rate=50, overrun='{self.overrun}'"
         )
-        assert (
-            self.sleep >= 0
-        ), f"{decorator_name} parameter 'sleep' cannot be negative"
         self.immediate = kwargs.get("sleep", False)
         super().__init__(title, decorator_name, *args, **kwargs)
 
@@ -250,25 +318,80 @@ class OnRepeat(DecoratorBase):
         )
 
     def wrap(self, func):
+        # A timer starts the next run when the previous has finished, so no
+        # worker thread waits in between. Every step gets the generation of
+        # the started session and drops the work when it has changed, so
+        # stopping ends the repeating even before the first run. With a rate
+        # or period runs start at fixed deadlines, so the callback run time
+        # does not add to the period
+        deadline = None  # Of the latest run, with a rate or period
+        stats = None
+        name = getattr(self.func_original, "__qualname__", self.func_title)
+        if self.period is not None:
+            stats = repeat_stats.setdefault(name, RepeatStats(self.period))
+
+        def schedule_next(started, generation):
+            nonlocal deadline
+            next_start = partial(start, generation)
+            if self.period is None:
+                scheduler.call_later(self.sleep, next_start, generation)
+                return
+
+            finished = now()
+            if finished - started > self.period:
+                stats.overruns += 1
+            deadline += self.period
+            if finished > deadline and self.overrun == "skip":
+                missed = int((finished - deadline) // self.period) + 1
+                deadline += missed * self.period
+                stats.skipped += missed
+            scheduler.call_at(deadline, next_start, generation)
+
         if asyncio.iscoroutinefunction(func):
 
-            async def wrapper(*args):
-                while True:
-                    await func(*args)
-                    await sleep_async(self.sleep)
+            async def run(generation):
+                if generation != scheduler.generation:
+                    return
+                started = now()
+                if stats is not None:
+                    stats.add_start(started - deadline)
+                await func()
+                schedule_next(started, generation)
 
         else:
 
-            def wrapper(*args):
-                while True:
-                    func(*args)
-                    sleep(self.sleep)
-
-        CallbackBase.register_callback("on_repeat", wrapper)
+            def run(generation):
+                if generation != scheduler.generation:
+                    return
+                started = now()
+                if stats is not None:
+                    stats.add_start(started - deadline)
+                func()
+                schedule_next(started, generation)
+
+        # Stats of 'run' are stats of the decorated function
+        run.__qualname__ = name
+
+        def start(generation):
+            if generation == scheduler.generation:
+                state_machine.execute_on_repeat_from_outside(run, generation)
+
+        def first(generation=None):  # None is never the current one
+            nonlocal deadline
+            deadline = now()
+            start(generation)
+
+        CallbackBase.register_callback("on_repeat", first)
+        CallbackExecutor.add_to_takes_event(first)
+        CallbackExecutor.add_to_inline(first)
+        CallbackExecutor.add_to_not_measured(first)
+        CallbackExecutor.add_to_takes_event(run)
+        CallbackExecutor.register(run)
+        CallbackExecutor.register(run)
         return func
 
 
-def on_repeat(*func, sleep=0.1):
+def on_repeat(*func, sleep=None, rate=None, period=None, overrun="skip"):
     if len(func) >= 1 and (
         isinstance(func[0], (classmethod, staticmethod)) or callable(func[0])
     ):
@@ -277,5 +400,11 @@ def on_repeat(*func, sleep=0.1):
         title = "TITLE"
 
     return get_decorator(OnRepeat, title, "on_repeat", False)(
-        *func, **{"sleep": sleep}
+        *func,
+        **{
+            "sleep": sleep,
+            "rate": rate,
+            "period": period,
+            "overrun": overrun,
+        },
     )
@@ -1,2 +1,4 @@
+from .axis_event import AxisEvent
 from .event import Event
+from .input_snapshot import InputSnapshot
 from .system_event import SystemEvent
@@ -0,0 +1,33 @@
+import json
+
+from .event import Event
+
+
+class AxisEvent(Event):
+    """Event of an Axis, 'value' is between -1 and 1"""
+
+    def __init__(self, name, sender, key, value):
+        super().__init__(name, sender, key)
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    def _to_json(self):
+        return json.dumps(
+            {
+                "key": self._key,
+                "sender": self.sender,
+                "name": self.name,
+                "value": self.value,
+                "type": self._type,
+            }
+        )
+
+    def __repr__(self):
+        return (
+            f"AxisEvent(name='{self.name}', value={round(self.value, 3)}, "
+            f"is_active={self.is_active}, sender='{self.sender}', "
+            f"time={round(self.time, 3)})"
+        )
@@ -13,6 +13,12 @@ class Event:
         # Internal values
         self._key = key
         self._type = INPUT_EVENT
+        self._seq = None  # Per sender sequence number from the browser
+        # Browser send time in milliseconds, and bot clock times of
+        # sending (estimated from the browser time) and receiving
+        self._browser_time = None
+        self._sent = None
+        self._received = None
 
     def _set_time(self, time):
         self._time = time
@@ -56,8 +62,21 @@ class Event:
             }
         )
 
+    def __getstate__(self):
+        # Process callbacks get a snapshot, methods cannot be pickled
+        state = self.__dict__.copy()
+        if self._is_active is not None:
+            state["_is_active"] = self.is_active
+        return state
+
+    def __setstate__(self, state):
+        is_active = state["_is_active"]
+        self.__dict__.update(state)
+        if is_active is not None:
+            self._is_active = lambda: is_active
+
     def __repr__(self):
         return (
             f"Event(name='{self.name}', is_active={self.is_active}, sender='"
-            f"{self.sender}', time={self.time})"
+            f"{self.sender}', time={round(self.time, 3)})"
         )
@@ -0,0 +1,20 @@
+from ..constants import INPUT_SNAPSHOT
+
+
+class InputSnapshot:
+    """Keys a sender holds down and its axis values, the browser sends these
+    periodically so that events lost on a partially reliable datachannel
+    are recovered"""
+
+    def __init__(self, sender, seq, pressed, axes=None):
+        self.sender = sender
+        self.seq = seq
+        self.pressed = pressed  # frozenset of keys
+        self.axes = {} if axes is None else axes  # axis -> value
+        self._type = INPUT_SNAPSHOT
+
+    def __repr__(self):
+        return (
+            f"InputSnapshot(sender='{self.sender}', seq={self.seq}, "
+            f"pressed={sorted(self.pressed)}, axes={self.axes})"
+        )
@@ -30,16 +30,17 @@ class SystemEvent:
     def data(self):
         return self._data
 
+    def _to_dict(self):
+        return {
+            "type": self._type,
+            "name": self.name,
+            "value": self.value,
+            "text": self.text,
+            "data": self.data,
+        }
+
     def _to_json(self):
-        return json.dumps(
-            {
-                "type": self._type,
-                "name": self.name,
-                "value": self.value,
-                "text": self.text,
-                "data": self.data,
-            }
-        )
+        return json.dumps(self._to_dict())
 
     def __repr__(self):
         return (
@@ -6,11 +6,19 @@ from botafar._internal.callbacks.callback_base import CallbackBase
 from botafar._internal.events.system_event import SystemEvent
 
 from ..callback_executor import CallbackExecutor
-from ..constants import LISTEN_BROWSER_MESSAGE, SIGINT_MESSAGE
+from ..constants import (
+    LISTEN_BROWSER_MESSAGE,
+    SIGINT_MESSAGE,
+    STATS_LOG_INTERVAL,
+)
 from ..data_channel import DataChannel
-from ..decorators import DecoratorBase
+from ..decorators import DecoratorBase, get_repeat_stats
 from ..log_formatter import get_logger, setup_logging
+from ..outputs import outputs
+from ..process_backend import is_main_process
+from ..scheduler import scheduler
 from ..states import PRE_INIT, ServerEventProsessor, state_machine
+from ..stats import log_stats, register_stats
 from ..string_utils import error_to_string, get_welcome_message
 from .botafar_base import BotafarBase
 
@@ -19,7 +27,7 @@ main = None
 
 
 class Main(BotafarBase):
-    def __init__(self, suppress_keys, prints_removed):
+    def __init__(self, suppress_keys, prints_removed, **connection_options):
         self.prints_removed = prints_removed
         self.callback_executor = CallbackExecutor(
             self.done_callback, self._error_callback
@@ -30,21 +38,22 @@ class Main(BotafarBase):
             self.on_initial_browser_connect,
         )
         super().__init__(suppress_keys, prints_removed)
-        self.server = DataChannel(self.event_prosessor.process_event)
-        self.callback_executor.add_to_takes_event(self._send_event_async)
+        self.server = DataChannel(
+            self.event_prosessor.process_event, **connection_options
+        )
+        register_stats("callbacks", self.callback_executor.get_stats)
+        register_stats("timers", scheduler.get_stats)
+        register_stats("repeat", get_repeat_stats)
+        register_stats("outputs", outputs.get_stats)
         self.timeout_task = None
+        self.stats_task = None
 
     def send_event(self, event):
         if self.server.connected:
-            self.callback_executor.execute_callbacks(
-                [self._send_event_async], "_send_event", None, event=event
-            )
+            self.server.send(event)
         else:
             logger.debug("server was not connected, not sending")
 
-    async def _send_event_async(self, event):
-        await self.server.send(event)
-
     def print(self, string):
         if self.server.connected:
             self.send_event(
@@ -66,12 +75,17 @@ class Main(BotafarBase):
             CallbackBase.get_by_name(name), name, callback
         )
         await self.callback_executor.wait_until_finished(name)
-        # Await also all internal callbacks, such as _send
+        # Await also all internal callbacks, such as _stuck_warn
         await self.callback_executor.wait_until_all_finished()
 
     async def main(self):
         DecoratorBase.post_listen()
         state_machine.set_loop(self.loop)
+        self.stats_task = asyncio.create_task(log_stats(STATS_LOG_INTERVAL))
+        # Before any callback can sleep on the replaced event
+        self.callback_executor.start_process_pool(
+            state_machine.share_sleep_event
+        )
         try:
             state_machine.init()
             await self.run_callbacks("on_init", state_machine.wait_browser)
@@ -121,6 +135,8 @@ class Main(BotafarBase):
             await state_machine.wait_exit()
             # This is probably unnecessary but let's keep it for now
             await self.callback_executor.wait_until_all_finished()
+            self.callback_executor.shutdown_process_pool()
+            self.stats_task.cancel()
 
     def error_callback(self, e, sigint=False, exit=False):
         if self.timeout_task is not None:
@@ -194,13 +210,13 @@ def exit():
         )
 
 
-def _main(log_level, suppress_keys, prints_removed):
+def _main(log_level, suppress_keys, prints_removed, **connection_options):
     assert (
         state_machine.state == PRE_INIT
     ), "botafar.run() can be called only once"
     global main
     setup_logging(log_level)
-    main = Main(suppress_keys, prints_removed)
+    main = Main(suppress_keys, prints_removed, **connection_options)
     main.run()
 
 
@@ -230,15 +246,91 @@ def _main(log_level, suppress_keys, prints_removed):
     is_flag=True,
     help="Removes help messages from standard out.",
 )
-def _cli(log_level, no_help):
+@click.option(
+    "--ice-server",
+    "ice_server_urls",
+    metavar="URL",
+    multiple=True,
+    help=(
+        "STUN or TURN server url, can be given multiple times. "
+        "Default: stun:stun.l.google.com:19302."
+    ),
+)
+@click.option(
+    "--ice-username",
+    metavar="",
+    help="Username for the TURN servers given with --ice-server.",
+)
+@click.option(
+    "--ice-credential",
+    metavar="",
+    help="Credential for the TURN servers given with --ice-server.",
+)
+@click.option(
+    "--host-only",
+    is_flag=True,
+    help="Connect without STUN or TURN servers, fastest in the same network.",
+)
+@click.option(
+    "--gathering-timeout",
+    metavar="SECONDS",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Use only host candidates if the servers take longer to answer.",
+)
+def _cli(
+    log_level,
+    no_help,
+    ice_server_urls,
+    ice_username,
+    ice_credential,
+    host_only,
+    gathering_timeout,
+):
     suppress_keys = True
-    _main(log_level.upper(), suppress_keys, no_help)
-
-
-def run(cli=True):
+    # run() passes its own arguments through the click context, the
+    # command line options override them
+    options = dict(click.get_current_context().obj or {})
+    if len(ice_server_urls) != 0:
+        options["ice_servers"] = [
+            get_ice_server(url, ice_username, ice_credential)
+            for url in ice_server_urls
+        ]
+    if host_only:
+        options["ice_servers"] = None
+        options["host_only"] = True
+    if gathering_timeout is not None:
+        options["gathering_timeout"] = gathering_timeout
+    _main(log_level.upper(), suppress_keys, no_help, **options)
+
+
+def get_ice_server(url, username, credential):
+    if url.startswith("stun:") or (username is None and credential is None):
+        return url
+    return {"urls": url, "username": username, "credential": credential}
+
+
+def run(
+    cli=True,
+    max_retransmits=None,
+    max_packet_life_time=None,
+    ice_servers=None,
+    host_only=False,
+    gathering_timeout=None,
+):
+    if not is_main_process():
+        # Worker processes of backend='process' may import the bot again
+        return
+
+    options = {
+        "max_retransmits": max_retransmits,
+        "max_packet_life_time": max_packet_life_time,
+        "ice_servers": ice_servers,
+        "host_only": host_only,
+        "gathering_timeout": gathering_timeout,
+    }
     if cli:
         _cli.main(
-            standalone_mode=False
+            standalone_mode=False, obj=options
         )  # Why not just _cli(): https://stackoverflow.com/a/60321370/7388328
     else:
-        _main("INFO", 1996, False, False)
+        _main("INFO", True, False, **options)
@@ -0,0 +1,270 @@
+from math import exp, floor, isfinite
+from threading import Event, Lock, Thread, get_ident
+
+from .clock import now
+from .constants import (
+    OUTPUT_CLOSE_TIMEOUT,
+    OUTPUT_TOLERANCE,
+    OUTPUT_UPDATE_FREQ,
+)
+from .log_formatter import get_logger
+from .stats import Histogram
+from .string_utils import error_to_string
+
+logger = get_logger()
+
+
+def check_value(name, value):
+    """Raises ValueError in the caller, the update thread would crash"""
+    if (
+        not isinstance(value, (int, float))
+        or isinstance(value, bool)
+        or not isfinite(value)
+    ):
+        raise ValueError(f"Output {name} should be a number, not {value!r}")
+
+
+class Output:
+    """Value of an actuator, such as a motor or a servo, that follows its
+    target smoothly
+
+    'setter' is called with the new value on every update. The value moves
+    towards the target at most 'rate' per second, or exponentially with
+    'time_constant' in seconds (63% of the way in one time constant). With
+    neither, the target is set on the next update. On stop the target is
+    set to 'safe', unless it is None, and on exit the safe value is set
+    right away. 'initial' should be the value the actuator has already.
+    """
+
+    def __init__(
+        self,
+        setter,
+        rate=None,
+        time_constant=None,
+        initial=0.0,
+        safe=0.0,
+    ):
+        assert callable(setter), f"setter should be callable, not {setter}"
+        assert (
+            rate is None or time_constant is None
+        ), "Output can have a rate or a time_constant, not both"
+        assert rate is None or (
+            isinstance(rate, (int, float)) and rate > 0
+        ), f"rate should be more than 0, not {rate}"
+        assert time_constant is None or (
+            isinstance(time_constant, (int, float)) and time_constant > 0
+        ), f"time_constant should be more than 0 seconds, not {time_constant}"
+        check_value("initial", initial)
+        if safe is not None:
+            check_value("safe", safe)
+
+        self._setter = setter
+        self._rate = rate
+        self._time_constant = time_constant
+        self._value = initial
+        self._target = initial
+        self._safe = safe
+        self._immediate = False  # Skip smoothing on the next update
+        self._loop = outputs
+        outputs.add(self)
+
+    @property
+    def value(self):
+        """Latest value given to the setter"""
+        return self._value
+
+    @property
+    def target(self):
+        return self._target
+
+    @target.setter
+    def target(self, target):
+        self.set(target)
+
+    def set(self, target, immediate=False):
+        """Sets the target, 'immediate' skips the smoothing"""
+        check_value("target", target)
+        self._loop.set_target(self, target, immediate)
+
+    def _step(self, elapsed):
+        """Returns the next value after 'elapsed' seconds"""
+        difference = self._target - self._value
+        if abs(difference) <= OUTPUT_TOLERANCE:
+            return self._target
+        if self._rate is not None:
+            step = self._rate * elapsed
+            if abs(difference) <= step:
+                return self._target
+            return self._value + (step if difference > 0 else -step)
+        if self._time_constant is not None:
+            return self._target - difference * exp(
+                -elapsed / self._time_constant
+            )
+        return self._target
+
+    def __repr__(self):
+        return f"Output(value={self._value}, target={self._target})"
+
+
+class OutputLoop:
+    """Updates all Outputs together at OUTPUT_UPDATE_FREQ
+
+    One thread calls the setters, so setters do not need locks. Updates run
+    at fixed deadlines of the monotonic clock, new targets are picked up on
+    the next one. Late updates skip to the next deadline and use the actual
+    elapsed time. The thread sleeps until a target changes when all outputs
+    are at their targets.
+    """
+
+    def __init__(self, freq=OUTPUT_UPDATE_FREQ):
+        self.period = 1 / freq
+        self.outputs = []
+        self.moving = set()  # Outputs not at their targets
+        self.lock = Lock()
+        self.wakeup = Event()  # Set when a target changes
+        self.closing = Event()
+        self.thread = None
+        self.closed = False
+        self.updates = 0
+        self.skipped = 0
+        self.errors = 0
+        # From the deadline until the update started
+        self.jitter = Histogram()
+
+    def add(self, output):
+        with self.lock:
+            self.outputs.append(output)
+
+    def set_target(self, output, target, immediate=False):
+        with self.lock:
+            output._target = target
+            # Set by the thread too, value is always what the setter got
+            output._immediate = immediate
+            self.moving.add(output)
+            if self.thread is None and not self.closed:
+                self.thread = Thread(
+                    target=self._run, name="botafar-outputs", daemon=True
+                )
+                self.thread.start()
+        self.wakeup.set()
+
+    def to_safe(self):
+        """Targets of all outputs to their safe values, on stop"""
+        for output in list(self.outputs):
+            if output._safe is not None:
+                self.set_target(output, output._safe)
+
+    def close(self, timeout=OUTPUT_CLOSE_TIMEOUT):
+        """Sets the safe values right away and stops the thread, on exit
+
+        The thread sets the safe values itself before it stops, so setters
+        are never called from two threads. Without a thread they are set
+        here.
+        """
+        with self.lock:
+            self.closed = True
+            thread = self.thread
+        self.closing.set()
+        self.wakeup.set()
+        if thread is None:
+            self._set_safe_and_reopen()
+        elif thread.ident != get_ident():
+            thread.join(timeout=timeout)
+            if thread.is_alive():
+                # Still closed, so a second thread is not started
+                logger.warning(
+                    "Output setter has blocked for over "
+                    f"{timeout} seconds, safe values are set after it"
+                )
+
+    def _set_safe_and_reopen(self):
+        for output in list(self.outputs):
+            if output._safe is not None:
+                output._target = output._safe
+                if output._value != output._safe:
+                    self._call_setter(output, output._safe)
+        self.closing.clear()
+        with self.lock:
+            self.moving.clear()
+            self.thread = None
+            self.closed = False
+
+    def _run(self):
+        deadline = now()
+        previous = deadline - self.period
+        while True:
+            self.wakeup.clear()
+            with self.lock:
+                closed = self.closed
+                moving = list(self.moving)
+            if closed:
+                self._set_safe_and_reopen()
+                return
+            if len(moving) == 0:
+                self.wakeup.wait()
+                # First update after idling moves one period worth
+                deadline = now()
+                previous = deadline - self.period
+                continue
+
+            time = now()
+            self.jitter.add(max(0.0, time - deadline))
+            self.updates += 1
+            elapsed = time - previous
+            previous = time
+            for output in moving:
+                with self.lock:
+                    try:
+                        if output._immediate:
+                            output._immediate = False
+                            value = output._target
+                        else:
+                            value = output._step(elapsed)
+                    except Exception as e:
+                        # One broken output does not stop the others
+                        self.errors += 1
+                        self.moving.discard(output)
+                        logger.error(
+                            f"Output update failed:\n{error_to_string(e)}"
+                        )
+                        continue
+                    if value == output._target:
+                        self.moving.discard(output)
+                if value != output._value and not self._call_setter(
+                    output, value
+                ):
+                    # Tried again only with a new target
+                    with self.lock:
+                        self.moving.discard(output)
+
+            # Fixed rate, deadlines that passed already are skipped
+            deadline += self.period
+            late = now() - deadline
+            if late > 0:
+                skipped = floor(late / self.period) + 1
+                self.skipped += skipped
+                deadline += skipped * self.period
+            self.closing.wait(deadline - now())
+
+    def _call_setter(self, output, value):
+        try:
+            output._setter(value)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Output setter failed:\n{error_to_string(e)}")
+            return False
+        output._value = value
+        return True
+
+    def get_stats(self):
+        return {
+            "outputs": len(self.outputs),
+            "moving": len(self.moving),
+            "updates": self.updates,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "jitter": self.jitter.to_dict(),
+        }
+
+
+outputs = OutputLoop()
@@ -0,0 +1,68 @@
+import asyncio
+import multiprocessing
+import sys
+from functools import lru_cache
+from importlib import import_module
+
+from .clock import now
+from .exceptions import SleepCancelledError
+from .log_formatter import get_logger
+
+logger = get_logger()
+
+THREAD = "thread"
+PROCESS = "process"
+BACKENDS = (THREAD, PROCESS)
+
+
+def is_main_process():
+    return multiprocessing.current_process().name == "MainProcess"
+
+
+def get_process_target(callback):
+    """Returns (module, qualname) that worker processes find callback with"""
+    module = getattr(callback, "__module__", None)
+    qualname = getattr(callback, "__qualname__", "")
+    found = getattr(sys.modules.get(module), qualname, None)
+    # Decorators leave their own object to the module, unwrap it
+    while found is not callback and hasattr(found, "func_original"):
+        found = found.func_original
+
+    if (
+        found is not callback
+        or "." in qualname
+        or asyncio.iscoroutinefunction(callback)
+    ):
+        raise RuntimeError(
+            "backend='process' works only with module level functions "
+            f"that are not async, not with {callback}"
+        )
+    return (module, qualname)
+
+
+def init_process(sleep_event):
+    # Imported here, states cannot be imported before the executor
+    from .states import state_machine
+    from .states.cancel_token import CancelToken
+
+    if sleep_event is not None:
+        state_machine.sleep_token = CancelToken(sleep_event)
+
+
+@lru_cache(maxsize=None)
+def _find(module, qualname):
+    return getattr(import_module(module), qualname)
+
+
+def run_in_process(target, takes_event, event, submitted):
+    """Returns (queue wait, run time), the clock is system wide"""
+    started = now()
+    function = _find(*target)
+    try:
+        if takes_event and event is not None:
+            function(event)
+        else:
+            function()
+    except SleepCancelledError:
+        logger.debug("SleepCancelledError suppressed")
+    return (started - submitted, now() - started)
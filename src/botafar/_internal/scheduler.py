@@ -0,0 +1,177 @@
+from heapq import heappop, heappush
+from math import ceil, floor
+from threading import Lock, get_ident
+
+from . import clock
+from .constants import TIMER_RESOLUTION, TIMER_SLOTS
+from .log_formatter import get_logger
+from .stats import Histogram
+
+logger = get_logger()
+
+
+class Timer:
+    __slots__ = ("deadline", "tick", "callback", "generation", "cancelled")
+
+    def __init__(self, deadline, tick, callback, generation):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.generation = generation
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Calls timers on the event loop when they are due
+
+    A hashed timer wheel: deadlines are rounded up to ticks of
+    TIMER_RESOLUTION seconds and stored in one of TIMER_SLOTS slots, so
+    adding and cancelling a timer is O(1). A heap of the ticks that have
+    timers gives the next wakeup without scanning the slots. The loop wakes
+    up only for the next tick that has a timer, and 'cancel_all' drops
+    every timer at once.
+    Timer callbacks run on the loop, so they should only start callbacks
+    with the CallbackExecutor, not run user code or wait for locks. Only
+    callbacks the user marked inline=True run on the loop then.
+    """
+
+    def __init__(self, resolution=TIMER_RESOLUTION, slots=TIMER_SLOTS):
+        self.resolution = resolution
+        self.slots = [[] for _ in range(slots)]
+        self.current = floor(clock.now() / resolution)  # Latest ticked
+        self.ticks = []  # Heap of ticks that have timers, each once
+        self.queued = set()  # Ticks in the heap
+        self.generation = 0  # Incremented by 'cancel_all'
+        self.loop = None
+        self.loop_thread = None
+        self.handle = None  # Loop TimerHandle of the next wakeup
+        self.wakeup = None  # Tick of the next wakeup
+        # Slots are changed from worker threads too
+        self.lock = Lock()
+        self.pending = 0
+        self.fired = 0
+        self.wakeups = 0
+        self.lateness = Histogram()
+
+    def set_loop(self, loop):
+        # Called from the loop thread
+        self.loop = loop
+        self.loop_thread = get_ident()
+        self._reschedule()
+
+    def call_at(self, deadline, callback, generation=None):
+        """Calls 'callback' at 'deadline' of clock.now(), returns a Timer
+
+        A timer of an old 'generation' is cancelled right away, as
+        'cancel_all' was called after the caller read the generation
+        """
+        with self.lock:
+            tick = max(ceil(deadline / self.resolution), self.current + 1)
+            timer = Timer(deadline, tick, callback, self.generation)
+            if generation is not None and generation != self.generation:
+                timer.cancel()
+                return timer
+            self.slots[tick % len(self.slots)].append(timer)
+            if tick not in self.queued:
+                self.queued.add(tick)
+                heappush(self.ticks, tick)
+            self.pending += 1
+            if self.wakeup is not None and tick >= self.wakeup:
+                return timer  # Woken up earlier anyway
+        self._call_on_loop(self._reschedule)
+        return timer
+
+    def call_later(self, delay, callback, generation=None):
+        return self.call_at(clock.now() + delay, callback, generation)
+
+    def cancel_all(self):
+        with self.lock:
+            for tick in self.ticks:
+                self.slots[tick % len(self.slots)].clear()
+            self.ticks.clear()
+            self.queued.clear()
+            self.pending = 0
+            self.generation += 1
+        self._call_on_loop(self._reschedule)
+
+    def _call_on_loop(self, function):
+        if self.loop is None:
+            return  # Rescheduled in 'set_loop'
+        if get_ident() == self.loop_thread:
+            function()
+            return
+        try:
+            self.loop.call_soon_threadsafe(function)
+        except RuntimeError:
+            logger.debug("Timer loop closed")
+
+    def _next_tick(self):
+        # Called with self.lock held
+        return self.ticks[0] if len(self.ticks) != 0 else None
+
+    def _reschedule(self):
+        # Called on the loop. Wakeup is changed only with the lock held,
+        # so 'call_at' can see whether a timer needs an earlier wakeup
+        with self.lock:
+            tick = self._next_tick()
+            if tick == self.wakeup:
+                return
+
+            if self.handle is not None:
+                self.handle.cancel()
+                self.handle = None
+            self.wakeup = tick
+            if tick is not None:
+                delay = max(0.0, tick * self.resolution - clock.now())
+                self.handle = self.loop.call_later(delay, self._advance)
+
+    def _advance(self):
+        now = clock.now()
+        target = floor(now / self.resolution)
+        due = []
+        with self.lock:
+            self.handle = None
+            self.wakeup = None
+            self.wakeups += 1
+            size = len(self.slots)
+            # Only the slots of due ticks, the heap has each tick once
+            while len(self.ticks) != 0 and self.ticks[0] <= target:
+                tick = heappop(self.ticks)
+                self.queued.discard(tick)
+                slot = self.slots[tick % size]
+                later = []
+                for timer in slot:
+                    if timer.tick == tick:
+                        due.append(timer)
+                    else:
+                        later.append(timer)  # Due on a later round
+                slot[:] = later
+            self.current = max(self.current, target)
+            self.pending -= len(due)
+            generation = self.generation
+
+        due.sort(key=lambda timer: timer.deadline)
+        try:
+            for timer in due:
+                if timer.cancelled or timer.generation != generation:
+                    continue
+                self.fired += 1
+                self.lateness.add(now - timer.deadline)
+                timer.callback()
+        finally:
+            self._reschedule()
+
+    def get_stats(self):
+        return {
+            "pending": self.pending,
+            "fired": self.fired,
+            "wakeups": self.wakeups,
+            # Seconds from the deadline until the timer was called
+            "lateness": self.lateness.to_dict(),
+        }
+
+
+scheduler = TimerWheel()
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from ..exceptions import SleepCancelledError
+
+
+class CancelToken:
+    """Sleeps of one generation, such as one session, cancelled at once
+
+    Sleepers wait on the token that was current when they started. A new
+    generation replaces the token instead of clearing a shared event, so
+    sleepers of the old one stay cancelled and new ones are not affected.
+    'event' can be a multiprocessing.Event shared with worker processes.
+    """
+
+    def __init__(self, event=None):
+        self.event = threading.Event() if event is None else event
+        self.lock = threading.Lock()
+        self.waiters = {}  # asyncio.Future -> its loop
+
+    @property
+    def is_cancelled(self):
+        return self.event.is_set()
+
+    def cancel(self):
+        with self.lock:
+            self.event.set()
+            waiters = self.waiters
+            self.waiters = {}
+        for waiter, loop in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # Loop closed, nothing waits anymore
+
+    def sleep(self, secs):
+        # Raises also when secs=0 and cancelled already
+        if self.event.wait(timeout=secs):
+            raise SleepCancelledError()
+
+    async def sleep_async(self, secs):
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self.lock:
+            if self.event.is_set():
+                raise SleepCancelledError()
+            self.waiters[waiter] = loop
+
+        try:
+            await asyncio.wait_for(waiter, timeout=secs)
+        except asyncio.TimeoutError:
+            return
+        finally:
+            with self.lock:
+                self.waiters.pop(waiter, None)
+        raise SleepCancelledError()
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
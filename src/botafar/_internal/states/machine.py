@@ -0,0 +1,84 @@
+class MachineError(Exception):
+    pass
+
+
+class Machine:
+    """Table driven state machine, replaces transitions.Machine
+
+    Has only the parts of transitions that botafar used. Transitions are
+    compiled into a table of trigger -> source state -> (destination,
+    conditions, after hook), with the conditions and hooks bound to the
+    model, so triggering is a dictionary lookup. Like in transitions, a
+    trigger method is added to the model for each trigger, failing
+    conditions return False, and triggers that are not valid in the current
+    state raise MachineError, unless the state ignores them. Hooks that
+    trigger again do it right away, not queued.
+    """
+
+    def __init__(self, model, states, initial, ignore_invalid_triggers=()):
+        self.model = model
+        self.states = tuple(states)
+        self.ignore_invalid_triggers = frozenset(ignore_invalid_triggers)
+        self.table = {}  # trigger -> {source: (dest, conditions, after)}
+        model.state = initial
+
+    def add_transition(self, trigger, source, dest, conditions=(), after=None):
+        if source == "*":
+            sources = self.states
+        elif isinstance(source, str):
+            sources = (source,)
+        else:
+            sources = tuple(source)
+        if isinstance(conditions, str):
+            conditions = (conditions,)
+        assert all(s in self.states for s in (*sources, dest))
+
+        transition = (
+            dest,
+            tuple(self._get_condition(c) for c in conditions),
+            getattr(self.model, after) if after is not None else None,
+        )
+        if trigger not in self.table:
+            self.table[trigger] = {}
+            setattr(
+                self.model,
+                trigger,
+                lambda trigger=trigger: self.trigger(trigger),
+            )
+        for s in sources:
+            self.table[trigger][s] = transition
+
+    def _get_condition(self, name):
+        condition = getattr(self.model, name)
+        if callable(condition):
+            return condition
+        # Attributes are read when triggered, like in transitions
+        return lambda: getattr(self.model, name)
+
+    def is_valid(self, trigger):
+        return self.model.state in self.table[trigger]
+
+    def trigger(self, trigger, strict=True):
+        """Returns True if the state changed, False if conditions failed
+
+        Invalid triggers return None when not 'strict'
+        """
+        transition = self.table[trigger].get(self.model.state)
+        if transition is None:
+            if self.model.state in self.ignore_invalid_triggers:
+                return False
+            if not strict:
+                return None
+            raise MachineError(
+                f"Can't trigger event {trigger} from state {self.model.state}"
+            )
+
+        dest, conditions, after = transition
+        for condition in conditions:
+            if not condition():
+                return False
+
+        self.model.state = dest
+        if after is not None:
+            after()
+        return True
@@ -1,11 +1,17 @@
 from distutils.version import LooseVersion
-from time import time as _time
 
 from ... import __version__
-from ..constants import SYSTEM_EVENT
+from ..clock import now
+from ..constants import INPUT_SNAPSHOT, SYSTEM_EVENT
 from ..controls import ControlBase
-from ..events import SystemEvent
+from ..data_channel.wire_format import (
+    is_newer_seq,
+    negotiate_input_event_format,
+    negotiate_outbound_batching,
+)
+from ..events import AxisEvent, Event, SystemEvent
 from ..log_formatter import get_logger
+from ..stats import register_stats
 from .server_state_machine import state_machine
 
 logger = get_logger()
@@ -27,11 +33,42 @@ class ServerEventProsessor:
             self.inform, self.notify_state_change, callback_executor
         )
         self.browser_has_been_conected = False
+        # Sequence numbers let the datachannel drop and reorder input events
+        self.latest_seqs = {}  # (sender, key) -> latest accepted seq
+        self.snapshot_seqs = {}  # sender -> latest accepted snapshot seq
+        self.pressed = {}  # sender -> set of keys the browser holds down
+        self.axes = {}  # sender -> {axis: latest value from the browser}
+        self.stale_inputs = 0
+        self.reconciled_inputs = 0
+        ControlBase._process_input_event = self.process_input_event
+        register_stats("inputs", self.get_stats)
+
+    def get_stats(self):
+        return {
+            "stale": self.stale_inputs,
+            "reconciled": self.reconciled_inputs,
+        }
+
+    def reset_seqs(self, sender=None):
+        """Browsers start counting from zero again when they reconnect"""
+        if sender is None:
+            self.latest_seqs.clear()
+            self.snapshot_seqs.clear()
+            self.pressed.clear()
+            self.axes.clear()
+            return
+
+        for seq_key in [k for k in self.latest_seqs if k[0] == sender]:
+            del self.latest_seqs[seq_key]
+        self.snapshot_seqs.pop(sender, None)
+        self.pressed.pop(sender, None)
+        self.axes.pop(sender, None)
 
     def process_event(self, event):  # noqa: C901
         if event._type == SYSTEM_EVENT:
             if event.name == "browser_connect":
                 if not state_machine.browser_connected:
+                    self.reset_seqs()
                     self.on_browser_connect(event.data)
                     state_machine.on_browser_connect()
             elif event.name == "browser_disconnect":
@@ -40,6 +77,7 @@ class ServerEventProsessor:
                     state_machine.on_browser_disconnect()
             elif event.name == "owner_connect":
                 if not state_machine.owner.is_connected:
+                    self.reset_seqs("owner")
                     self.on_owner_connect()
                     state_machine.on_owner_connect()
             elif event.name == "owner_disconnect":
@@ -49,6 +87,7 @@ class ServerEventProsessor:
             elif event.name == "player_connect":
                 if not state_machine.player.is_connected:
                     name = event.value
+                    self.reset_seqs("player")
                     self.on_player_connect(name)
                     state_machine.on_player_connect(name)
             elif event.name == "player_disconnect":
@@ -59,32 +98,136 @@ class ServerEventProsessor:
                 bot_behavior = event.data.get("botBehavior")
                 if bot_behavior is not None:
                     state_machine.on_bot_behavior_update(bot_behavior)
+            elif event.name == "connection_interrupted":
+                self.release_pressed()
             elif event.name == "info":
                 pass
             else:
                 logger.warning(f"Unknown system event {event.name}")
+        elif event._type == INPUT_SNAPSHOT:
+            self.reconcile(event)
         else:  # INPUT_EVENT
-            if (
-                event.sender == "player"
-                and not state_machine.player._is_controlling
-            ):
-                logger.debug("Player controls disabled, skipping")
+            if event._seq is not None and not self.accept_seq(event):
                 return
+            # Controls change the event while processing it
+            sender, key, name = event.sender, event._key, event.name
+            value = event.value if isinstance(event, AxisEvent) else None
+            if not self.process_input_event(event):
+                return  # Not delivered, so not held either
+            if isinstance(event, AxisEvent):
+                self.axes.setdefault(sender, {})[key] = value
+            else:
+                self.track_pressed(sender, key, name)
 
-            if event.sender == "player":
-                state_machine.latest_player_control_time = _time()
-            elif event.sender == "owner":
-                state_machine.latest_owner_control_time = _time()
+    def accept_seq(self, event):
+        seq_key = (event.sender, event._key)
+        latest = self.latest_seqs.get(seq_key)
+        snapshot_seq = self.snapshot_seqs.get(event.sender)
+        if (latest is not None and not is_newer_seq(event._seq, latest)) or (
+            snapshot_seq is not None
+            and not is_newer_seq(event._seq, snapshot_seq)
+        ):
+            self.stale_inputs += 1
+            logger.debug(f"Stale input event skipped: {event.name} {seq_key}")
+            return False
 
-            event._set_time(state_machine.time())
-            callbacks = ControlBase._get_callbacks(event)
+        self.latest_seqs[seq_key] = event._seq
+        return True
 
-            self.callback_executor.execute_callbacks(
-                callbacks,
-                event.name,
-                state_machine.on_control_finished_callback,
-                event=event,
-            )
+    def track_pressed(self, sender, key, name):
+        pressed = self.pressed.setdefault(sender, set())
+        if name == "on_press":
+            pressed.add(key)
+        elif name == "on_release":
+            pressed.discard(key)
+        else:
+            # Direction events set every key of the control at once
+            control = ControlBase._event_callbacks.get((key, sender))
+            held = None if control is None else control._get_held_keys()
+            if held is None:
+                return
+            pressed.difference_update(control._alternative_map)
+            pressed.difference_update(control._key_bits)
+            pressed.update(held)
+
+    def release_pressed(self):
+        """Held keys are pressed again and axes moved back by the first
+        snapshot after this"""
+        for sender, pressed in self.pressed.items():
+            for key in sorted(pressed):
+                logger.debug(f"Connection interrupted, releasing {key}")
+                self.process_input_event(Event("on_release", sender, key))
+            pressed.clear()
+        for sender, axes in self.axes.items():
+            for axis in sorted(axes):
+                if axes[axis] != 0:
+                    logger.debug(f"Connection interrupted, centering {axis}")
+                    axes[axis] = 0.0
+                    self.process_input_event(
+                        AxisEvent(None, sender, axis, 0.0)
+                    )
+
+    def reconcile(self, snapshot):
+        """Sends the presses, releases and axis values that were lost on
+        the way"""
+        sender = snapshot.sender
+        latest = self.snapshot_seqs.get(sender)
+        if latest is not None and not is_newer_seq(snapshot.seq, latest):
+            logger.debug(f"Stale input snapshot skipped: {snapshot}")
+            return
+        self.snapshot_seqs[sender] = snapshot.seq
+
+        pressed = self.pressed.setdefault(sender, set())
+        for key in sorted(pressed ^ snapshot.pressed):
+            key_seq = self.latest_seqs.get((sender, key))
+            if key_seq is not None and is_newer_seq(key_seq, snapshot.seq):
+                continue  # An event newer than the snapshot already arrived
+
+            name = "on_press" if key in snapshot.pressed else "on_release"
+            if self.process_input_event(Event(name, sender, key)):
+                logger.debug(f"Input snapshot reconciled {name} {key}")
+                self.reconciled_inputs += 1
+                self.track_pressed(sender, key, name)
+
+        axes = self.axes.setdefault(sender, {})
+        for axis, value in sorted(snapshot.axes.items()):
+            if axes.get(axis, 0.0) == value:
+                continue
+            axis_seq = self.latest_seqs.get((sender, axis))
+            if axis_seq is not None and is_newer_seq(axis_seq, snapshot.seq):
+                continue
+
+            if self.process_input_event(AxisEvent(None, sender, axis, value)):
+                logger.debug(f"Input snapshot reconciled {axis} {value}")
+                self.reconciled_inputs += 1
+                axes[axis] = value
+
+    def process_input_event(self, event):
+        """Returns False if the event was not delivered to the controls"""
+        if (
+            event.sender == "player"
+            and not state_machine.player._is_controlling
+        ):
+            logger.debug("Player controls disabled, skipping")
+            return False
+
+        if event.sender == "player":
+            state_machine.latest_player_control_time = now()
+        elif event.sender == "owner":
+            state_machine.latest_owner_control_time = now()
+
+        event._set_time(state_machine.time())
+        callbacks = ControlBase._get_callbacks(event)
+        if event.name is None:
+            return True  # Axis value filtered out, nothing to wake up
+
+        self.callback_executor.execute_callbacks(
+            callbacks,
+            event.name,
+            state_machine.on_control_finished_callback,
+            event=event,
+        )
+        return True
 
     def inform(self, message):
         logger.info(message)
@@ -99,9 +242,18 @@ class ServerEventProsessor:
             self.browser_has_been_conected = True
         else:
             self.inform("browser connected")
+        # Browsers that do not negotiate anything get value None
+        value = {}
+        input_event_format = negotiate_input_event_format(data)
+        if input_event_format is not None:
+            value["inputEventFormat"] = input_event_format
+        if negotiate_outbound_batching(data):
+            value["outboundBatching"] = True
+        if len(value) == 0:
+            value = None
         self.send_event(
             SystemEvent(
-                "connect_ok", None, data=ControlBase._get_control_datas()
+                "connect_ok", value, data=ControlBase._get_control_datas()
             )
         )
         latest_version = data.get("latestBotafarVersion")
@@ -138,7 +290,7 @@ class ServerEventProsessor:
             return
 
         if not state_machine.owner._is_controlling:
-            state_machine.latest_owner_control_time = _time()
+            state_machine.latest_owner_control_time = now()
             state_machine.owner._is_controlling = True
             if state_machine.player._is_controlling:
                 self.inform(
@@ -154,7 +306,7 @@ class ServerEventProsessor:
             return
 
         if state_machine.owner._is_controlling:
-            state_machine.latest_player_control_time = _time()  # Reset player
+            state_machine.latest_player_control_time = now()  # Reset player
             state_machine.owner._is_controlling = False
             if state_machine.player._is_controlling:
                 self.inform(
@@ -165,7 +317,7 @@ class ServerEventProsessor:
                 self.inform("owner stopped controlling")
 
     def on_player_connect(self, name):
-        state_machine.latest_player_control_time = _time()
+        state_machine.latest_player_control_time = now()
         if state_machine.player.is_connected:
             logger.debug("Player already connected")
             return
@@ -1,16 +1,16 @@
 import asyncio
+import multiprocessing
 import threading
-from time import sleep as _sleep
-from time import time as _time
-
-from transitions import Machine
-from transitions import State as State_
-from transitions import core
 
+from ..callback_executor import RELEASE
 from ..callbacks import CallbackBase
+from ..clock import now, now_ns, seconds_since
 from ..controls import ControlBase
-from ..exceptions import SleepCancelledError
 from ..log_formatter import get_logger
+from ..outputs import outputs
+from ..scheduler import scheduler
+from .cancel_token import CancelToken
+from .machine import Machine
 
 logger = get_logger()
 
@@ -126,27 +126,32 @@ class ServerStateMachine:
         WAITING_OWNER_OR_PLAYER,
         START,
         WAITING_STOP,
-        State_(STOP_IMMEDIATE, ignore_invalid_triggers=True),
+        STOP_IMMEDIATE,
         STOP,
-        State_(EXIT_IMMEDIATE, ignore_invalid_triggers=True),
+        EXIT_IMMEDIATE,
         EXIT,
     ]
 
     def __init__(self):
         self.owner = Owner()
         self.player = Player()
-        self.start_time = -1
+        self.start_time = -1  # now_ns() of on_start, -1 when not started
         self.machine = Machine(
-            model=self, states=self.states, initial=PRE_INIT
+            model=self,
+            states=self.states,
+            initial=PRE_INIT,
+            ignore_invalid_triggers=[STOP_IMMEDIATE, EXIT_IMMEDIATE],
         )
 
         # At least 'all_finished' and 'reset_controls'
         # needs to be synced as it might otherwise show
         # all_finished too early, others might be unnecessary
         self.rlock = threading.RLock()
-        self.sleep_event_sync = threading.Event()
-        self.internal_sleep_event_sync = threading.Event()
-        self.sleep_event_async = None  # Added later when the loop starts
+        # Sleeps are cancelled by cancelling the token of their generation,
+        # a new generation gets a new token
+        self.sleep_token = CancelToken()  # botafar.sleep() and sleep_async()
+        self.stuck_token = CancelToken()  # The latest stuck warning
+        self.shared_sleep_event = None  # Added if worker processes are used
         self.exit_event = None  # Added later when the loop starts
         self.callback_executor = None  # Added later also
 
@@ -156,8 +161,8 @@ class ServerStateMachine:
         self.browser_connected = False
         self.start_reason = None  # None | "owner" | "player"
         self.stop_reason = None  # None | string
-        self.latest_player_control_time = _time()
-        self.latest_owner_control_time = _time()
+        self.latest_player_control_time = now()
+        self.latest_owner_control_time = now()
 
         self.bot_behavior = {
             "controlTime": 60,
@@ -253,11 +258,10 @@ class ServerStateMachine:
             )
 
     def all_finished(self):
-        with self.rlock:
-            running_names = self.callback_executor.running_names
-            if len(running_names) != 0:
-                logger.debug(f"Running: {running_names}")
-            return len(running_names) == 0
+        running_names = self.callback_executor.running_names
+        if len(running_names) != 0:
+            logger.debug(f"Running: {running_names}")
+        return len(running_names) == 0
 
     def all_finished_and_no_one_connected(self):
         return (
@@ -266,18 +270,14 @@ class ServerStateMachine:
             and not self.player.is_connected
         )
 
-    def execute(self, name, callback, callback_name):
-        def safe_callback():
-            self.safe_state_change(callback, callback_name, name)
-
+    def execute(self, name, callback):
         self.callback_executor.execute_callbacks(
-            CallbackBase.get_by_name(name), name, safe_callback
+            CallbackBase.get_by_name(name), name, callback
         )
 
-    def safe_state_change(self, function, name, origin):
-        try:
-            function()
-        except core.MachineError:
+    def safe_state_change(self, name, origin):
+        # Probed often, so checked without raising
+        if self.machine.trigger(name, strict=False) is None:
             logger.debug(f"Transition '{name}' skipped (origin: {origin})")
 
     # transition conditions requires this
@@ -293,40 +293,34 @@ class ServerStateMachine:
     def on_browser_connect(self):
         with self.rlock:
             self.browser_connected = True
-            self.safe_state_change(self.prepare, "prepare", "browser_connect")
-            self.safe_state_change(self.start, "start", "browser_connect")
+            self.safe_state_change("prepare", "browser_connect")
+            self.safe_state_change("start", "browser_connect")
 
     def on_browser_disconnect(self):
         with self.rlock:
             self.browser_connected = False
             if self.state != EXIT_IMMEDIATE:
-                self.safe_state_change(
-                    self.stop_immediate, "stop_immediate", "browser_disconnect"
-                )
+                self.safe_state_change("stop_immediate", "browser_disconnect")
 
     def on_owner_connect(self):
         with self.rlock:
             self.owner._is_connected = True
-            self.safe_state_change(self.prepare, "prepare", "owner_connect")
-            self.safe_state_change(self.start, "start", "owner_connect")
+            self.safe_state_change("prepare", "owner_connect")
+            self.safe_state_change("start", "owner_connect")
 
     def on_owner_disconnect(self):
         with self.rlock:
             self.owner._is_connected = False
             if self.start_reason == "owner" and self.state != EXIT_IMMEDIATE:
-                self.safe_state_change(
-                    self.stop_immediate, "stop_immediate", "owner_disconnect"
-                )
-            self.safe_state_change(
-                self.wait_browser, "wait_browser", "owner_disconnect"
-            )
+                self.safe_state_change("stop_immediate", "owner_disconnect")
+            self.safe_state_change("wait_browser", "owner_disconnect")
 
     def on_player_connect(self, name):
         with self.rlock:
             self.player._name = name
             self.player._is_connected = True
             self.player._is_controlling = True
-            self.safe_state_change(self.start, "start", "player_connect")
+            self.safe_state_change("start", "player_connect")
 
     def on_player_disconnect(self):
         with self.rlock:
@@ -334,12 +328,8 @@ class ServerStateMachine:
             self.player._is_connected = False
             self.player._is_controlling = False
             if self.start_reason == "player" and self.state != EXIT_IMMEDIATE:
-                self.safe_state_change(
-                    self.stop_immediate, "stop_immediate", "player_disconnect"
-                )
-            self.safe_state_change(
-                self.wait_browser, "wait_browser", "player_disconnect"
-            )
+                self.safe_state_change("stop_immediate", "player_disconnect")
+            self.safe_state_change("wait_browser", "player_disconnect")
 
     def on_bot_behavior_update(self, bot_behavior):
         assert isinstance(bot_behavior, dict)
@@ -372,13 +362,12 @@ class ServerStateMachine:
         # with self.rlock:
         self.notify_state_change("waiting_browser")
         self.start_time = -1
-        self.safe_state_change(self.prepare, "prepare", "waiting_browser")
+        self.safe_state_change("prepare", "waiting_browser")
 
     def after_prepare(self):
         logger.debug("STATE: on_prepare")
         # with self.rlock:
         self.notify_state_change("on_prepare")
-        self.internal_sleep_event_sync.clear()
 
         # Reset state flags
         self.controls_released = False
@@ -388,11 +377,9 @@ class ServerStateMachine:
         self.stop_reason = None
 
         def safe_on_prepare_callback():
-            self.safe_state_change(
-                self.wait_owner_or_player, "wait_owner_or_player", "on_prepare"
-            )
-            self.safe_state_change(self.stop, "stop", "on_prepare")
-            self.safe_state_change(self.exit, "exit", "on_prepare")
+            self.safe_state_change("wait_owner_or_player", "on_prepare")
+            self.safe_state_change("stop", "on_prepare")
+            self.safe_state_change("exit", "on_prepare")
 
         self.callback_executor.execute_callbacks(
             CallbackBase.get_by_name("on_prepare"),
@@ -404,7 +391,7 @@ class ServerStateMachine:
         logger.debug("STATE: waiting_owner_or_player")
         # with self.rlock:
         self.notify_state_change("waiting_owner_or_player")
-        self.safe_state_change(self.start, "start", "waiting_owner_or_player")
+        self.safe_state_change("start", "waiting_owner_or_player")
 
     def after_start(self):
         logger.debug("STATE: on_start")
@@ -418,99 +405,46 @@ class ServerStateMachine:
 
         self.notify_state_change("on_start")
         self.enable_controls()
-        self.start_time = _time()
+        self.start_time = now_ns()
+        # The generation is taken here, so a stop before the callbacks run
+        # ends them too
+        generation = scheduler.generation
         self.callback_executor.execute_callbacks(
             CallbackBase.get_by_name("on_time"),
             "on_time",
             self.on_repeat_or_time_finished_callback,
+            generation,
         )
         self.callback_executor.execute_callbacks(
             CallbackBase.get_by_name("on_repeat"),
             "on_repeat",
             self.on_repeat_or_time_finished_callback,
+            generation,
         )
 
-        # Handle controlTime
-        def control_time():
-            if self.bot_behavior["controlTimeUsed"] is True and isinstance(
-                self.bot_behavior["controlTime"], int
-            ):
-                self.internal_sleep(self.bot_behavior["controlTime"])
-                self.inform("control time ended")
-                self.stop_reason = "control time ended"
-                self.safe_state_change(
-                    self.stop_immediate, "stop_immediate", "control_time"
-                )
-
-        self.callback_executor.execute_callbacks(
-            [control_time],
-            "_control_time",
-            None,
-        )
-
-        # Handle inactiveTime
-        def inactive_time():
-            self.latest_player_control_time = _time()
-            self.latest_owner_control_time = _time()
-            if self.bot_behavior["inactiveTimeUsed"] is True and isinstance(
-                self.bot_behavior["inactiveTime"], int
-            ):
-                while True:  # internal_sleep / break will exit
-                    now = _time()
-                    inactive_time = self.bot_behavior["inactiveTime"]
-                    if self.start_reason == "player":
-                        if (
-                            self.player._is_connected
-                            and not self.owner.is_connected
-                        ):
-                            diff = now - self.latest_player_control_time
-                            if diff > inactive_time:
-                                self.inform(
-                                    "controlling stopped due to inactivity"
-                                )
-                                self.stop_reason = (
-                                    "controlling stopped due to inactivity"
-                                )
-                                self.safe_state_change(
-                                    self.stop_immediate,
-                                    "stop_immediate",
-                                    "inactive_time",
-                                )
-                                break
-                            else:
-                                self.internal_sleep(inactive_time - diff)
-                    elif self.start_reason == "owner":
-                        if self.owner.is_connected:
-                            diff = now - self.latest_owner_control_time
-                            if diff > inactive_time:
-                                self.inform(
-                                    "controlling stopped due to inactivity"
-                                )
-                                self.stop_reason = (
-                                    "controlling stopped due to inactivity"
-                                )
-                                self.safe_state_change(
-                                    self.stop_immediate,
-                                    "stop_immediate",
-                                    "inactive_time",
-                                )
-                                break
-                            else:
-                                self.internal_sleep(inactive_time - diff)
-                    else:
-                        logger.warning("no start reason")
-                        break
+        # Session timers wait on the loop, not in worker threads
+        if self.bot_behavior["controlTimeUsed"] is True and isinstance(
+            self.bot_behavior["controlTime"], int
+        ):
+            scheduler.call_later(
+                self.bot_behavior["controlTime"],
+                self.in_system_lane("_control_time", self.on_control_time),
+            )
 
-        self.callback_executor.execute_callbacks(
-            [inactive_time],
-            "_inactive_time",
-            None,
-        )
+        self.latest_player_control_time = now()
+        self.latest_owner_control_time = now()
+        if self.bot_behavior["inactiveTimeUsed"] is True and isinstance(
+            self.bot_behavior["inactiveTime"], int
+        ):
+            scheduler.call_later(
+                self.bot_behavior["inactiveTime"],
+                self.in_system_lane("_inactive_time", self.check_inactivity),
+            )
 
         def safe_on_start_callback():
-            self.safe_state_change(self.wait_stop, "wait_stop", "on_start")
-            self.safe_state_change(self.stop, "stop", "on_start")
-            self.safe_state_change(self.exit, "exit", "on_start")
+            self.safe_state_change("wait_stop", "on_start")
+            self.safe_state_change("stop", "on_start")
+            self.safe_state_change("exit", "on_start")
 
         self.callback_executor.execute_callbacks(
             CallbackBase.get_by_name("on_start"),
@@ -518,6 +452,60 @@ class ServerStateMachine:
             safe_on_start_callback,
         )
 
+    def in_system_lane(self, name, function):
+        """Timer callback that runs 'function' in a system worker
+
+        State changes wait for the lock and can run inline callbacks, so
+        timers do not make them on the loop. 'function' gets the timer
+        generation, it changes if the bot stops meanwhile.
+        """
+
+        def start():
+            generation = scheduler.generation
+            self.callback_executor.execute_callbacks(
+                [lambda: function(generation)], name, None
+            )
+
+        return start
+
+    def on_control_time(self, generation):
+        with self.rlock:
+            if generation != scheduler.generation:
+                return  # Stopped meanwhile
+            self.inform("control time ended")
+            self.stop_reason = "control time ended"
+            self.safe_state_change("stop_immediate", "control_time")
+
+    def check_inactivity(self, generation):
+        with self.rlock:
+            if generation != scheduler.generation:
+                return
+            check = self.in_system_lane(
+                "_inactive_time", self.check_inactivity
+            )
+            inactive_time = self.bot_behavior["inactiveTime"]
+            if self.start_reason == "player":
+                watched = (
+                    self.player._is_connected and not self.owner.is_connected
+                )
+                latest = self.latest_player_control_time
+            elif self.start_reason == "owner":
+                watched = self.owner.is_connected
+                latest = self.latest_owner_control_time
+            else:
+                logger.warning("no start reason")
+                return
+
+            if not watched:
+                scheduler.call_later(inactive_time, check)
+            elif now() - latest >= inactive_time:
+                self.inform("controlling stopped due to inactivity")
+                self.stop_reason = "controlling stopped due to inactivity"
+                self.safe_state_change("stop_immediate", "inactive_time")
+            else:
+                # Controlling moves the latest control time forward
+                scheduler.call_at(latest + inactive_time, check)
+
     def after_waiting_stop(self):
         logger.debug("STATE: waiting_stop")
         # NOTE: not notify_state_change, state hidden from the user
@@ -525,9 +513,9 @@ class ServerStateMachine:
 
     def after_stop_immediate(self):
         logger.debug("STATE: stop_immediate")
-        self.sleep_event_sync.set()
-        self.sleep_event_async.set()
-        self.internal_sleep_event_sync.set()
+        scheduler.cancel_all()
+        self.cancel_sleeps()
+        outputs.to_safe()
 
         # with self.rlock:
         text = self.stop_reason if self.stop_reason is not None else ""
@@ -535,37 +523,34 @@ class ServerStateMachine:
 
         def wrapper():
             self.stop_immediate_finished = True
-            self.safe_state_change(self.stop, "stop", "stop_immediate")
-            self.safe_state_change(self.exit, "exit", "stop_immediate")
+            self.safe_state_change("stop", "stop_immediate")
+            self.safe_state_change("exit", "stop_immediate")
 
-        self.execute("on_stop(immediate=True)", wrapper, "stop_immediate")
+        self.execute("on_stop(immediate=True)", wrapper)
 
         def safe_stop():
-            self.safe_state_change(self.stop, "stop", "stop_immediate")
+            self.safe_state_change("stop", "stop_immediate")
 
         self.disable_controls(_release_cb=safe_stop)
         self.warn_stuck("on_stop")
 
     def after_stop(self):
         logger.debug("STATE: stop")
-        self.internal_sleep_event_sync.set()
-        self.sleep_event_sync.clear()
-        self.sleep_event_async.clear()
+        self.stuck_token.cancel()
+        self.renew_sleeps()
 
         # with self.rlock:
         def wrapper():
-            self.safe_state_change(
-                self.wait_browser, "wait_browser", "on_stop"
-            )
-            self.safe_state_change(self.exit, "exit", "on_stop")
+            self.safe_state_change("wait_browser", "on_stop")
+            self.safe_state_change("exit", "on_stop")
 
-        self.execute("on_stop", wrapper, "wait_browser")
+        self.execute("on_stop", wrapper)
 
     def after_exit_immediate(self):
         logger.debug("STATE: exit_immediate")
-        self.sleep_event_sync.set()
-        self.sleep_event_async.set()
-        self.internal_sleep_event_sync.set()
+        scheduler.cancel_all()
+        self.cancel_sleeps()
+        outputs.to_safe()
 
         # with self.rlock:
         self.notify_state_change("on_exit")
@@ -579,21 +564,22 @@ class ServerStateMachine:
 
         def exit_wrapper():
             self.exit_immediate_finished = True
-            self.exit()
+            self.safe_state_change("exit", "exit_immediate")
 
-        self.execute("on_exit(immediate=True)", exit_wrapper, "exit_immediate")
+        self.execute("on_exit(immediate=True)", exit_wrapper)
 
         def safe_exit():
-            self.safe_state_change(self.exit, "exit", "exit_immediate")
+            self.safe_state_change("exit", "exit_immediate")
 
         self.disable_controls(_release_cb=safe_exit)
         self.warn_stuck("on_exit")
 
     def after_exit(self):
         logger.debug("STATE: exit")
-        self.internal_sleep_event_sync.set()
-        self.sleep_event_sync.clear()
-        self.sleep_event_async.clear()
+        self.stuck_token.cancel()
+        self.renew_sleeps()
+        # Before on_exit callbacks, they can close the actuators
+        outputs.close()
 
         # with self.rlock:
 
@@ -605,15 +591,15 @@ class ServerStateMachine:
             ), "exit_event should be awailable here..."
             self.loop.call_soon_threadsafe(self.exit_event.set)
 
-        self.execute("on_exit", set_exit_event, "wait_browser")
+        self.execute("on_exit", set_exit_event)
 
     def on_control_finished_callback(self):
         # Perf reasons, this is executed a lot
         if self.state not in [STOP_IMMEDIATE, EXIT_IMMEDIATE]:
             return
 
-        self.safe_state_change(self.stop, "stop", "control_finished")
-        self.safe_state_change(self.exit, "exit", "control_finished")
+        self.safe_state_change("stop", "control_finished")
+        self.safe_state_change("exit", "control_finished")
 
     def on_repeat_or_time_finished_callback(self):
         self.on_control_finished_callback()
@@ -622,7 +608,7 @@ class ServerStateMachine:
         with self.rlock:
             self.controls_released = False
             if self.player._is_connected and not self.player._is_controlling:
-                self.latest_player_control_time = _time()  # Reset timer
+                self.latest_player_control_time = now()  # Reset timer
                 self.player._is_controlling = True
                 logger.debug("player controls enabled")
 
@@ -642,6 +628,15 @@ class ServerStateMachine:
                 self.on_repeat_or_time_finished_callback,
             )
 
+    def execute_on_repeat_from_outside(self, callback, generation):
+        if self.callback_executor is not None:
+            self.callback_executor.execute_callbacks(
+                [callback],
+                "on_repeat",
+                self.on_repeat_or_time_finished_callback,
+                generation,
+            )
+
     def reset_controls(self, release_cb):
         if self.callback_executor is not None:
             # Reset all controls
@@ -661,6 +656,7 @@ class ServerStateMachine:
                     event.name,
                     self.on_control_finished_callback,
                     event=event,
+                    lane=RELEASE,
                 )
                 names.add(event.name)
 
@@ -684,7 +680,7 @@ class ServerStateMachine:
 
     def warn_stuck(self, state):
         def _warn_stuck():
-            self.internal_sleep(5)
+            token.sleep(5)
             running_names = self.callback_executor.running_names
             if len(running_names) != 0:
                 # TODO URL TO DOCS TO WARNING
@@ -695,64 +691,54 @@ class ServerStateMachine:
             else:
                 logger.debug("No running names???")
 
-        self.internal_sleep_event_sync.set()  # clears if previous
-        _sleep(0.01)  # TODO a better implementation...
-        self.internal_sleep_event_sync.clear()  # start new
+        # Replaces the previous warning, nothing waits for it to wake up
+        self.stuck_token.cancel()
+        token = self.stuck_token = CancelToken()
         self.callback_executor.execute_callbacks(
             [_warn_stuck],
             "_stuck_warn",
             None,
         )
 
-    def _state(self):  # name 'state' is reserved by transitions
+    def _state(self):  # name 'state' is reserved by the machine
         return SIMPLIFIED_STATES.get(self.state, self.state)
 
     def time(self):
+        """Seconds since on_start, full precision, -1 when not started"""
         if self.start_time == -1:
             return -1
         else:
-            return round(_time() - self.start_time, 2)
+            return seconds_since(self.start_time)
 
     def set_loop(self, loop):
         self.loop = loop
-        self.sleep_event_async = asyncio.Event()
+        scheduler.set_loop(loop)
         self.exit_event = asyncio.Event()
 
-    def sleep(self, secs):
-        # Triggers even when secs=0
-        # (not sure if required here, but at least on sleep_async it is)
-        if self.sleep_event_sync.is_set():
-            raise SleepCancelledError()
-
-        if self.sleep_event_sync.wait(timeout=secs):
-            raise SleepCancelledError()
+    def share_sleep_event(self):
+        """Returns an event that cancels sleeps in worker processes too"""
+        event = multiprocessing.Event()
+        if self.sleep_token.is_cancelled:
+            event.set()
+        self.shared_sleep_event = event
+        return event
+
+    def cancel_sleeps(self):
+        self.sleep_token.cancel()
+        if self.shared_sleep_event is not None:
+            self.shared_sleep_event.set()
+
+    def renew_sleeps(self):
+        # Sleeps that started before this stay cancelled
+        self.sleep_token = CancelToken()
+        if self.shared_sleep_event is not None:
+            self.shared_sleep_event.clear()
 
-    def internal_sleep(self, secs):
-        # Triggers even when secs=0
-        # (not sure if required here, but at least on sleep_async it is)
-        if self.internal_sleep_event_sync.is_set():
-            raise SleepCancelledError()
-
-        if self.internal_sleep_event_sync.wait(timeout=secs):
-            raise SleepCancelledError()
+    def sleep(self, secs):
+        self.sleep_token.sleep(secs)
 
     async def sleep_async(self, secs):
-        assert (
-            self.sleep_event_async is not None
-        ), "botafar.run() must be called before sleep_async()"
-
-        # Triggers even when secs=0
-        if self.sleep_event_async.is_set():
-            raise SleepCancelledError()
-
-        try:
-            await asyncio.wait_for(
-                self.sleep_event_async.wait(),
-                timeout=secs,
-            )
-            raise SleepCancelledError()
-        except asyncio.TimeoutError:
-            pass
+        await self.sleep_token.sleep_async(secs)
 
     async def wait_exit(self):
         assert (
@@ -761,7 +747,7 @@ class ServerStateMachine:
         logger.debug("Waiting exit...")
         await self.exit_event.wait()
         logger.debug("...Exit waited")
-        self.internal_sleep_event_sync.set()
+        self.stuck_token.cancel()
 
 
 state_machine = ServerStateMachine()
@@ -777,7 +763,5 @@ sleep_async = state_machine.sleep_async
 
 
 def stop():
-    try:
-        state_machine.stop_immediate()
-    except core.MachineError:
+    if state_machine.machine.trigger("stop_immediate", strict=False) is None:
         logger.warning(f"Cannot stop() during {state_machine._state()}")
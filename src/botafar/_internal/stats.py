@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from bisect import bisect_left
+
+from .log_formatter import get_logger
+
+logger = get_logger()
+
+# Histogram bucket upper limits in seconds, from 50 us to about 52 s,
+# each twice the previous. Values above the last go to an extra bucket
+BUCKETS = tuple(0.00005 * 2**i for i in range(21))
+
+_providers = {}  # section name -> function returning a dict
+
+
+class Histogram:
+    """Streaming histogram with fixed buckets, adding is O(log buckets)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Upper limit of the bucket, accurate within a factor of two"""
+        if self.count == 0:
+            return None
+        limit = self.count * percent / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= limit:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count != 0 else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max if self.count != 0 else None,
+        }
+
+
+class CallbackStats:
+    def __init__(self):
+        self.queue_wait = Histogram()
+        self.run_time = Histogram()
+        # From the bot receiving and from the browser sending an input
+        # event until a callback started
+        self.received_to_start = Histogram()
+        self.sent_to_start = Histogram()
+        self.completed = 0
+        self.errors = 0
+
+    def add(self, queue_wait, run_time):
+        self.queue_wait.add(queue_wait)
+        self.run_time.add(run_time)
+        self.completed += 1
+
+    def add_latency(self, received_to_start, sent_to_start):
+        self.received_to_start.add(received_to_start)
+        if sent_to_start is not None:
+            self.sent_to_start.add(max(0.0, sent_to_start))
+
+    def to_dict(self):
+        return {
+            "completed": self.completed,
+            "errors": self.errors,
+            "queue_wait": self.queue_wait.to_dict(),
+            "run_time": self.run_time.to_dict(),
+            "received_to_start": self.received_to_start.to_dict(),
+            "sent_to_start": self.sent_to_start.to_dict(),
+        }
+
+
+class RepeatStats:
+    """Timing of an on_repeat callback with a rate or period"""
+
+    def __init__(self, period):
+        self.period = period
+        # From the deadline until the callback started
+        self.jitter = Histogram()
+        self.runs = 0
+        # Runs that took longer than the period, and the deadlines skipped
+        # because a run could not start in time
+        self.overruns = 0
+        self.skipped = 0
+
+    def add_start(self, lateness):
+        self.jitter.add(max(0.0, lateness))
+        self.runs += 1
+
+    def to_dict(self):
+        return {
+            "period": self.period,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter": self.jitter.to_dict(),
+        }
+
+
+def register_stats(section, provider):
+    """'provider' is called on every stats() call, and returns a dict"""
+    _providers[section] = provider
+
+
+def stats():
+    """Returns a snapshot of botafar internal statistics
+
+    Times are in seconds. Percentiles come from histogram buckets that are
+    twice as large as the previous one, so they are accurate within a factor
+    of two.
+    """
+    return {section: provider() for section, provider in _providers.items()}
+
+
+def format_stats(snapshot):
+    lines = []
+    for name, values in sorted(snapshot.get("callbacks", {}).items()):
+        run_time = values["run_time"]
+        queue_wait = values["queue_wait"]
+        if run_time["count"] == 0:
+            continue
+        line = (
+            f"{name}: {values['completed']} completed, "
+            f"{values['errors']} errors, run p50 {run_time['p50']:.4f}s "
+            f"p99 {run_time['p99']:.4f}s max {run_time['max']:.4f}s, "
+            f"queue p99 {queue_wait['p99']:.4f}s"
+        )
+        sent_to_start = values["sent_to_start"]
+        if sent_to_start["count"] != 0:
+            line += (
+                f", input to start p50 {sent_to_start['p50']:.4f}s "
+                f"p99 {sent_to_start['p99']:.4f}s"
+            )
+        lines.append(line)
+
+    for name, values in sorted(snapshot.get("repeat", {}).items()):
+        jitter = values["jitter"]
+        if jitter["count"] == 0:
+            continue
+        lines.append(
+            f"{name}: {values['runs']} runs every {values['period']:.4f}s, "
+            f"jitter p50 {jitter['p50']:.4f}s p99 {jitter['p99']:.4f}s, "
+            f"{values['overruns']} overruns, {values['skipped']} skipped"
+        )
+
+    outputs = snapshot.get("outputs")
+    if outputs is not None and outputs["updates"] != 0:
+        jitter = outputs["jitter"]
+        lines.append(
+            f"outputs: {outputs['updates']} updates, jitter p50 "
+            f"{jitter['p50']:.4f}s p99 {jitter['p99']:.4f}s, "
+            f"{outputs['skipped']} skipped, {outputs['errors']} errors"
+        )
+
+    network = snapshot.get("latency", {}).get("network")
+    if network is not None and network["count"] != 0:
+        lines.append(
+            f"network: p50 {network['p50']:.4f}s p99 {network['p99']:.4f}s "
+            f"max {network['max']:.4f}s"
+        )
+    return "\n".join(lines)
+
+
+async def log_stats(interval):
+    """Logs callback stats every 'interval' seconds on debug level"""
+    while True:
+        await asyncio.sleep(interval)
+        if logger.isEnabledFor(logging.DEBUG):
+            text = format_stats(stats())
+            if text != "":
+                logger.debug(f"Callback and latency stats:\n{text}")
@@ -1,11 +1,11 @@
 import asyncio
 from collections import OrderedDict
 
+from botafar._internal.callback_executor import CallbackExecutor
 from botafar._internal.callbacks import CallbackBase
 from botafar._internal.controls import ControlBase
 from botafar._internal.decorators import DecoratorBase
 from botafar._internal.events import Event
-from botafar._internal.states import state_machine
 
 # HELPERS
 
@@ -38,21 +38,20 @@ def reset():
     DecoratorBase._instance_callbacks = OrderedDict()
     ControlBase._event_callbacks = {}
     ControlBase._controls = []
-    state_machine.sleep_event_async = None
+    ControlBase._process_input_event = None
+    CallbackExecutor.takes_event = set()
+    CallbackExecutor.skips_stale = set()
+    CallbackExecutor.limits = {}
+    CallbackExecutor.inline = set()
+    CallbackExecutor.not_measured = set()
+    CallbackExecutor.process_backend = set()
+    CallbackExecutor.registered = []
+    CallbackExecutor.dispatches = {}
 
 
 def fake_run():
     DecoratorBase.post_listen()
 
-    class MockEvent:
-        def is_set(self):
-            False
-
-        async def wait(self):
-            pass
-
-    state_machine.sleep_event_async = MockEvent()
-
 
 def get_async_result(func):
     return asyncio.run(func)
@@ -0,0 +1,285 @@
+import asyncio
+
+import pytest
+
+from botafar import Axis
+from botafar._internal.callback_executor import CallbackExecutor
+from botafar._internal.controls import ControlBase
+from botafar._internal.controls import axis as axis_module
+from botafar._internal.controls.axis import filter_value
+from botafar._internal.events import AxisEvent, InputSnapshot
+from botafar._internal.scheduler import TimerWheel
+from botafar._internal.states import ServerEventProsessor, state_machine
+
+from .helpers import fake_run, reset
+
+
+class Clock:
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        return self.time
+
+
+def call(callback, event):
+    if callback in CallbackExecutor.takes_event:
+        return callback(event)
+    return callback()
+
+
+def move_event(event):
+    callbacks = ControlBase._get_callbacks(event)
+    return [call(cb, event) for cb in callbacks]
+
+
+def move(value, sender="player", axis="LEFT_X"):
+    event = AxisEvent(None, sender, axis, value)
+    return move_event(event), event
+
+
+def get_axis(monkeypatch, **options):
+    reset()
+    clock = Clock()
+    monkeypatch.setattr(axis_module, "now", clock)
+    a = Axis("LEFT_X", **options)
+
+    @a.on_any
+    def any(event):
+        return event.name, event.value
+
+    fake_run()
+    return a, clock
+
+
+def test_filter_value():
+    assert filter_value(0.04, 0.05, None) == 0
+    assert filter_value(-0.05, 0.05, None) == 0
+    assert filter_value(1.0, 0.05, None) == 1
+    assert filter_value(-1.0, 0.05, None) == -1
+    assert filter_value(0.55, 0.1, None) == pytest.approx(0.5)
+    assert filter_value(-0.55, 0.1, None) == pytest.approx(-0.5)
+    assert filter_value(0.3, 0, 0.1) == 0.3
+    assert filter_value(0.34, 0, 0.25) == 0.25
+    assert filter_value(0.99, 0, 0.3) == 0.9
+    assert filter_value(0.4, 0.2, None) == pytest.approx(0.25)
+
+
+def test_options_errors():
+    reset()
+    with pytest.raises(AssertionError):
+        Axis("LEFT_X", dead_zone=1)
+    with pytest.raises(AssertionError):
+        Axis("LEFT_X", step=0)
+    with pytest.raises(AssertionError):
+        Axis("LEFT_X", min_delta=-0.1)
+    with pytest.raises(AssertionError):
+        Axis("LEFT_X", min_interval="1")
+    with pytest.raises(RuntimeError):
+        Axis("A")
+    Axis("LEFT_X")
+    with pytest.raises(RuntimeError):
+        Axis("LEFT_X")
+
+
+def test_callbacks(monkeypatch):
+    reset()
+    a = Axis("RIGHT_Y", dead_zone=0)
+    values = []
+
+    @a.on_move
+    def move_(event):
+        values.append(event.value)
+
+    @a.on_center
+    def center():
+        values.append("center")
+
+    fake_run()
+    move(0.5, axis="RIGHT_Y")
+    assert a.value == 0.5 and not a.is_center
+    move(0.0, axis="RIGHT_Y")
+    assert a.is_center
+    assert values == [0.5, "center"]
+    assert a.latest_event.name == "on_center"
+    assert a._data["type"] == "axis"
+    assert a._data["has_callbacks"] == ["RIGHT_Y"]
+    assert a._data["filter"] == {
+        "deadZone": 0,
+        "step": None,
+        "minDelta": 0.01,
+        "minInterval": 0,
+    }
+
+
+def test_dead_zone_and_delta(monkeypatch):
+    a, _ = get_axis(monkeypatch, dead_zone=0.1, min_delta=0.1)
+    assert move(0.05)[0] == []  # Inside the dead zone
+    results, event = move(0.55)
+    assert results == [("on_move", pytest.approx(0.5))]
+    assert event.value == pytest.approx(0.5)
+    assert move(0.6)[0] == []  # Less than min_delta from 0.5
+    assert a.value == pytest.approx(0.5)
+    assert move(0.7)[0] == [("on_move", pytest.approx(2 / 3))]
+    assert move(1.0)[0] == [("on_move", 1.0)]  # Ends always pass
+    assert move(1.0)[0] == []
+    assert move(0.0)[0] == [("on_center", 0.0)]
+
+
+def test_filtered_events_have_no_name(monkeypatch):
+    get_axis(monkeypatch, dead_zone=0)
+    _, event = move(0.5)
+    assert event.name == "on_move"
+    _, event = move(0.5)
+    assert event.name is None
+    # Owner only axes ignore player events
+    reset()
+    Axis("LEFT_Y", owner_only=True)
+    _, event = move(0.5, axis="LEFT_Y")
+    assert event.name is None
+
+
+def test_min_interval_holds_back_latest(monkeypatch):
+    reset()
+    a = Axis("LEFT_X", dead_zone=0, min_interval=0.2)
+    delivered = []
+
+    @a.on_any
+    def any(event):
+        return event.name, event.value
+
+    fake_run()
+
+    def process_input_event(event):
+        delivered.append(move_event(event))
+
+    monkeypatch.setattr(
+        ControlBase, "_process_input_event", process_input_event
+    )
+
+    async def main():
+        wheel = TimerWheel()
+        wheel.set_loop(asyncio.get_running_loop())
+        monkeypatch.setattr(axis_module, "scheduler", wheel)
+
+        assert move(0.2)[0] == [("on_move", 0.2)]
+        assert move(0.3)[0] == []
+        assert move(0.4)[0] == []
+        # Center is never held back, and drops the held value
+        assert move(0.0)[0] == [("on_center", 0.0)]
+        assert a._flush_timer is None
+        assert move(0.6)[0] == []
+        assert move(0.7)[0] == []
+        await asyncio.sleep(0.35)
+        assert wheel.fired == 1
+
+    asyncio.run(main())
+    # Only the latest held value is delivered
+    assert delivered == [[("on_move", 0.7)]]
+    assert a.value == 0.7
+
+
+def test_release(monkeypatch):
+    a, _ = get_axis(monkeypatch, dead_zone=0)
+    assert a._get_release_callbacks_and_event(1.0) == ([], None)
+    move(-0.5, sender="owner")
+    callbacks, event = a._get_release_callbacks_and_event(1.0)
+    assert [call(cb, event) for cb in callbacks] == [("on_center", 0.0)]
+    assert event.sender == "owner"
+    assert event.time == 1.0
+    assert a.is_center
+    assert repr(a) == 'Axis("LEFT_X")'
+
+
+class Executor:
+    def __init__(self):
+        self.names = []
+
+    def execute_callbacks(self, callbacks, name, *args, **kwargs):
+        self.names.append(name)
+
+
+def get_prosessor():
+    executor = Executor()
+    previous = [
+        getattr(state_machine, name, None)
+        for name in ("inform", "notify_state_change", "callback_executor")
+    ]
+    prosessor = ServerEventProsessor(None, executor, None)
+    state_machine.reinit(*previous)
+    return prosessor, executor
+
+
+def axis_event(value, seq):
+    event = AxisEvent(None, "owner", "LEFT_X", value)
+    event._seq = seq
+    return event
+
+
+def test_filtered_events_do_not_reach_executor():
+    reset()
+    a = Axis("LEFT_X", dead_zone=0)
+
+    @a.on_move
+    def move_():
+        pass
+
+    fake_run()
+    prosessor, executor = get_prosessor()
+    assert ControlBase._process_input_event == prosessor.process_input_event
+    for value in (0.5, 0.5, 0.501, 0.0, 0.0):
+        prosessor.process_event(AxisEvent(None, "owner", "LEFT_X", value))
+    assert executor.names == ["on_move", "on_center"]
+
+
+def test_snapshot_recovers_lost_center():
+    reset()
+    a = Axis("LEFT_X", dead_zone=0)
+
+    @a.on_any
+    def any(event):
+        pass
+
+    fake_run()
+    prosessor, executor = get_prosessor()
+    prosessor.process_event(axis_event(0.6, 1))
+    # Centering event with seq 2 was lost
+    prosessor.process_event(InputSnapshot("owner", 3, frozenset(), {}))
+    assert a.value == 0.6  # Axes missing from the snapshot are kept
+    prosessor.process_event(
+        InputSnapshot("owner", 4, frozenset(), {"LEFT_X": 0.0})
+    )
+    assert a.value == 0
+    assert executor.names == ["on_move", "on_center"]
+    assert prosessor.get_stats()["reconciled"] == 1
+
+    # Arrives late, older than the snapshot
+    prosessor.process_event(axis_event(0.6, 2))
+    assert a.value == 0
+    # Newer event than the snapshot wins
+    prosessor.process_event(axis_event(0.8, 6))
+    prosessor.process_event(
+        InputSnapshot("owner", 5, frozenset(), {"LEFT_X": 0.0})
+    )
+    assert a.value == 0.8
+
+
+def test_interruption_centers_axes():
+    reset()
+    a = Axis("LEFT_X", dead_zone=0)
+
+    @a.on_any
+    def any(event):
+        pass
+
+    fake_run()
+    prosessor, executor = get_prosessor()
+    prosessor.process_event(axis_event(-0.5, 1))
+    prosessor.release_pressed()
+    assert a.value == 0
+    # Moved back by the first snapshot after the interruption
+    prosessor.process_event(
+        InputSnapshot("owner", 2, frozenset(), {"LEFT_X": -0.5})
+    )
+    assert a.value == -0.5
+    assert executor.names == ["on_move", "on_center", "on_move"]
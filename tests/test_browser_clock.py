@@ -0,0 +1,32 @@
+from botafar._internal.data_channel.browser_clock import (
+    TIME_MODULO,
+    BrowserClock,
+)
+
+
+def test_not_synced():
+    assert BrowserClock().to_local(1000) is None
+
+
+def test_lowest_rtt_is_used():
+    clock = BrowserClock()
+    # Browser clock is 100 seconds behind perf_counter
+    clock.add_sample(1_000_000, 0.5, received=1100.25 + 0.1)  # Queued
+    clock.add_sample(1_001_000, 0.02, received=1101.01)
+    clock.add_sample(1_002_000, 0.3, received=1102.15)
+    assert clock.rtt == 0.02
+    assert abs(clock.offset - 100) < 1e-6
+    assert abs(clock.to_local(1_003_000, now=1103.5) - 1103) < 1e-6
+
+    clock.reset()
+    assert clock.to_local(1_003_000) is None
+
+
+def test_wrapped_times():
+    clock = BrowserClock()
+    full = 1_700_000_000_000  # Epoch milliseconds
+    clock.add_sample(full, 0.0, received=5000.0)
+    wrapped = (full + 1500) % TIME_MODULO
+    assert abs(clock.to_local(wrapped, now=5001.6) - 5001.5) < 1e-6
+    clock.add_sample(wrapped, 0.0, received=5001.5)
+    assert abs(clock.to_local(full + 2000, now=5002.0) - 5002.0) < 1e-6
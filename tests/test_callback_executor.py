@@ -0,0 +1,383 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from botafar import Button, on_init, on_start
+from botafar._internal.callback_executor import (
+    RELEASE,
+    SYSTEM,
+    USER,
+    CallbackExecutor,
+    InlineWatchdog,
+    get_lane,
+)
+
+from .helpers import fake_run, reset
+
+
+def get_executor():
+    errors = []
+    executor = CallbackExecutor(lambda future: None, errors.append)
+    return executor, errors
+
+
+def wait_all(executor):
+    asyncio.run(executor.wait_until_all_finished())
+
+
+def get_blocking_callback(max_running, overflow, max_pending=None):
+    started = []
+    release = threading.Event()
+
+    def callback(event):
+        started.append(event)
+        release.wait(timeout=5)
+
+    CallbackExecutor.add_to_takes_event(callback)
+    CallbackExecutor.add_limit(callback, max_running, overflow, max_pending)
+    return callback, started, release
+
+
+def run_policy(max_running, overflow, amount, max_pending=None):
+    reset()
+    executor, errors = get_executor()
+    callback, started, release = get_blocking_callback(
+        max_running, overflow, max_pending
+    )
+    for i in range(amount):
+        executor.execute_callbacks([callback], "on_press", None, event=i)
+    release.set()
+    wait_all(executor)
+    assert errors == []
+    return started, executor.dropped.get(callback.__qualname__, 0)
+
+
+def test_queue():
+    started, dropped = run_policy(1, "queue", 4)
+    assert started == [0, 1, 2, 3]
+    assert dropped == 0
+
+
+def test_drop_newest():
+    started, dropped = run_policy(1, "drop_newest", 4)
+    assert started == [0]
+    assert dropped == 3
+
+
+def test_drop_oldest():
+    started, dropped = run_policy(1, "drop_oldest", 6, max_pending=3)
+    assert started == [0, 3, 4, 5]
+    assert dropped == 2
+
+
+def test_latest_wins():
+    started, dropped = run_policy(2, "latest_wins", 5)
+    assert sorted(started) == [0, 1, 4]
+    assert dropped == 2
+
+
+def test_releases_are_never_dropped():
+    reset()
+    executor, _ = get_executor()
+    callback, started, release = get_blocking_callback(1, "drop_newest")
+    executor.execute_callbacks([callback], "on_press", None, event=0)
+    executor.execute_callbacks([callback], "on_press", None, event=1)
+    executor.execute_callbacks(
+        [callback], "on_release", None, event=2, lane=RELEASE
+    )
+    release.set()
+    wait_all(executor)
+    assert started == [0, 2]
+    assert executor.dropped == {callback.__qualname__: 1}
+
+    reset()
+    executor, _ = get_executor()
+    callback, started, release = get_blocking_callback(1, "latest_wins")
+    executor.execute_callbacks([callback], "on_press", None, event=0)
+    executor.execute_callbacks(
+        [callback], "on_release", None, event=1, lane=RELEASE
+    )
+    executor.execute_callbacks([callback], "on_press", None, event=2)
+    executor.execute_callbacks([callback], "on_press", None, event=3)
+    release.set()
+    wait_all(executor)
+    assert started == [0, 1, 3]
+
+
+def test_finished_callback_when_dropped():
+    reset()
+    executor, _ = get_executor()
+    callback, _, release = get_blocking_callback(1, "drop_newest")
+    finished = []
+    executor.execute_callbacks([callback], "on_press", None, event=0)
+    executor.execute_callbacks(
+        [callback], "on_release", lambda: finished.append(1), event=1
+    )
+    release.set()
+    wait_all(executor)
+    assert finished == [1]
+
+
+def test_running_names_include_queued():
+    reset()
+    executor, _ = get_executor()
+    callback, _, release = get_blocking_callback(1, "queue")
+    executor.execute_callbacks([callback], "on_press", None, event=0)
+    executor.execute_callbacks([callback], "on_release", None, event=1)
+    assert sorted(executor.running_names) == ["on_press", "on_release"]
+    release.set()
+    wait_all(executor)
+    assert executor.running_names == []
+
+
+def test_control_decorator_options():
+    reset()
+    b = Button("A")
+
+    @b.on_press(max_running=1, overflow="drop_newest")
+    def example():
+        return 3
+
+    fake_run()
+    assert example() == 3
+    assert list(CallbackExecutor.limits.values()) == [(1, "drop_newest", None)]
+    assert b._data["titles"]["A"][0] == "Example"
+
+
+def test_control_decorator_option_errors():
+    reset()
+    b = Button("A")
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, max_running=0)
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, max_running=1, overflow="potato")
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, overflow="drop_newest")
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, max_running=1, overflow="drop_oldest")
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, max_running=1, max_pending=2)
+    with pytest.raises(AssertionError):
+        b.on_press(
+            lambda: None, max_running=1, overflow="drop_oldest", max_pending=0
+        )
+    with pytest.raises(AssertionError):
+        b.on_press(lambda: None, potato=1)
+
+
+class FakeEvent:
+    def __init__(self, is_active):
+        self.is_active = is_active
+
+
+def test_skip_stale():
+    reset()
+    executor, _ = get_executor()
+    called = []
+
+    def callback():
+        called.append(1)
+
+    CallbackExecutor.add_to_skips_stale(callback)
+    executor.execute_callbacks([callback], "on_up", None, FakeEvent(False))
+    executor.execute_callbacks([callback], "on_up", None, FakeEvent(True))
+    wait_all(executor)
+    assert called == [1]
+    assert executor.coalesced == {callback.__qualname__: 1}
+
+
+def test_skip_stale_superseded_while_queued():
+    reset()
+    executor, _ = get_executor()
+    callback, started, release = get_blocking_callback(1, "queue")
+    CallbackExecutor.add_to_skips_stale(callback)
+    events = [FakeEvent(True) for _ in range(3)]
+    for event in events:
+        executor.execute_callbacks([callback], "on_up", None, event=event)
+    events[1].is_active = False
+    release.set()
+    wait_all(executor)
+    assert started == [events[0], events[2]]
+    assert executor.coalesced == {callback.__qualname__: 1}
+
+
+def test_dispatches_compiled_on_post_listen():
+    reset()
+    b = Button("A")
+
+    class Example:
+        @b.on_press
+        def press(self, event):
+            return event
+
+        @b.on_release
+        async def release(self):
+            pass
+
+    example = Example()
+    fake_run()
+
+    press, release = [
+        CallbackExecutor.dispatches[callbacks[0]]
+        for callbacks in b._state_callbacks.values()
+    ]
+    assert not press.is_async and press.takes_event
+    assert press.params == (example,)
+    assert press.target(*press.params, 7) == 7
+    assert release.is_async and not release.takes_event
+
+
+def test_dispatch_runs_bound_target():
+    reset()
+    executor, errors = get_executor()
+    b = Button("A")
+    events = []
+
+    class Example:
+        @b.on_press
+        def press(self, event):
+            events.append((self, event))
+
+    example = Example()
+    fake_run()
+    callbacks = b._state_callbacks["on_press"]
+    executor.execute_callbacks(callbacks, "on_press", None, event=3)
+    wait_all(executor)
+    assert errors == []
+    assert events == [(example, 3)]
+
+
+def test_completions_handled_on_loop():
+    reset()
+    executor, errors = get_executor()
+    finished = []
+
+    async def main():
+        executor.set_loop(asyncio.get_running_loop())
+        callbacks = [lambda: None for _ in range(100)]
+        executor.execute_callbacks(
+            callbacks,
+            "on_init",
+            lambda: finished.append(threading.get_ident()),
+        )
+        assert executor.running_names == ["on_init"]
+        await executor.wait_until_finished("on_init")
+        assert executor.running_names == []
+        await executor.wait_until_all_finished()
+
+    asyncio.run(main())
+    assert errors == []
+    assert finished == [threading.get_ident()]
+    assert executor.running == {}
+    assert executor.waiters == []
+
+
+def test_inline_runs_on_loop_thread():
+    reset()
+    executor, errors = get_executor()
+    threads = []
+
+    def callback():
+        threads.append(threading.get_ident())
+
+    CallbackExecutor.add_to_inline(callback)
+
+    async def main():
+        executor.set_loop(asyncio.get_running_loop())
+        executor.execute_callbacks([callback], "on_press", None)
+        assert threads == [threading.get_ident()]  # Ran immediately
+        await asyncio.get_running_loop().run_in_executor(
+            None, executor.execute_callbacks, [callback], "on_press", None
+        )
+        await executor.wait_until_all_finished()
+
+    asyncio.run(main())
+    assert errors == []
+    assert threads == [threading.get_ident()] * 2
+
+
+def test_inline_errors_are_reported():
+    reset()
+    executor, errors = get_executor()
+
+    def callback():
+        raise ValueError("potato")
+
+    CallbackExecutor.add_to_inline(callback)
+    executor.execute_callbacks([callback], "on_press", None)
+    wait_all(executor)
+    assert [str(e) for e in errors] == ["potato"]
+
+
+def test_inline_watchdog_warns(caplog):
+    watchdog = InlineWatchdog(0.01)
+    previous = watchdog.enter("on_press")
+    time.sleep(0.1)
+    watchdog.exit(previous)
+    assert watchdog.running is None
+    assert "inline on_press callback has blocked" in caplog.text
+    # Waits for the next inline callback instead of polling
+    time.sleep(0.05)
+    assert not watchdog.active.is_set()
+    watchdog.exit(watchdog.enter("on_release"))
+    assert watchdog.active.is_set()
+
+
+def test_inline_decorator_options():
+    reset()
+    b = Button("A")
+
+    @b.on_press(inline=True)
+    def press():
+        pass
+
+    @on_init(inline=True)
+    def init():
+        pass
+
+    fake_run()
+    assert len(CallbackExecutor.inline) == 2
+    with pytest.raises(AssertionError):
+        b.on_release(lambda: None, inline=1)
+    with pytest.raises(AssertionError):
+        on_start(lambda: None, inline=1)
+    with pytest.raises(TypeError):
+        on_start(lambda: None, potato=True)
+
+
+def test_lanes():
+    assert get_lane("_send_event") == SYSTEM
+    assert get_lane("on_stop(immediate=True)") == RELEASE
+    assert get_lane("on_press") == USER
+
+
+def test_system_and_release_lanes_not_blocked_by_user():
+    reset()
+    errors = []
+    executor = CallbackExecutor(
+        lambda future: None, errors.append, user_workers=1
+    )
+    release = threading.Event()
+    ran = []
+
+    executor.execute_callbacks(
+        [lambda: release.wait(timeout=5)], "on_repeat", None
+    )
+    executor.execute_callbacks([lambda: ran.append(1)], "on_press", None)
+    executor.execute_callbacks([lambda: ran.append(2)], "_stuck_warn", None)
+    executor.execute_callbacks(
+        [lambda: ran.append(3)], "on_release", None, lane=RELEASE
+    )
+
+    async def wait():
+        await executor.wait_until_finished("_stuck_warn")
+        await executor.wait_until_finished("on_release")
+
+    asyncio.run(wait())
+    assert sorted(ran) == [2, 3]  # User lane still busy
+    release.set()
+    wait_all(executor)
+    assert sorted(ran) == [1, 2, 3]
+    assert errors == []
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from botafar._internal.exceptions import SleepCancelledError
+from botafar._internal.states.cancel_token import CancelToken
+from botafar._internal.states.server_state_machine import ServerStateMachine
+
+
+def cancel_later(token, secs):
+    timer = threading.Timer(secs, token.cancel)
+    timer.start()
+    return timer
+
+
+def test_sleep():
+    token = CancelToken()
+    start = time.monotonic()
+    token.sleep(0.02)
+    assert time.monotonic() - start >= 0.02
+
+
+def test_cancel_wakes_sleep():
+    token = CancelToken()
+    cancel_later(token, 0.02)
+    start = time.monotonic()
+    with pytest.raises(SleepCancelledError):
+        token.sleep(5)
+    assert time.monotonic() - start < 1
+
+
+def test_cancelled_token_stays_cancelled():
+    token = CancelToken()
+    token.cancel()
+    assert token.is_cancelled
+    with pytest.raises(SleepCancelledError):
+        token.sleep(0)
+
+
+def test_sleep_async():
+    token = CancelToken()
+
+    async def main():
+        await token.sleep_async(0.01)
+        cancel_later(token, 0.02)
+        with pytest.raises(SleepCancelledError):
+            await token.sleep_async(5)
+        with pytest.raises(SleepCancelledError):
+            await token.sleep_async(0)
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - start < 1
+    assert token.waiters == {}
+
+
+def test_sleep_async_timeout_removes_waiter():
+    token = CancelToken()
+    asyncio.run(token.sleep_async(0.01))
+    assert token.waiters == {}
+
+
+def test_shared_event():
+    event = threading.Event()
+    token = CancelToken(event)
+    event.set()
+    with pytest.raises(SleepCancelledError):
+        token.sleep(5)
+
+
+def test_renew_does_not_uncancel_old_sleeps():
+    machine = ServerStateMachine()
+    old = machine.sleep_token
+    machine.cancel_sleeps()
+    machine.renew_sleeps()
+    assert old.is_cancelled
+    assert not machine.sleep_token.is_cancelled
+    with pytest.raises(SleepCancelledError):
+        old.sleep(0)
+    machine.sleep(0)
+
+
+def test_warn_stuck_does_not_block():
+    class Executor:
+        def __init__(self):
+            self.callbacks = []
+
+        def execute_callbacks(self, callbacks, name, finished_callback):
+            self.callbacks.extend(callbacks)
+
+    machine = ServerStateMachine()
+    machine.callback_executor = Executor()
+    start = time.monotonic()
+    machine.warn_stuck("on_stop")
+    first = machine.stuck_token
+    machine.warn_stuck("on_stop")
+    assert time.monotonic() - start < 0.005
+    assert first.is_cancelled
+    assert not machine.stuck_token.is_cancelled
+    with pytest.raises(SleepCancelledError):
+        machine.callback_executor.callbacks[0]()
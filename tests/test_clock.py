@@ -0,0 +1,21 @@
+from botafar._internal import clock
+from botafar._internal.states import state_machine
+
+
+def test_seconds_since(monkeypatch):
+    monkeypatch.setattr(clock, "perf_counter_ns", lambda: 3_000_000_123)
+    assert clock.seconds_since(1_000_000_000) == 2.000000123
+
+
+def test_time_not_started():
+    state_machine.start_time = -1
+    assert state_machine.time() == -1
+
+
+def test_time_is_not_rounded(monkeypatch):
+    monkeypatch.setattr(clock, "perf_counter_ns", lambda: 1_234_567_891)
+    state_machine.start_time = 1_000_000_000
+    try:
+        assert state_machine.time() == 0.234567891
+    finally:
+        state_machine.start_time = -1
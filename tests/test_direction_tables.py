@@ -0,0 +1,210 @@
+from collections import deque
+
+import pytest
+
+from botafar import Joystick, Slider
+from botafar._internal.controls.joystick import (
+    DIAGONAL_RESOLVERS,
+    DIAGONALS,
+    DIRECTIONS,
+)
+from botafar._internal.controls.slider import DIRECTIONS as SLIDER_DIRECTIONS
+from botafar._internal.events import Event
+
+from .helpers import reset
+
+JOYSTICK_KEYS = ["W", "A", "S", "D"]
+JOYSTICK_NAMES = ["up", "left", "down", "right"]
+JOYSTICK_STATES = [
+    "on_center",
+    "on_up",
+    "on_left",
+    "on_down",
+    "on_right",
+    "on_up_left",
+    "on_down_left",
+    "on_down_right",
+    "on_up_right",
+]
+SLIDER_KEYS = ["Q", "E"]
+SLIDER_NAMES = ["up_or_left", "down_or_right"]
+SLIDER_STATES = ["on_center", "on_up", "on_left", "on_down", "on_right"]
+
+
+# The reducers before the pressed key masks, as reference
+
+
+def reference_parse_is_down(is_down, has_diagonals, latest_update_direction):
+    if is_down["up"] and not is_down["down"]:
+        vertical_value = 1
+    elif not is_down["up"] and is_down["down"]:
+        vertical_value = -1
+    else:
+        vertical_value = 0
+
+    if is_down["left"] and not is_down["right"]:
+        horizontal_value = -1
+    elif not is_down["left"] and is_down["right"]:
+        horizontal_value = 1
+    else:
+        horizontal_value = 0
+
+    direction = DIRECTIONS[horizontal_value, vertical_value]
+    if direction in DIAGONALS and not has_diagonals:
+        direction = DIAGONAL_RESOLVERS[latest_update_direction, direction]
+
+    new_update_direction = None
+    if not has_diagonals:
+        if direction in ["on_up", "on_down"]:
+            new_update_direction = "vertical"
+        elif direction in ["on_left", "on_right"]:
+            new_update_direction = "horizontal"
+    return direction, new_update_direction
+
+
+def reference_joystick(state, name, key, has_diagonals):
+    """(is_down, latest update direction, state) -> the same, ignore"""
+    is_down, latest, current = state
+    is_down = dict(zip(JOYSTICK_NAMES, is_down))
+    if name in ["on_release", "on_press"]:
+        is_down[JOYSTICK_NAMES[JOYSTICK_KEYS.index(key)]] = name == "on_press"
+        direction, latest = reference_parse_is_down(
+            is_down, has_diagonals, latest
+        )
+    else:
+        is_down = {
+            "up": name in ["on_up", "on_up_left", "on_up_right"],
+            "left": name in ["on_left", "on_up_left", "on_down_left"],
+            "down": name in ["on_down", "on_down_left", "on_down_right"],
+            "right": name in ["on_right", "on_up_right", "on_down_right"],
+        }
+        direction = name
+    is_down = tuple(is_down[n] for n in JOYSTICK_NAMES)
+    return (is_down, latest, direction), direction == current
+
+
+def reference_slider(state, name, key, slider_type):
+    is_down, current = state
+    is_down = dict(zip(SLIDER_NAMES, is_down))
+    if name in ["on_release", "on_press"]:
+        is_down[SLIDER_NAMES[SLIDER_KEYS.index(key)]] = name == "on_press"
+        if is_down["up_or_left"] and not is_down["down_or_right"]:
+            numerical_value = -1
+        elif not is_down["up_or_left"] and is_down["down_or_right"]:
+            numerical_value = 1
+        else:
+            numerical_value = 0
+        direction = SLIDER_DIRECTIONS[slider_type, numerical_value]
+    else:
+        is_down = {
+            "up_or_left": name in ["on_up", "on_left"],
+            "down_or_right": name in ["on_down", "on_right"],
+        }
+        direction = name
+    is_down = tuple(is_down[n] for n in SLIDER_NAMES)
+    return (is_down, direction), direction == current
+
+
+def get_events(keys, states):
+    events = [(n, k) for k in keys for n in ["on_press", "on_release"]]
+    return events + [(state, keys[0]) for state in states]
+
+
+def get_joystick_state(joystick):
+    is_down = tuple(bool(joystick._is_down_mask & (1 << i)) for i in range(4))
+    return is_down, joystick._latest_update_direction, joystick._state
+
+
+def set_joystick_state(joystick, state):
+    is_down, latest, current = state
+    joystick._is_down_mask = sum(1 << i for i, d in enumerate(is_down) if d)
+    joystick._latest_update_direction = latest
+    joystick._state = current
+
+
+def get_slider_state(slider):
+    is_down = tuple(bool(slider._is_down_mask & (1 << i)) for i in range(2))
+    return is_down, slider._state
+
+
+def set_slider_state(slider, state):
+    is_down, current = state
+    slider._is_down_mask = sum(1 << i for i, d in enumerate(is_down) if d)
+    slider._state = current
+
+
+def check_all_reachable(control, initial, events, reference, get, set_):
+    """Compares every event in every state reachable from 'initial'"""
+    seen = {initial}
+    queue = deque([initial])
+    while queue:
+        state = queue.popleft()
+        for name, key in events:
+            expected, expected_ignore = reference(state, name, key)
+            set_(control, state)
+            event = Event(name, "player", key)
+            ignore, event = control._process_event(event)
+            assert (get(control), ignore) == (expected, expected_ignore)
+            if not ignore:
+                assert event.name == expected[-1]
+            if expected not in seen:
+                seen.add(expected)
+                queue.append(expected)
+    return seen
+
+
+@pytest.mark.parametrize("diagonals", [False, True])
+def test_joystick_matches_reference(diagonals):
+    reset()
+    joystick = Joystick(*JOYSTICK_KEYS, diagonals=diagonals)
+    seen = check_all_reachable(
+        joystick,
+        get_joystick_state(joystick),
+        get_events(JOYSTICK_KEYS, JOYSTICK_STATES),
+        lambda s, n, k: reference_joystick(s, n, k, diagonals),
+        get_joystick_state,
+        set_joystick_state,
+    )
+    # Every pressed key combination was covered
+    assert len({s[0] for s in seen}) == 16
+
+
+@pytest.mark.parametrize("orientation", ["horizontal", "vertical"])
+def test_slider_matches_reference(orientation):
+    reset()
+    slider = Slider(*SLIDER_KEYS, orientation=orientation)
+    slider_type = slider._data["type"]
+    seen = check_all_reachable(
+        slider,
+        get_slider_state(slider),
+        get_events(SLIDER_KEYS, SLIDER_STATES),
+        lambda s, n, k: reference_slider(s, n, k, slider_type),
+        get_slider_state,
+        set_slider_state,
+    )
+    assert len({s[0] for s in seen}) == 4
+
+
+def test_alternative_keys_use_the_same_bits():
+    reset()
+    joystick = Joystick(*JOYSTICK_KEYS, alt=["UP", "LEFT", "DOWN", "RIGHT"])
+    assert (
+        joystick._get_instance_callbacks(Event("on_press", "player", "UP"))
+        == []
+    )
+    assert joystick.is_up
+    joystick._get_instance_callbacks(Event("on_press", "player", "RIGHT"))
+    assert joystick.is_right
+    joystick._get_instance_callbacks(Event("on_release", "player", "D"))
+    assert joystick.is_up
+
+
+def test_unknown_event_errors():
+    reset()
+    joystick = Joystick(*JOYSTICK_KEYS)
+    slider = Slider(*SLIDER_KEYS)
+    for control, key in [(joystick, "W"), (slider, "Q")]:
+        with pytest.raises(RuntimeError):
+            control._process_event(Event("on_press", "player", "X"))
+        with pytest.raises(RuntimeError):
+            control._process_event(Event("on_potato", "player", key))
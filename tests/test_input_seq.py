@@ -0,0 +1,169 @@
+import pytest
+
+from botafar import Joystick
+from botafar._internal.controls import ControlBase
+from botafar._internal.data_channel.data_channel import get_datachannel_options
+from botafar._internal.data_channel.wire_format import is_newer_seq
+from botafar._internal.events import Event, InputSnapshot, SystemEvent
+from botafar._internal.states import ServerEventProsessor, state_machine
+
+from .helpers import reset
+
+
+class RecordingProsessor(ServerEventProsessor):
+    def __init__(self):
+        previous = [
+            getattr(state_machine, name, None)
+            for name in ("inform", "notify_state_change", "callback_executor")
+        ]
+        super().__init__(None, None, None)
+        state_machine.reinit(*previous)
+        self.processed = []
+
+    def process_input_event(self, event):
+        self.processed.append((event.name, event._key))
+        return True
+
+
+def event(name, key, seq):
+    event = Event(name, "owner", key)
+    event._seq = seq
+    return event
+
+
+def test_is_newer_seq():
+    assert is_newer_seq(1, 0)
+    assert not is_newer_seq(0, 0)
+    assert not is_newer_seq(0, 1)
+    assert is_newer_seq(0, 2**32 - 1)
+    assert not is_newer_seq(2**32 - 1, 0)
+
+
+def test_late_press_is_skipped():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_release", "A", 2))
+    prosessor.process_event(event("on_press", "A", 1))
+    assert prosessor.processed == [("on_release", "A")]
+    assert prosessor.get_stats()["stale"] == 1
+
+
+def test_seqs_are_per_key():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "B", 2))
+    prosessor.process_event(event("on_press", "A", 1))
+    assert prosessor.processed == [("on_press", "B"), ("on_press", "A")]
+
+
+def test_events_without_seq():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "A", None))
+    prosessor.process_event(event("on_press", "A", None))
+    assert len(prosessor.processed) == 2
+
+
+def test_snapshot_recovers_lost_release():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "A", 1))
+    prosessor.process_event(event("on_press", "B", 2))
+    # Release of A (seq 3) was lost
+    prosessor.process_event(InputSnapshot("owner", 4, frozenset({"B", "C"})))
+    assert prosessor.processed[2:] == [("on_release", "A"), ("on_press", "C")]
+    assert prosessor.get_stats()["reconciled"] == 2
+
+    # Arrives after the snapshot
+    prosessor.process_event(event("on_release", "A", 3))
+    assert len(prosessor.processed) == 4
+
+
+def test_snapshot_older_than_event():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "A", 5))
+    prosessor.process_event(InputSnapshot("owner", 4, frozenset()))
+    assert prosessor.processed == [("on_press", "A")]
+    prosessor.process_event(InputSnapshot("owner", 3, frozenset({"B"})))
+    assert prosessor.processed == [("on_press", "A")]
+
+
+def test_reset_seqs():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "A", 10))
+    prosessor.reset_seqs("owner")
+    prosessor.process_event(event("on_release", "A", 0))
+    assert prosessor.processed == [("on_press", "A"), ("on_release", "A")]
+
+
+def test_datachannel_options():
+    assert get_datachannel_options(None, None) == {"ordered": False}
+    assert get_datachannel_options(0, None)["maxRetransmits"] == 0
+    assert get_datachannel_options(None, 100)["maxPacketLifeTime"] == 100
+    with pytest.raises(AssertionError):
+        get_datachannel_options(0, 100)
+    with pytest.raises(AssertionError):
+        get_datachannel_options(True, None)
+    with pytest.raises(AssertionError):
+        get_datachannel_options(None, 0)
+
+
+def test_connection_interrupted_releases_keys():
+    prosessor = RecordingProsessor()
+    prosessor.process_event(event("on_press", "A", 1))
+    prosessor.process_event(SystemEvent("connection_interrupted", "library"))
+    assert prosessor.processed[1:] == [("on_release", "A")]
+    # Still held after the connection works again
+    prosessor.process_event(InputSnapshot("owner", 2, frozenset({"A"})))
+    assert prosessor.processed[2:] == [("on_press", "A")]
+
+
+class ControlProsessor(RecordingProsessor):
+    def __init__(self):
+        super().__init__()
+        self.delivering = True
+
+    def process_input_event(self, event):
+        if not self.delivering:
+            return False
+        super().process_input_event(event)
+        ControlBase._get_callbacks(event)
+        return True
+
+
+def test_direction_events_are_tracked():
+    reset()
+    joystick = Joystick("W", "A", "S", "D", diagonals=True)
+    prosessor = ControlProsessor()
+    prosessor.process_event(event("on_up_left", "W", 1))
+    assert prosessor.pressed["owner"] == {"W", "A"}
+    prosessor.process_event(event("on_up", "A", 2))
+    assert prosessor.pressed["owner"] == {"W"}
+
+    prosessor.process_event(event("on_up_right", "D", 3))
+    prosessor.process_event(SystemEvent("connection_interrupted", "library"))
+    assert prosessor.processed[3:] == [
+        ("on_release", "D"),
+        ("on_release", "W"),
+    ]
+    assert joystick.is_center
+
+    prosessor.process_event(InputSnapshot("owner", 4, frozenset({"W", "D"})))
+    assert prosessor.processed[5:] == [("on_press", "D"), ("on_press", "W")]
+    assert joystick.is_up_right
+    prosessor.process_event(event("on_center", "W", 5))
+    assert prosessor.pressed["owner"] == set()
+
+
+def test_undelivered_input_is_not_tracked():
+    reset()
+    Joystick("W", "A", "S", "D")
+    prosessor = ControlProsessor()
+    prosessor.delivering = False
+    prosessor.process_event(event("on_press", "W", 1))
+    prosessor.process_event(event("on_left", "A", 2))
+    prosessor.process_event(InputSnapshot("owner", 3, frozenset({"A"})))
+    assert prosessor.pressed["owner"] == set()
+    assert prosessor.get_stats()["reconciled"] == 0
+
+    # Reconciled once the input is delivered
+    prosessor.delivering = True
+    prosessor.process_event(InputSnapshot("owner", 4, frozenset({"A"})))
+    assert prosessor.processed == [("on_press", "A")]
+    assert prosessor.pressed["owner"] == {"A"}
@@ -0,0 +1,132 @@
+import asyncio
+
+from botafar._internal.constants import (
+    LIVENESS_GRACE,
+    LIVENESS_MAX_TIMEOUT,
+    LIVENESS_MIN_MARGIN,
+    LIVENESS_MIN_SAMPLES,
+    LIVENESS_MIN_TIMEOUT,
+)
+from botafar._internal.data_channel import liveness
+from botafar._internal.data_channel.liveness import LivenessWatchdog, Smoothed
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def get_watchdog(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(liveness.clock, "now", clock)
+    return LivenessWatchdog(None), clock
+
+
+def ping_every(watchdog, clock, interval, count, rtt=None):
+    for _ in range(count):
+        clock.now += interval
+        watchdog.ping(rtt)
+
+
+def test_smoothed():
+    smoothed = Smoothed()
+    smoothed.add(1.0)
+    assert smoothed.value == 1.0 and smoothed.variance == 0.5
+    for _ in range(100):
+        smoothed.add(1.0)
+    assert abs(smoothed.value - 1.0) < 1e-9
+    assert smoothed.variance < 0.001
+
+
+def test_timeout_adapts(monkeypatch):
+    watchdog, clock = get_watchdog(monkeypatch)
+    # Grace period fits in the old fixed timeout
+    assert watchdog.timeout + LIVENESS_GRACE == LIVENESS_MAX_TIMEOUT
+    ping_every(watchdog, clock, 0.05, LIVENESS_MIN_SAMPLES + 20)
+    assert watchdog.timeout == LIVENESS_MIN_TIMEOUT
+
+    ping_every(watchdog, clock, 1.0, 50)
+    assert 1.0 < watchdog.timeout < 1.5
+    ping_every(watchdog, clock, 1.0, 1, rtt=0.2)
+    assert watchdog.timeout > 1.1
+
+    ping_every(watchdog, clock, 10.0, 50)
+    assert watchdog.timeout + LIVENESS_GRACE == LIVENESS_MAX_TIMEOUT
+
+
+def test_timeout_margin(monkeypatch):
+    watchdog, clock = get_watchdog(monkeypatch)
+    # Steady pings make the variance nearly zero
+    ping_every(watchdog, clock, 2.0, 100)
+    assert watchdog.interval.variance < 0.001
+    assert watchdog.timeout >= 2.0 + LIVENESS_MIN_MARGIN
+
+
+def test_false_positive(monkeypatch):
+    watchdog, clock = get_watchdog(monkeypatch)
+    ping_every(watchdog, clock, 0.05, 30)
+    watchdog.detected_ping = watchdog.last_ping
+    watchdog.reset()
+    ping_every(watchdog, clock, 1.0, 1)
+    assert watchdog.false_positives == 1
+
+    watchdog.detected_ping = watchdog.last_ping
+    watchdog.reset()
+    ping_every(watchdog, clock, LIVENESS_MAX_TIMEOUT + 1, 1)
+    assert watchdog.false_positives == 1
+
+
+def test_detects_dead_link():
+    async def run():
+        dead = asyncio.Event()
+
+        async def on_dead():
+            dead.set()
+
+        watchdog = LivenessWatchdog(on_dead)
+        task = asyncio.create_task(watchdog.run())
+        # Low jitter pings, like on a good network
+        for _ in range(LIVENESS_MIN_SAMPLES + 20):
+            watchdog.ping()
+            await asyncio.sleep(0.05)
+        assert not dead.is_set()
+        await asyncio.wait_for(dead.wait(), 1)
+        task.cancel()
+        stats = watchdog.get_stats()
+        assert stats["detections"] == 1
+        assert stats["detection_latency"]["count"] == 1
+        assert stats["detection_latency"]["max"] < 1
+
+    asyncio.run(run())
+
+
+def test_late_ping_cancels_recovery():
+    async def run():
+        dead = asyncio.Event()
+
+        async def on_dead():
+            dead.set()
+
+        watchdog = LivenessWatchdog(on_dead)
+        task = asyncio.create_task(watchdog.run())
+        for _ in range(LIVENESS_MIN_SAMPLES + 5):
+            watchdog.ping()
+            await asyncio.sleep(0.01)
+        timeout = watchdog.timeout
+        await asyncio.sleep(timeout + LIVENESS_GRACE / 2)
+        assert watchdog.suspected_ping is not None
+        watchdog.ping()
+        await asyncio.sleep(LIVENESS_GRACE)
+        assert not dead.is_set()
+        assert watchdog.recovery_task.cancelled()
+        stats = watchdog.get_stats()
+        assert stats["detections"] == 0
+        assert stats["late_pings"] == 1
+        # The late interval makes the timeout longer
+        assert watchdog.timeout > timeout
+        task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+
+import pytest
+
+from botafar._internal.callback_executor import CallbackExecutor
+from botafar._internal.scheduler import TimerWheel
+from botafar._internal.states import server_state_machine
+from botafar._internal.states.machine import Machine, MachineError
+from botafar._internal.states.server_state_machine import ServerStateMachine
+
+from .helpers import fake_run, reset
+
+
+class Model:
+    def __init__(self):
+        self.allowed = True
+        self.entered = []
+        self.machine = Machine(self, ["a", "b", "c"], "a", ["c"])
+        self.machine.add_transition("go", "a", "b", "is_allowed", "after_b")
+        self.machine.add_transition("back", ["b", "c"], "a")
+        self.machine.add_transition("end", "*", "c", after="after_c")
+
+    def is_allowed(self):
+        return self.allowed
+
+    def after_b(self):
+        self.entered.append("b")
+
+    def after_c(self):
+        self.entered.append("c")
+
+
+def test_trigger():
+    model = Model()
+    assert model.state == "a"
+    assert model.go() is True
+    assert model.state == "b"
+    assert model.entered == ["b"]
+    assert model.back() is True
+    assert model.state == "a"
+
+
+def test_failing_condition():
+    model = Model()
+    model.allowed = False
+    assert model.go() is False
+    assert model.state == "a"
+    assert model.entered == []
+
+
+def test_invalid_trigger():
+    model = Model()
+    with pytest.raises(MachineError):
+        model.back()
+    assert model.machine.trigger("back", strict=False) is None
+    assert not model.machine.is_valid("back")
+    assert model.state == "a"
+
+
+def test_ignored_invalid_trigger():
+    model = Model()
+    model.end()
+    assert model.go() is False
+    assert model.state == "c"
+
+
+def test_wildcard_source():
+    model = Model()
+    model.go()
+    model.end()
+    assert model.state == "c"
+    model.end()
+    assert model.entered == ["b", "c", "c"]
+
+
+def test_session(monkeypatch):
+    reset()
+    monkeypatch.setattr(server_state_machine, "scheduler", TimerWheel())
+    fake_run()
+    states = []
+
+    async def main():
+        machine = ServerStateMachine()
+        executor = CallbackExecutor(lambda _: None, lambda e: print(e))
+        executor.set_loop(asyncio.get_running_loop())
+        machine.reinit(
+            lambda _: None,
+            lambda state, text="": states.append(state),
+            executor,
+        )
+        machine.set_loop(asyncio.get_running_loop())
+
+        async def settle():
+            await asyncio.sleep(0.05)
+            await executor.wait_until_all_finished()
+
+        machine.init()
+        machine.wait_browser()
+        machine.on_browser_connect()
+        await settle()
+        machine.on_player_connect("player")
+        await settle()
+        assert machine._state() == "on_start"
+        assert machine.time() >= 0
+
+        machine.stop_reason = "test"
+        machine.stop_immediate()
+        await settle()
+        machine.on_player_disconnect()
+        await settle()
+        return machine
+
+    machine = asyncio.run(main())
+    assert states == [
+        "waiting_browser",
+        "on_prepare",
+        "waiting_owner_or_player",
+        "on_start",
+        "on_stop",
+        "waiting_browser",
+        "on_prepare",
+        "waiting_owner_or_player",
+    ]
+    assert machine.time() == -1
+
+
+def test_control_time_in_system_lane(monkeypatch):
+    reset()
+    scheduler = TimerWheel()
+    monkeypatch.setattr(server_state_machine, "scheduler", scheduler)
+    fake_run()
+    states = []
+    threads = []
+
+    async def main():
+        machine = ServerStateMachine()
+        executor = CallbackExecutor(lambda _: None, lambda e: print(e))
+        executor.set_loop(asyncio.get_running_loop())
+        machine.reinit(
+            lambda _: None,
+            lambda state, text="": states.append(state),
+            executor,
+        )
+        machine.set_loop(asyncio.get_running_loop())
+        on_control_time = machine.on_control_time
+
+        def record(generation):
+            threads.append(threading.current_thread())
+            on_control_time(generation)
+
+        async def settle():
+            await asyncio.sleep(0.05)
+            await executor.wait_until_all_finished()
+
+        machine.init()
+        machine.wait_browser()
+        machine.on_browser_connect()
+        await settle()
+        machine.on_player_connect("player")
+        await settle()
+
+        # Outdated generation, the bot was stopped and started meanwhile
+        machine.on_control_time(scheduler.generation - 1)
+        assert machine._state() == "on_start"
+
+        scheduler.call_later(
+            0.01, machine.in_system_lane("_control_time", record)
+        )
+        await asyncio.sleep(0.1)
+        await settle()
+        assert machine.stop_reason == "control time ended"
+
+    asyncio.run(main())
+    assert "on_stop" in states
+    assert threads[0].name.startswith("botafar_system")
@@ -0,0 +1,194 @@
+import asyncio
+import time
+
+import pytest
+
+from botafar import on_repeat
+from botafar._internal.callback_executor import CallbackExecutor
+from botafar._internal.decorators import decorators
+from botafar._internal.scheduler import TimerWheel
+from botafar._internal.states import state_machine
+
+from .helpers import fake_run, get_cb, reset
+
+
+def run_repeat(monkeypatch, duration):
+    fake_run()
+
+    async def main():
+        wheel = TimerWheel()
+        wheel.set_loop(asyncio.get_running_loop())
+        monkeypatch.setattr(decorators, "scheduler", wheel)
+        executor = CallbackExecutor(lambda _: None, lambda _: None)
+        executor.set_loop(asyncio.get_running_loop())
+        monkeypatch.setattr(state_machine, "callback_executor", executor)
+
+        get_cb("on_repeat")(wheel.generation)
+        await asyncio.sleep(duration)
+        wheel.cancel_all()
+        await executor.wait_until_all_finished()
+
+    asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def clear_repeat_stats(monkeypatch):
+    monkeypatch.setattr(decorators, "repeat_stats", {})
+
+
+def test_only_one_of_sleep_rate_and_period():
+    reset()
+    with pytest.raises(AssertionError):
+
+        @on_repeat(sleep=1, rate=10)
+        def example():
+            pass
+
+    with pytest.raises(AssertionError):
+
+        @on_repeat(rate=10, period=0.1)
+        def example2():
+            pass
+
+
+def test_rate_and_period_must_be_positive():
+    reset()
+    with pytest.raises(AssertionError):
+
+        @on_repeat(rate=0)
+        def example():
+            pass
+
+    with pytest.raises(AssertionError):
+
+        @on_repeat(period=-1)
+        def example2():
+            pass
+
+
+def test_overrun_options():
+    reset()
+    with pytest.raises(AssertionError):
+
+        @on_repeat(rate=10, overrun="wait")
+        def example():
+            pass
+
+    with pytest.raises(AssertionError):
+
+        @on_repeat(sleep=0.1, overrun="catch_up")
+        def example2():
+            pass
+
+
+def test_sleep_is_default():
+    reset()
+
+    @on_repeat
+    def example():
+        pass
+
+    fake_run()
+    assert decorators.repeat_stats == {}
+
+
+def test_rate_does_not_drift(monkeypatch):
+    reset()
+    starts = []
+
+    @on_repeat(rate=100)
+    def example():
+        starts.append(time.perf_counter())
+        time.sleep(0.004)
+
+    run_repeat(monkeypatch, 0.2)
+    # With sleep=0.01 there would be about 14 runs
+    assert 17 <= len(starts) <= 21
+    stats = decorators.get_repeat_stats()[
+        "test_rate_does_not_drift.<locals>.example"
+    ]
+    assert stats["period"] == 0.01
+    assert stats["runs"] == len(starts)
+    assert stats["overruns"] == 0
+    assert stats["jitter"]["count"] == len(starts)
+
+
+def test_overrun_skip(monkeypatch):
+    reset()
+    starts = []
+
+    @on_repeat(period=0.01)
+    def example():
+        starts.append(time.perf_counter())
+        time.sleep(0.025)
+
+    run_repeat(monkeypatch, 0.1)
+    (stats,) = decorators.get_repeat_stats().values()
+    assert stats["overruns"] == stats["runs"]
+    assert stats["skipped"] >= 2 * (stats["runs"] - 1)
+    # Runs start on the original schedule, every third period
+    for a, b in zip(starts, starts[1:]):
+        assert b - a == pytest.approx(0.03, abs=0.005)
+
+
+def test_overrun_catch_up(monkeypatch):
+    reset()
+    starts = []
+
+    @on_repeat(period=0.01, overrun="catch_up")
+    def example():
+        starts.append(time.perf_counter())
+        if len(starts) == 1:
+            time.sleep(0.05)
+
+    run_repeat(monkeypatch, 0.15)
+    (stats,) = decorators.get_repeat_stats().values()
+    assert stats["overruns"] == 1
+    assert stats["skipped"] == 0
+    assert 13 <= stats["runs"] <= 16
+
+
+def test_async_rate(monkeypatch):
+    reset()
+    starts = []
+
+    @on_repeat(rate=100)
+    async def example():
+        starts.append(time.perf_counter())
+        await asyncio.sleep(0.004)
+
+    run_repeat(monkeypatch, 0.2)
+    assert 17 <= len(starts) <= 21
+
+
+def test_stop_between_dispatch_and_first_run(monkeypatch):
+    reset()
+    count = []
+
+    @on_repeat(sleep=0.01)
+    def example():
+        count.append(1)
+
+    fake_run()
+    wheel = TimerWheel()
+    monkeypatch.setattr(decorators, "scheduler", wheel)
+    dispatched = []
+    monkeypatch.setattr(
+        state_machine,
+        "execute_on_repeat_from_outside",
+        lambda run, generation: dispatched.append((run, generation)),
+    )
+
+    # Stopped before the dispatched stub was run
+    generation = wheel.generation
+    wheel.cancel_all()
+    get_cb("on_repeat")(generation)
+    assert dispatched == []
+
+    # Stopped after the run was dispatched, before a worker started it
+    get_cb("on_repeat")(wheel.generation)
+    ((run, generation),) = dispatched
+    wheel.cancel_all()
+    run(generation)
+    assert count == []
+    assert wheel.pending == 0
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from botafar import Output
+from botafar._internal import outputs as outputs_module
+from botafar._internal.outputs import OutputLoop
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = OutputLoop(freq=200)
+    monkeypatch.setattr(outputs_module, "outputs", loop)
+    yield loop
+    loop.close()
+
+
+def wait_until(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def test_options_errors(loop):
+    with pytest.raises(AssertionError):
+        Output("potato")
+    with pytest.raises(AssertionError):
+        Output(print, rate=1, time_constant=1)
+    with pytest.raises(AssertionError):
+        Output(print, rate=0)
+    with pytest.raises(AssertionError):
+        Output(print, time_constant=-1)
+
+
+def test_step(loop):
+    output = Output(print, rate=2)
+    output._target = 1
+    assert output._step(0.1) == pytest.approx(0.2)
+    output._value = 0.9
+    assert output._step(0.1) == 1
+    output._target = -1
+    assert output._step(0.1) == pytest.approx(0.7)
+
+    output = Output(print, time_constant=0.5)
+    output._target = 1
+    assert output._step(0.5) == pytest.approx(1 - 1 / 2.718281828)
+    output._value = 0.9995
+    assert output._step(0.01) == 1
+
+    output = Output(print)
+    output._target = 0.3
+    assert output._step(0.001) == 0.3
+
+
+def test_ramp(loop):
+    values = []
+    output = Output(values.append, rate=10)
+    start = time.monotonic()
+    output.target = 1
+    assert output.target == 1
+    wait_until(lambda: output.value == 1)
+    # About 0.1 s at 10 per second, one update every 5 ms
+    assert time.monotonic() - start >= 0.09
+    assert values == sorted(values)
+    assert values[0] == pytest.approx(0.05, abs=0.01)
+    assert values[-1] == 1
+    assert len(values) >= 10
+    assert loop.moving == set()
+    assert loop.get_stats()["updates"] >= 10
+
+
+def test_outputs_update_together(loop):
+    left = []
+    right = []
+    Output(left.append, rate=10).set(0.5)
+    Output(right.append, time_constant=0.01).set(-0.5)
+    wait_until(lambda: len(loop.moving) == 0)
+    assert left[-1] == 0.5
+    assert right[-1] == -0.5
+    # The thread idles, and starts again with a new target
+    updates = loop.updates
+    time.sleep(0.05)
+    assert loop.updates == updates
+    assert loop.thread.is_alive()
+
+
+def test_immediate(loop):
+    values = []
+    output = Output(values.append, rate=1)
+    output.set(1, immediate=True)
+    wait_until(lambda: output.value == 1)
+    assert values == [1]
+
+
+def test_safe_values(loop):
+    values = []
+    output = Output(values.append, rate=50, safe=0.25)
+    unsafe = Output(lambda v: None, safe=None)
+    output.set(1, immediate=True)
+    unsafe.set(1)
+    wait_until(lambda: output.value == 1 and unsafe.value == 1)
+    loop.to_safe()
+    assert output.target == 0.25
+    wait_until(lambda: output.value == 0.25)
+    assert unsafe.value == 1
+
+    # Exit sets safe values right away, without the thread
+    output.set(1)
+    loop.close()
+    assert loop.thread is None
+    assert output.value == 0.25
+    assert values[-1] == 0.25
+
+
+def test_setter_errors(loop):
+    calls = []
+
+    def setter(value):
+        calls.append(value)
+        raise ValueError("broken")
+
+    output = Output(setter, rate=1)
+    output.set(1)
+    wait_until(lambda: len(loop.moving) == 0)
+    time.sleep(0.02)
+    # Not retried until a new target
+    assert len(calls) == 1
+    assert output.value == 0
+    assert loop.errors == 1
+
+
+def test_close_waits_for_blocking_setter(loop):
+    calls = []
+    blocked = threading.Event()
+    release = threading.Event()
+
+    def setter(value):
+        calls.append((value, threading.current_thread()))
+        if value == 1:
+            blocked.set()
+            release.wait(timeout=5)
+
+    output = Output(setter, safe=0.5)
+    output.set(1)
+    assert blocked.wait(timeout=2)
+    thread = loop.thread
+    loop.close(timeout=0.05)
+    # Not reopened while the old thread still runs
+    assert loop.closed and loop.thread is thread
+    output.set(0.8)
+    assert loop.thread is thread
+    assert len(calls) == 1
+
+    release.set()
+    thread.join(timeout=2)
+    assert not loop.closed and loop.thread is None
+    # Safe value from the same thread, after the blocking call
+    assert calls[-1] == (0.5, thread)
+    assert output.value == 0.5
+
+
+def test_bad_targets(loop):
+    with pytest.raises(ValueError):
+        Output(print, initial=None)
+    with pytest.raises(ValueError):
+        Output(print, safe=float("nan"))
+    values = []
+    output = Output(values.append, rate=50, safe=0.0)
+    for target in [None, "1", float("nan"), float("inf"), True]:
+        with pytest.raises(ValueError):
+            output.set(target)
+    assert loop.thread is None
+
+    # Bad targets past the check do not stop the update thread
+    broken = Output(lambda v: None, rate=50)
+    loop.set_target(broken, "1")
+    output.set(1, immediate=True)
+    wait_until(lambda: output.value == 1)
+    assert loop.errors == 1
+    loop.to_safe()
+    wait_until(lambda: output.value == 0)
+    assert values[-1] == 0
+    assert loop.thread.is_alive()
@@ -0,0 +1,181 @@
+import json
+
+from botafar._internal.data_channel.json_utils import (
+    is_internal_message,
+    load_message,
+    parse_event,
+)
+from botafar._internal.events import (
+    AxisEvent,
+    Event,
+    InputSnapshot,
+    SystemEvent,
+)
+
+
+def load_and_parse(data):
+    loaded = load_message(json.dumps(data))
+    assert loaded is not None
+    return parse_event(loaded)
+
+
+def test_malformed_json():
+    assert load_message("{") is None
+    assert load_message("[1, 2]") is None
+    assert load_message('{"key": "A"}') is None
+    assert load_message('{"type": ["INPUT_EVENT"]}') is None
+
+
+def test_internal_message():
+    data = load_message(
+        json.dumps({"type": "INTERNAL_MESSAGE", "data": {"type": "ping"}})
+    )
+    assert is_internal_message(data)
+
+
+def test_input_event():
+    event = load_and_parse(
+        {
+            "key": "A",
+            "sender": "player",
+            "name": "on_press",
+            "type": "INPUT_EVENT",
+        }
+    )
+    assert isinstance(event, Event)
+    assert event.name == "on_press"
+    assert event.sender == "player"
+    assert event._key == "A"
+    assert event._seq is None
+
+
+def test_input_event_seq():
+    event = load_and_parse(
+        {
+            "key": "A",
+            "sender": "player",
+            "name": "on_press",
+            "type": "INPUT_EVENT",
+            "seq": 7,
+        }
+    )
+    assert event._seq == 7
+    assert event._browser_time is None
+
+
+def test_input_event_time():
+    event = load_and_parse(
+        {
+            "key": "A",
+            "sender": "player",
+            "name": "on_press",
+            "type": "INPUT_EVENT",
+            "time": 1234.5,
+        }
+    )
+    assert event._browser_time == 1234.5
+
+
+def test_input_snapshot():
+    valid = {
+        "type": "INPUT_SNAPSHOT",
+        "sender": "owner",
+        "seq": 3,
+        "pressed": ["A", "SPACE"],
+    }
+    snapshot = load_and_parse(valid)
+    assert isinstance(snapshot, InputSnapshot)
+    assert snapshot.pressed == frozenset({"A", "SPACE"})
+    assert snapshot.seq == 3
+    assert snapshot.axes == {}
+    snapshot = load_and_parse({**valid, "axes": {"LEFT_X": -1, "LEFT_Y": 0.5}})
+    assert snapshot.axes == {"LEFT_X": -1.0, "LEFT_Y": 0.5}
+    for field, value in [
+        ("axes", ["LEFT_X"]),
+        ("axes", {"A": 0.5}),
+        ("axes", {"LEFT_X": 2}),
+        ("axes", {"LEFT_X": "0"}),
+        ("pressed", "A"),
+        ("pressed", ["?"]),
+        ("pressed", [["A"]]),
+        ("seq", None),
+        ("sender", "someone"),
+    ]:
+        assert load_and_parse({**valid, field: value}) is None
+
+
+def test_input_event_invalid_values():
+    valid = {
+        "key": "A",
+        "sender": "player",
+        "name": "on_press",
+        "type": "INPUT_EVENT",
+    }
+    for field, value in [
+        ("key", "?"),
+        ("key", ["A"]),
+        ("sender", "someone"),
+        ("name", "on_potato"),
+        ("name", 3),
+        ("seq", -1),
+        ("seq", 2**32),
+        ("seq", "1"),
+        ("seq", True),
+        ("time", "1"),
+        ("time", -1),
+        ("time", float("nan")),
+    ]:
+        assert load_and_parse({**valid, field: value}) is None
+
+    del valid["key"]
+    assert load_and_parse(valid) is None
+
+
+def test_axis_event():
+    valid = {
+        "type": "AXIS_EVENT",
+        "axis": "LEFT_Y",
+        "sender": "owner",
+        "value": -0.25,
+        "seq": 4,
+        "time": 1234,
+    }
+    event = load_and_parse(valid)
+    assert isinstance(event, AxisEvent)
+    assert event.value == -0.25
+    assert event.name is None  # Set by the Axis
+    assert event._key == "LEFT_Y"
+    assert (event._seq, event._browser_time) == (4, 1234)
+    assert load_and_parse({**valid, "value": 1}).value == 1.0
+    for field, value in [
+        ("axis", "A"),
+        ("axis", 0),
+        ("sender", "someone"),
+        ("value", 1.01),
+        ("value", "0.5"),
+        ("value", True),
+        ("value", float("nan")),
+        ("value", None),
+        ("seq", -1),
+        ("time", "1"),
+    ]:
+        assert load_and_parse({**valid, field: value}) is None
+
+
+def test_system_event():
+    event = load_and_parse(
+        {
+            "type": "SYSTEM_EVENT",
+            "name": "player_connect",
+            "value": "name",
+            "text": "",
+            "data": None,
+        }
+    )
+    assert isinstance(event, SystemEvent)
+    assert event.name == "player_connect"
+    assert event.value == "name"
+
+
+def test_unknown_type():
+    assert load_and_parse({"type": "POTATO"}) is None
@@ -0,0 +1,153 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import pickle
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from botafar import Button, sleep
+from botafar._internal import callback_executor as callback_executor_module
+from botafar._internal.callback_executor import CallbackExecutor, Dispatch
+from botafar._internal.events import Event
+from botafar._internal.process_backend import get_process_target
+
+from .helpers import fake_run, reset
+
+b = Button("A", backend="process")
+
+
+@b.on_press
+def get_pid():
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("potato")
+
+
+def sleep_long():
+    sleep(10)
+
+
+def get_executor():
+    errors = []
+    executor = CallbackExecutor(lambda future: None, errors.append)
+    return executor, errors
+
+
+def run(executor, callbacks, name="on_press", event=None):
+    executor.execute_callbacks(callbacks, name, None, event=event)
+    asyncio.run(executor.wait_until_all_finished())
+    executor.shutdown_process_pool()
+
+
+def test_process_target():
+    assert get_process_target(fail) == (__name__, "fail")
+    # Decorated function is found through the decorator
+    assert get_process_target(get_pid.func_original) == (__name__, "get_pid")
+    with pytest.raises(RuntimeError):
+        get_process_target(lambda: None)
+
+    async def coroutine():
+        pass
+
+    with pytest.raises(RuntimeError):
+        get_process_target(coroutine)
+
+
+def test_errors_are_reported():
+    reset()
+    executor, errors = get_executor()
+    CallbackExecutor.add_to_process_backend(fail)
+    run(executor, [fail])
+    assert [str(e) for e in errors] == ["potato"]
+
+
+def test_sleep_cancelled_in_process():
+    reset()
+    executor, errors = get_executor()
+    sleep_event = multiprocessing.Event()
+    CallbackExecutor.add_to_process_backend(sleep_long)
+    CallbackExecutor.register(sleep_long)
+    CallbackExecutor.compile_dispatches()
+    executor.start_process_pool(lambda: sleep_event)
+
+    start = time.monotonic()
+    executor.execute_callbacks([sleep_long], "on_press", None)
+    time.sleep(0.5)
+    sleep_event.set()
+    asyncio.run(executor.wait_until_all_finished())
+    executor.shutdown_process_pool()
+    assert errors == []
+    assert time.monotonic() - start < 5
+
+
+def test_control_backend():
+    reset()
+    b = Button("A", backend="process")
+    c = Button("B")
+
+    @b.on_press
+    def example():
+        pass
+
+    @c.on_press(backend="process")
+    def example2():
+        pass
+
+    @b.on_release(backend="thread")
+    def example3():
+        pass
+
+    # Not module level functions
+    with pytest.raises(RuntimeError):
+        fake_run()
+    assert CallbackExecutor.process_backend == {
+        example.func_original,
+        example2.func_original,
+    }
+    with pytest.raises(AssertionError):
+        Button("C", backend="potato")
+    with pytest.raises(AssertionError):
+        c.on_release(lambda: None, backend="process", inline=True)
+
+
+def test_event_snapshot():
+    event = Event("on_press", "player", "A")
+    event._set_time(1.5)
+    event._set_active_method(lambda: True)
+    copy = pickle.loads(pickle.dumps(event))
+    assert copy.is_active and copy.time == 1.5
+    assert Dispatch(fail).process_target is None
+
+
+def test_shutdown_before_python_39(monkeypatch):
+    class Pool:
+        def submit(self, *args):
+            return concurrent.futures.Future()
+
+        def shutdown(self, **kwargs):
+            self.kwargs = kwargs
+
+    reset()
+    executor, _ = get_executor()
+    monkeypatch.setattr(
+        callback_executor_module,
+        "sys",
+        SimpleNamespace(version_info=(3, 8, 0)),
+    )
+    pool = Pool()
+    executor.process_pool = pool
+    dispatch = Dispatch(fail)
+    futures = [
+        executor._submit_to_process(dispatch, "on_press", None, 0.0)
+        for _ in range(2)
+    ]
+    futures[0].set_result(None)
+    executor.shutdown_process_pool()
+    assert pool.kwargs == {"wait": False}
+    assert futures[1].cancelled()
+    assert executor.process_futures == set()
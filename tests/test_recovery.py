@@ -0,0 +1,99 @@
+import asyncio
+
+import socketio
+
+from botafar._internal.data_channel import data_channel
+from botafar._internal.data_channel.data_channel import DataChannel
+
+
+class FakeSio:
+    def __init__(self, failures):
+        self.failures = failures
+        self.connected = False
+        self.emitted = []
+
+    async def connect(self, *args, **kwargs):
+        if len(self.failures) != 0 and self.failures.pop():
+            raise socketio.exceptions.ConnectionError()
+        self.connected = True
+
+    async def emit(self, *args, **kwargs):
+        self.emitted.append(args)
+
+
+def get_server(monkeypatch, failures):
+    monkeypatch.setattr(data_channel, "RECONNECT_BACKOFF_MIN", 0.001)
+    monkeypatch.setattr(data_channel, "RESTART_TIMEOUT", 0.01)
+    server = DataChannel(lambda event: server.events.append(event.name))
+    server.events = []
+    server.built = 0
+
+    def build_sio():
+        server.built += 1
+        return FakeSio(failures)
+
+    server._build_sio = build_sio
+    server._stop = asyncio.Event()
+    server.opened = asyncio.Event()
+    return server
+
+
+def test_connect_retries_with_new_client(monkeypatch):
+    async def run():
+        server = get_server(monkeypatch, [False, True, True])
+        assert await server._connect_sio()
+        assert server.built == 3
+        assert server.sio.emitted == [("setAliases",)]
+
+        # Connected client is reused
+        assert await server._connect_sio()
+        assert server.built == 3
+
+    asyncio.run(run())
+
+
+def test_connect_stops(monkeypatch):
+    async def run():
+        server = get_server(monkeypatch, [True] * 100)
+        server._stop.set()
+        assert not await server._connect_sio()
+
+    asyncio.run(run())
+
+
+def test_recover_falls_back_to_signaling(monkeypatch):
+    async def run():
+        server = get_server(monkeypatch, [])
+        server.request_id = "request"
+
+        async def restart():
+            await asyncio.sleep(1)  # Browser does not answer
+
+        server._restart = restart
+        await server._recover("ping timeout")
+        assert server.events == [
+            "connection_interrupted",
+            "browser_disconnect",
+            "owner_disconnect",
+        ]
+        assert server.recovery_tier == "signaling"
+        assert server.sio.connected
+        assert not server.recovering
+
+    asyncio.run(run())
+
+
+def test_recover_restart(monkeypatch):
+    async def run():
+        server = get_server(monkeypatch, [])
+        server.request_id = "request"
+
+        async def restart():
+            pass
+
+        server._restart = restart
+        await server._recover("ICE failure")
+        assert server.events == ["connection_interrupted"]
+        assert server.recovery_tier == "restart"
+
+    asyncio.run(run())
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+from botafar import on_repeat
+from botafar._internal.callback_executor import CallbackExecutor
+from botafar._internal.decorators import decorators
+from botafar._internal.scheduler import TimerWheel
+from botafar._internal.states import state_machine
+
+from .helpers import fake_run, get_cb, reset
+
+
+def run_wheel(test, *args):
+    async def main():
+        wheel = TimerWheel(*args)
+        wheel.set_loop(asyncio.get_running_loop())
+        await test(wheel)
+        return wheel
+
+    return asyncio.run(main())
+
+
+def test_timers_fire_in_deadline_order():
+    called = []
+
+    async def test(wheel):
+        wheel.call_later(0.03, lambda: called.append(3))
+        wheel.call_later(0.01, lambda: called.append(1))
+        wheel.call_later(0.02, lambda: called.append(2))
+        await asyncio.sleep(0.1)
+
+    wheel = run_wheel(test)
+    assert called == [1, 2, 3]
+    assert wheel.fired == 3
+    assert wheel.pending == 0
+    assert wheel.lateness.count == 3
+
+
+def test_timer_is_not_called_early():
+    called = []
+
+    async def test(wheel):
+        wheel.call_later(0.02, lambda: called.append(1))
+        await asyncio.sleep(0.01)
+        assert called == []
+        await asyncio.sleep(0.05)
+
+    wheel = run_wheel(test)
+    assert called == [1]
+    assert wheel.lateness.total >= 0
+
+
+def test_cancel():
+    called = []
+
+    async def test(wheel):
+        timer = wheel.call_later(0.01, lambda: called.append(1))
+        wheel.call_later(0.02, lambda: called.append(2))
+        timer.cancel()
+        await asyncio.sleep(0.05)
+
+    run_wheel(test)
+    assert called == [2]
+
+
+def test_cancel_all():
+    called = []
+
+    async def test(wheel):
+        for i in range(5):
+            wheel.call_later(0.01 * (i + 1), lambda i=i: called.append(i))
+        await asyncio.sleep(0.025)
+        wheel.cancel_all()
+        await asyncio.sleep(0.05)
+        assert wheel.handle is None
+
+    wheel = run_wheel(test)
+    assert called == [0, 1]
+    assert wheel.pending == 0
+
+
+def test_deadline_over_many_rounds():
+    called = []
+
+    async def test(wheel):
+        wheel.call_later(0.05, lambda: called.append(1))
+        await asyncio.sleep(0.1)
+
+    # One round is 8 ms
+    wheel = run_wheel(test, 0.001, 8)
+    assert called == [1]
+    assert wheel.wakeups < 10
+
+
+def test_next_tick_from_heap():
+    called = []
+
+    async def test(wheel):
+        # Same slot, different rounds
+        wheel.call_later(0.025, lambda: called.append(2))
+        wheel.call_later(0.009, lambda: called.append(1))
+        wheel.call_later(0.009, lambda: called.append(1))
+        assert len(wheel.ticks) == 2
+        assert wheel._next_tick() == wheel.ticks[0]
+        await asyncio.sleep(0.05)
+        assert wheel.ticks == [] and wheel.queued == set()
+
+    # One round is 16 ms
+    wheel = run_wheel(test, 0.001, 16)
+    assert called == [1, 1, 2]
+    assert wheel.pending == 0
+
+
+def test_wakes_up_only_for_timers():
+    async def test(wheel):
+        await asyncio.sleep(0.05)
+        assert wheel.wakeups == 0
+        wheel.call_later(0.01, lambda: None)
+        await asyncio.sleep(0.05)
+
+    wheel = run_wheel(test)
+    assert wheel.wakeups == 1
+
+
+def test_call_from_another_thread():
+    called = []
+
+    async def test(wheel):
+        thread = threading.Thread(
+            target=lambda: wheel.call_later(0.01, lambda: called.append(1))
+        )
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.05)
+
+    run_wheel(test)
+    assert called == [1]
+
+
+def test_on_repeat_stops_on_cancel_all(monkeypatch):
+    reset()
+    count = []
+
+    @on_repeat(sleep=0.01)
+    def example():
+        count.append(1)
+
+    fake_run()
+
+    async def main():
+        wheel = TimerWheel()
+        wheel.set_loop(asyncio.get_running_loop())
+        monkeypatch.setattr(decorators, "scheduler", wheel)
+        executor = CallbackExecutor(lambda _: None, lambda _: None)
+        executor.set_loop(asyncio.get_running_loop())
+        monkeypatch.setattr(state_machine, "callback_executor", executor)
+
+        get_cb("on_repeat")(wheel.generation)
+        await asyncio.sleep(0.1)
+        wheel.cancel_all()
+        await asyncio.sleep(0.02)
+        stopped_at = len(count)
+        await asyncio.sleep(0.05)
+        return stopped_at
+
+    stopped_at = asyncio.run(main())
+    assert stopped_at >= 3
+    assert len(count) == stopped_at
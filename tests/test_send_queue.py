@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+
+from botafar._internal.constants import (
+    MAX_PRINTS_PER_FLUSH,
+    OUTBOUND_BUFFER_LIMIT,
+    SYSTEM_EVENT_BATCH,
+)
+from botafar._internal.data_channel.send_queue import SendQueue
+from botafar._internal.events import SystemEvent
+
+
+def run(events, buffered_amount=0, batching=False):
+    frames = []
+    queue = SendQueue(frames.append, lambda: buffered_amount)
+    queue.batching = batching
+
+    async def main():
+        queue.set_loop(asyncio.get_running_loop())
+        thread = threading.Thread(
+            target=lambda: [queue.put(event) for event in events]
+        )
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    return [json.loads(frame) for frame in frames], queue
+
+
+def test_prints_merged():
+    events = [SystemEvent("print", str(i)) for i in range(3)]
+    events.append(SystemEvent("state_change", "on_start"))
+    frames, queue = run(events)
+    assert [(f["name"], f["value"]) for f in frames] == [
+        ("print", "0\n1\n2"),
+        ("state_change", "on_start"),
+    ]
+    assert queue.merged_prints == 2
+
+
+def test_only_adjacent_prints_merged():
+    events = [
+        SystemEvent("print", "a"),
+        SystemEvent("print", "b"),
+        SystemEvent("state_change", "on_stop"),
+        SystemEvent("print", "c"),
+        SystemEvent("error", "bot crashed"),
+        SystemEvent("print", "d"),
+    ]
+    frames, queue = run(events)
+    assert [(f["name"], f["value"]) for f in frames] == [
+        ("print", "a\nb"),
+        ("state_change", "on_stop"),
+        ("print", "c"),
+        ("error", "bot crashed"),
+        ("print", "d"),
+    ]
+    assert queue.merged_prints == 1
+
+
+def test_prints_limited_across_runs():
+    events = [SystemEvent("print", str(i)) for i in range(5)]
+    events.append(SystemEvent("state_change", "on_stop"))
+    events += [
+        SystemEvent("print", str(i)) for i in range(MAX_PRINTS_PER_FLUSH)
+    ]
+    frames, queue = run(events)
+    assert [f["name"] for f in frames] == ["state_change", "print"]
+    assert queue.dropped_prints == 5
+
+
+def test_prints_limited():
+    amount = MAX_PRINTS_PER_FLUSH + 5
+    frames, queue = run([SystemEvent("print", str(i)) for i in range(amount)])
+    assert frames[0]["value"].split("\n")[0] == "5"
+    assert queue.dropped_prints == 5
+
+
+def test_prints_dropped_when_buffer_full():
+    events = [
+        SystemEvent("print", "spam"),
+        SystemEvent("error", "bot crashed"),
+        SystemEvent("state_change", "on_stop"),
+    ]
+    frames, queue = run(events, buffered_amount=OUTBOUND_BUFFER_LIMIT + 1)
+    assert [f["name"] for f in frames] == ["error", "state_change"]
+    assert queue.dropped_prints == 1
+
+
+def test_batching_after_connect_ok():
+    events = [
+        SystemEvent("connect_ok", {"outboundBatching": True}),
+        SystemEvent("info", None, "browser connected"),
+        SystemEvent("state_change", "on_prepare"),
+    ]
+    frames, queue = run(events)
+    assert len(frames) == 2
+    assert frames[0]["name"] == "connect_ok"
+    assert frames[1]["type"] == SYSTEM_EVENT_BATCH
+    assert [e["name"] for e in frames[1]["events"]] == ["info", "state_change"]
+    queue.reset()
+    assert not queue.batching
+
+
+def test_not_batching_without_negotiation():
+    events = [
+        SystemEvent("connect_ok", None),
+        SystemEvent("info", None, "browser connected"),
+    ]
+    frames, _ = run(events)
+    assert [f["name"] for f in frames] == ["connect_ok", "info"]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from botafar._internal.data_channel import data_channel
+from botafar._internal.data_channel.data_channel import (
+    DataChannel,
+    get_ice_servers,
+)
+
+
+class FakeDataChannel:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePeerConnection:
+    created = 0
+
+    def __init__(self):
+        FakePeerConnection.created += 1
+        self.closed = False
+
+    async def createOffer(self):  # noqa: N802
+        return "offer"
+
+    async def setLocalDescription(self, description):  # noqa: N802
+        assert description == "offer"
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_get_peer_connection_and_datachannel(ice_servers):
+    return FakePeerConnection(), FakeDataChannel()
+
+
+def test_standby_is_used_when_fresh(monkeypatch):
+    monkeypatch.setattr(
+        data_channel,
+        "get_peer_connection_and_datachannel",
+        fake_get_peer_connection_and_datachannel,
+    )
+
+    async def run():
+        server = DataChannel(None)
+        server.standby = await data_channel.Standby.create([])
+        created = FakePeerConnection.created
+        fresh = server.standby
+        assert await server._take_standby() is fresh
+        assert server.standby is None
+        assert FakePeerConnection.created == created
+
+        server.standby = await data_channel.Standby.create([])
+        stale = server.standby
+        stale.created -= data_channel.STANDBY_MAX_AGE
+        taken = await server._take_standby()
+        assert taken is not stale
+        assert stale.peer_connection.closed and stale.data_channel.closed
+        assert server.get_stats()["offers_from_standby"] == 1
+
+    asyncio.run(run())
+
+
+class SlowPeerConnection(FakePeerConnection):
+    async def setLocalDescription(self, description):  # noqa: N802
+        await asyncio.sleep(10)
+
+
+def test_gathering_timeout(monkeypatch):
+    def get_peer_connection_and_datachannel(ice_servers):
+        if len(ice_servers) == 0:
+            return FakePeerConnection(), FakeDataChannel()
+        return SlowPeerConnection(), FakeDataChannel()
+
+    monkeypatch.setattr(
+        data_channel,
+        "get_peer_connection_and_datachannel",
+        get_peer_connection_and_datachannel,
+    )
+    servers = get_ice_servers(["stun:stun.example.com:3478"], False)
+    standby = asyncio.run(data_channel.Standby.create(servers, 0.01))
+    assert not isinstance(standby.peer_connection, SlowPeerConnection)
+
+
+def test_ice_servers():
+    assert get_ice_servers(None, True) == []
+    assert len(get_ice_servers(None, False)) == 1
+    turn = {
+        "urls": "turn:turn.example.com",
+        "username": "a",
+        "credential": "b",
+    }
+    servers = get_ice_servers(["stun:stun.example.com", turn], False)
+    assert servers[1].username == "a"
+    for ice_servers, host_only in [
+        (["stun:a"], True),
+        ("stun:a", False),
+        (["http://a"], False),
+        ([{"url": "stun:a"}], False),
+        ([{"urls": "stun:a", "password": "b"}], False),
+    ]:
+        with pytest.raises(AssertionError):
+            get_ice_servers(ice_servers, host_only)
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from time import perf_counter
+
+import botafar
+from botafar._internal.callback_executor import CallbackExecutor
+from botafar._internal.controls import ControlBase
+from botafar._internal.events import Event
+from botafar._internal.outputs import OutputLoop
+from botafar._internal.stats import (
+    BUCKETS,
+    Histogram,
+    RepeatStats,
+    format_stats,
+    register_stats,
+)
+
+from .helpers import fake_run, reset
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.to_dict()["p50"] is None
+    for _ in range(98):
+        histogram.add(0.001)
+    histogram.add(0.5)
+    histogram.add(100)
+    assert histogram.count == 100
+    assert histogram.percentile(50) >= 0.001
+    assert histogram.percentile(50) < 0.002
+    assert BUCKETS[-1] > histogram.percentile(99) >= 0.5
+    assert histogram.percentile(100) == 100
+    assert histogram.to_dict()["max"] == 100
+
+
+def test_callback_stats():
+    reset()
+    errors = []
+    executor = CallbackExecutor(lambda future: None, errors.append)
+
+    def slow():
+        time.sleep(0.01)
+
+    def fail():
+        raise ValueError("potato")
+
+    executor.execute_callbacks([slow, slow, fail], "on_press", None)
+    asyncio.run(executor.wait_until_all_finished())
+
+    register_stats("callbacks", executor.get_stats)
+    callbacks = botafar.stats()["callbacks"]
+    # Told apart by callback, not by event name
+    slow_stats = callbacks["test_callback_stats.<locals>.slow"]
+    assert slow_stats["completed"] == 2
+    assert slow_stats["errors"] == 0
+    assert slow_stats["dropped"] == 0
+    assert slow_stats["run_time"]["count"] == 2
+    assert slow_stats["run_time"]["max"] >= 0.01
+    assert slow_stats["queue_wait"]["count"] == 2
+    assert callbacks["test_callback_stats.<locals>.fail"]["errors"] == 1
+    assert "on_press" not in callbacks
+
+
+def test_control_callback_stats():
+    reset()
+    a = botafar.Button("A")
+    b = botafar.Button("B")
+
+    @a.on_press
+    def jump():
+        pass
+
+    @b.on_press
+    def shoot():
+        pass
+
+    fake_run()
+    executor = CallbackExecutor(lambda future: None, print)
+    for key in ["A", "B"]:
+        event = Event("on_press", "player", key)
+        callbacks = ControlBase._get_callbacks(event)
+        executor.execute_callbacks(callbacks, "on_press", None, event=event)
+    asyncio.run(executor.wait_until_all_finished())
+    stats = executor.get_stats()
+    prefix = "test_control_callback_stats.<locals>"
+    assert stats[f"{prefix}.jump"]["completed"] == 1
+    assert stats[f"{prefix}.shoot"]["completed"] == 1
+
+
+def test_empty_callback_not_measured():
+    reset()
+    executor = CallbackExecutor(lambda future: None, print)
+    executor.execute_callbacks([], "on_init", lambda: None)
+    executor.execute_callbacks([lambda: None], "_internal", None)
+    asyncio.run(executor.wait_until_all_finished())
+    assert executor.get_stats() == {}
+
+
+def test_input_latency():
+    reset()
+    executor = CallbackExecutor(lambda future: None, print)
+    event = Event("on_press", "player", "A")
+    event._received = perf_counter() - 0.01
+    event._sent = event._received - 0.02
+    executor.execute_callbacks([lambda: None], "on_press", None, event=event)
+    asyncio.run(executor.wait_until_all_finished())
+
+    on_press = executor.get_stats()["test_input_latency.<locals>.<lambda>"]
+    assert on_press["received_to_start"]["max"] >= 0.01
+    assert on_press["sent_to_start"]["max"] >= 0.03
+    text = format_stats(
+        {
+            "callbacks": executor.get_stats(),
+            "latency": {"network": on_press["received_to_start"]},
+        }
+    )
+    assert "input to start" in text
+    assert "network" in text
+
+
+def test_repeat_stats():
+    stats = RepeatStats(0.01)
+    stats.add_start(0.002)
+    stats.add_start(-0.001)  # Timer resolution, counted as on time
+    stats.overruns += 1
+    assert stats.to_dict()["runs"] == 2
+    assert stats.to_dict()["jitter"]["max"] == 0.002
+    text = format_stats({"repeat": {"loop": stats.to_dict()}})
+    assert text.startswith("loop: 2 runs every 0.0100s")
+    assert "1 overruns" in text
+
+
+def test_output_stats():
+    loop = OutputLoop()
+    assert format_stats({"outputs": loop.get_stats()}) == ""
+    loop.updates = 3
+    loop.jitter.add(0.001)
+    text = format_stats({"outputs": loop.get_stats()})
+    assert text.startswith("outputs: 3 updates")
+    assert "0 errors" in text
@@ -0,0 +1,134 @@
+import pytest
+
+from botafar._internal.constants import (
+    AXIS_LIST,
+    INPUT_EVENT_NAME_LIST,
+    KEY_LIST,
+    SENDER_LIST,
+)
+from botafar._internal.data_channel.wire_format import (
+    BINARY_FORMAT,
+    JSON_FORMAT,
+    SEQ_BINARY_FORMAT,
+    TIMED_BINARY_FORMAT,
+    encode_axis_event,
+    encode_input_event,
+    negotiate_input_event_format,
+    negotiate_outbound_batching,
+    parse_binary_event,
+)
+from botafar._internal.events import AxisEvent, Event
+
+
+def test_round_trip():
+    for key in KEY_LIST:
+        for sender in SENDER_LIST:
+            for name in INPUT_EVENT_NAME_LIST:
+                message = encode_input_event(Event(name, sender, key))
+                assert len(message) == 4
+                event = parse_binary_event(message)
+                assert event.name == name
+                assert event.sender == sender
+                assert event._key == key
+
+
+def test_round_trip_with_seq():
+    for seq in (0, 1, 2**16 + 3, 2**32 - 1):
+        event = Event("on_release", "owner", "SPACE")
+        event._seq = seq
+        message = encode_input_event(event)
+        assert len(message) == 8
+        parsed = parse_binary_event(message)
+        assert parsed._seq == seq
+        assert parsed.name == "on_release"
+        assert parsed._key == "SPACE"
+    assert parse_binary_event(bytes((1, 0, 0, 0)))._seq is None
+
+
+def test_round_trip_with_time():
+    event = Event("on_press", "player", "A")
+    event._seq = 5
+    event._browser_time = 1_700_000_000_123
+    message = encode_input_event(event)
+    assert len(message) == 12
+    parsed = parse_binary_event(message)
+    assert parsed._seq == 5
+    assert parsed._browser_time == 1_700_000_000_123 % 2**32
+    assert parse_binary_event(message[:-1]) is None
+
+
+def test_axis_round_trip():
+    for axis in AXIS_LIST:
+        for sender in SENDER_LIST:
+            for value in (-1.0, -0.5, 0.0, 1 / 3, 1.0):
+                event = AxisEvent(None, sender, axis, value)
+                event._seq = 2**32 - 1
+                event._browser_time = 1_700_000_000_123
+                message = encode_axis_event(event)
+                assert len(message) == 13
+                parsed = parse_binary_event(message)
+                assert isinstance(parsed, AxisEvent)
+                assert parsed.value == pytest.approx(value, abs=1e-4)
+                assert (parsed._key, parsed.sender) == (axis, sender)
+                assert parsed._seq == 2**32 - 1
+                assert parsed._browser_time == 1_700_000_000_123 % 2**32
+    # Exact ends and the only value below -1
+    assert (
+        parse_binary_event(bytes((4, 0, 0, 0x80, 0x00)) + bytes(8)).value
+        == -1.0
+    )
+    assert (
+        parse_binary_event(bytes((4, len(AXIS_LIST), 0)) + bytes(10)) is None
+    )
+    assert parse_binary_event(bytes((4, 0, 0)) + bytes(9)) is None
+
+
+def test_malformed():
+    assert parse_binary_event(b"") is None
+    assert parse_binary_event(b"\x01\x00\x00") is None
+    assert parse_binary_event(b"\x01\x00\x00\x00\x00") is None
+    assert parse_binary_event(b"\x02\x00\x00\x00") is None
+    assert parse_binary_event(bytes((1, len(KEY_LIST), 0, 0))) is None
+    assert parse_binary_event(bytes((1, 0, len(SENDER_LIST), 0))) is None
+    assert parse_binary_event(bytes((1, 0, 0, 255))) is None
+    assert parse_binary_event(bytes((2, 0, 0, 0, 0, 0, 0))) is None
+    assert parse_binary_event(bytes((1, 0, 0, 0, 0, 0, 0, 0))) is None
+
+
+def test_negotiation():
+    assert negotiate_input_event_format(None) is None
+    assert negotiate_input_event_format({}) is None
+    assert negotiate_input_event_format({"inputEventFormats": "x"}) is None
+    assert (
+        negotiate_input_event_format({"inputEventFormats": ["json"]})
+        == JSON_FORMAT
+    )
+    assert (
+        negotiate_input_event_format({"inputEventFormats": ["binary9"]})
+        == JSON_FORMAT
+    )
+    assert (
+        negotiate_input_event_format(
+            {"inputEventFormats": ["json", "binary1"]}
+        )
+        == BINARY_FORMAT
+    )
+    assert (
+        negotiate_input_event_format(
+            {"inputEventFormats": ["json", "binary1", "binary2"]}
+        )
+        == SEQ_BINARY_FORMAT
+    )
+    assert (
+        negotiate_input_event_format(
+            {"inputEventFormats": ["binary2", "binary3"]}
+        )
+        == TIMED_BINARY_FORMAT
+    )
+
+
+def test_negotiate_outbound_batching():
+    assert negotiate_outbound_batching({"outboundBatching": True})
+    assert not negotiate_outbound_batching({"outboundBatching": "yes"})
+    assert not negotiate_outbound_batching({})
+    assert not negotiate_outbound_batching(None)